@@ -13,4 +13,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Pool de MongoDB obert (i mètriques del pool actives) abans de la primera consulta
+from config import mongo  # noqa: E402
+
+mongo.warm()
+
+# Filtres de disponibilitat de noms i emails construïts abans de la primera petició
+from users.availability import warm  # noqa: E402
+
+warm()
+
+# Els fluxos SSE (/events/stream/) es serveixen sense passar pel handler de
+# Django, que a la 4.1 recorre les respostes en streaming de forma síncrona
+from events.streams import StreamRouter  # noqa: E402
+
+application = StreamRouter(django_application)
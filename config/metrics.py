@@ -0,0 +1,302 @@
+"""
+Instrumentació per petició: temps de base de dades i de plantilles.
+
+``TimingMiddleware`` compta i cronometra cada consulta (``execute_wrapper``
+a totes les connexions, també les dels fils del pool de les vistes
+asíncrones) i cada renderització de plantilla, afegeix els
+totals a la capçalera ``Server-Timing`` i els acumula en histogrames per
+vista. ``metrics_view`` els exposa en format de text de Prometheus.
+
+Amb djongo el temps de base de dades inclou la traducció SQL → Mongo i
+l'anada i tornada al servidor; amb consultes concurrents ``db`` és la suma
+dels temps, no el temps de paret. Els histogrames són per procés: cada worker
+en publica els seus i Prometheus els agrega.
+"""
+import asyncio
+import bisect
+import hmac
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.template.backends.django import Template as DjangoTemplate
+
+# Límits superiors (segons) dels histogrames
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Acumuladors d'una sola petició"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.template_count = 0
+        self.template_time = 0.0
+        self._template_depth = 0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f};desc="{self.template_count} renders"',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # l'últim és +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Comptadors, indicadors i histogrames indexats per (nom, etiquetes)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.help = {}
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def render(self):
+        """Text en format d'exposició de Prometheus (0.0.4)"""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count, h.buckets)) for key, h in self.histograms.items()
+            )
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines += _header(name, 'counter', self.help.get(name))
+            lines.append(f'{name}{_labels(labels)} {value}')
+
+        for (name, labels), value in gauges:
+            if name not in seen:
+                seen.add(name)
+                lines += _header(name, 'gauge', self.help.get(name))
+            lines.append(f'{name}{_labels(labels)} {value}')
+
+        for (name, labels), (counts, total, count, buckets) in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines += _header(name, 'histogram', self.help.get(name))
+            cumulative = 0
+            for bound, n in zip(buckets + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {total}')
+            lines.append(f'{name}_count{_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _header(name, kind, text):
+    header = [f'# HELP {name} {text}'] if text else []
+    return header + [f'# TYPE {name} {kind}']
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+registry = Registry()
+registry.describe('streamevents_requests_total', 'Peticions ateses per vista i codi d\'estat')
+registry.describe('streamevents_request_duration_seconds', 'Durada total de la petició')
+registry.describe('streamevents_db_duration_seconds', 'Temps de base de dades per petició')
+registry.describe('streamevents_db_queries_total', 'Consultes a la base de dades')
+registry.describe('streamevents_template_duration_seconds', 'Temps de renderització de plantilles per petició')
+registry.describe('streamevents_view_errors_total', 'Errors capturats dins de les vistes')
+
+
+def record_error(view, error):
+    """Per als ``except`` de les vistes que recuperen l'error i responen igualment"""
+    registry.inc('streamevents_view_errors_total', view=view, error=type(error).__name__)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.db_time += time.perf_counter() - started
+        timing.db_count += 1
+
+
+def record_query(duration):
+    """Consulta feta fora de l'ORM (pymongo directe, ``events.repository``)"""
+    timing = _current.get()
+    if timing is not None:
+        timing.db_time += duration
+        timing.db_count += 1
+
+
+_original_render = DjangoTemplate.render
+
+
+def _timed_render(self, context=None, request=None):
+    timing = _current.get()
+    if timing is None:
+        return _original_render(self, context, request)
+    # Un render_to_string dins d'una plantilla no es compta dues vegades
+    timing._template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        timing._template_depth -= 1
+        timing.template_count += 1
+        if not timing._template_depth:
+            timing.template_time += time.perf_counter() - started
+
+
+def _instrument_connection(sender=None, connection=None, **kwargs):
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+def install():
+    """
+    Activa la instrumentació (idempotent). El wrapper de consultes s'afegeix
+    a cada connexió en crear-se, també a les dels fils del pool que fan
+    servir les vistes asíncrones; sense petició en curs no fa res.
+    """
+    DjangoTemplate.render = _timed_render
+    connection_created.connect(_instrument_connection, dispatch_uid='config.metrics')
+    for connection in connections.all():
+        _instrument_connection(connection=connection)
+
+
+class TimingMiddleware:
+    """
+    Mesura cada petició i afegeix ``Server-Timing``. Convé posar-lo el
+    primer de ``MIDDLEWARE`` perquè inclogui la resta de middleware.
+    Funciona tant en mode síncron com asíncron.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Marca la instància com a corutina (igual que MiddlewareMixin)
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        install()
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    def finish(self, request, response, timing):
+        total = timing.total_time
+        view = _view_name(request)
+        registry.inc('streamevents_requests_total', view=view, status=response.status_code)
+        registry.inc('streamevents_db_queries_total', timing.db_count, view=view)
+        registry.observe('streamevents_request_duration_seconds', total, view=view)
+        registry.observe('streamevents_db_duration_seconds', timing.db_time, view=view)
+        registry.observe('streamevents_template_duration_seconds', timing.template_time, view=view)
+
+        response['Server-Timing'] = timing.server_timing()
+        return response
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+def has_metrics_token(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip(), token)
+
+
+def metrics_view(request):
+    """
+    Mètriques en format Prometheus. Només per a usuaris staff, per al
+    scraper amb el token ``METRICS_TOKEN`` o per a les IPs de
+    ``METRICS_ALLOWED_IPS`` (buida per defecte); la resta rep un 404.
+    """
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    user = getattr(request, 'user', None)
+    is_staff = user is not None and user.is_authenticated and user.is_staff
+    if not (is_staff or has_metrics_token(request) or request.META.get('REMOTE_ADDR') in allowed_ips):
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,198 @@
+"""
+Pool de connexions de MongoDB (djongo → pymongo).
+
+Tots els fils d'un procés comparteixen un sol ``MongoClient`` (djongo el
+reutilitza per nom de base de dades), i el seu pool es configura a
+``DATABASES['default']['CLIENT']`` a partir de l'entorn (``MONGO_*``).
+``CONN_MAX_AGE = None`` evita que Django tanqui la connexió en acabar cada
+petició: djongo hi tancaria el client compartit i el pool es tornaria a
+obrir a la següent.
+
+``PoolStats`` escolta els esdeveniments CMAP de pymongo i publica a
+``config.metrics`` l'espera per obtenir una connexió del pool, les
+connexions obertes i en ús, i la saturació (en ús / ``maxPoolSize``).
+``warm`` s'executa en arrencar cada worker (``config.wsgi``/``config.asgi``).
+"""
+import logging
+import threading
+import time
+
+from django.db import DatabaseError, connections
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Valor per defecte de pymongo quan no s'indica maxPoolSize
+DEFAULT_MAX_POOL_SIZE = 100
+
+registry.describe('streamevents_mongo_checkout_seconds', 'Espera per obtenir una connexió del pool de MongoDB')
+registry.describe('streamevents_mongo_checkout_failed_total', 'Connexions del pool que no s\'han pogut obtenir')
+registry.describe('streamevents_mongo_connections_created_total', 'Connexions a MongoDB obertes')
+registry.describe('streamevents_mongo_connections_closed_total', 'Connexions a MongoDB tancades, per motiu')
+registry.describe('streamevents_mongo_pool_open', 'Connexions obertes al pool')
+registry.describe('streamevents_mongo_pool_in_use', 'Connexions del pool en ús')
+registry.describe('streamevents_mongo_pool_waiting', 'Fils esperant una connexió del pool')
+registry.describe('streamevents_mongo_pool_saturation', 'Connexions en ús / maxPoolSize')
+
+
+class PoolState:
+    __slots__ = ('max_size', 'open', 'in_use', 'waiting')
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.open = self.in_use = self.waiting = 0
+
+
+class PoolStats:
+    """
+    Mètriques del pool per adreça de servidor. Els mètodes són els de
+    ``pymongo.monitoring.ConnectionPoolListener`` (``install`` registra una
+    subclasse de totes dues). pymongo els crida des del fil que demana la
+    connexió, així que l'inici de cada espera es guarda per fil.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.pools = {}
+
+    def _pool(self, address):
+        pool = self.pools.get(address)
+        if pool is None:
+            pool = self.pools[address] = PoolState(DEFAULT_MAX_POOL_SIZE)
+        return pool
+
+    def _publish(self, address, pool):
+        label = _address(address)
+        registry.set('streamevents_mongo_pool_open', pool.open, address=label)
+        registry.set('streamevents_mongo_pool_in_use', pool.in_use, address=label)
+        registry.set('streamevents_mongo_pool_waiting', pool.waiting, address=label)
+        saturation = pool.in_use / pool.max_size if pool.max_size else 0
+        registry.set('streamevents_mongo_pool_saturation', round(saturation, 4), address=label)
+
+    def _update(self, address, **deltas):
+        with self._lock:
+            pool = self._pool(address)
+            for field, delta in deltas.items():
+                setattr(pool, field, max(0, getattr(pool, field) + delta))
+            self._publish(address, pool)
+
+    def _started(self):
+        started = getattr(self._local, 'started', None)
+        if started is None:
+            started = self._local.started = {}
+        return started
+
+    # --- Pool ---
+
+    def pool_created(self, event):
+        max_size = (getattr(event, 'options', None) or {}).get('maxPoolSize', DEFAULT_MAX_POOL_SIZE)
+        with self._lock:
+            self.pools[event.address] = PoolState(max_size)
+            self._publish(event.address, self.pools[event.address])
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        # Les connexions es tanquen (i es compten) una a una
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.open = pool.in_use = pool.waiting = 0
+            self._publish(event.address, pool)
+
+    # --- Connexions ---
+
+    def connection_created(self, event):
+        registry.inc('streamevents_mongo_connections_created_total', address=_address(event.address))
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        registry.inc(
+            'streamevents_mongo_connections_closed_total',
+            address=_address(event.address), reason=event.reason,
+        )
+        self._update(event.address, open=-1)
+
+    # --- Obtenir i retornar connexions ---
+
+    def connection_check_out_started(self, event):
+        self._started()[event.address] = self.clock()
+        self._update(event.address, waiting=1)
+
+    def _finish_wait(self, address):
+        started = self._started().pop(address, None)
+        return None if started is None else self.clock() - started
+
+    def connection_check_out_failed(self, event):
+        self._finish_wait(event.address)
+        registry.inc('streamevents_mongo_checkout_failed_total', address=_address(event.address), reason=event.reason)
+        self._update(event.address, waiting=-1)
+
+    def connection_checked_out(self, event):
+        wait = self._finish_wait(event.address)
+        if wait is not None:
+            registry.observe('streamevents_mongo_checkout_seconds', wait, address=_address(event.address))
+        self._update(event.address, waiting=-1, in_use=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, in_use=-1)
+
+
+def _address(address):
+    if isinstance(address, tuple):
+        return '%s:%s' % address
+    return str(address)
+
+
+# Listener registrat per install(); None fins aleshores
+stats = None
+
+
+def install():
+    """
+    Registra el listener global de pymongo (idempotent). Ha de passar abans
+    de crear el ``MongoClient``: els clients ja creats no el veuen.
+    """
+    global stats
+    if stats is not None:
+        return stats
+    # pymongo només s'importa aquí: amb sqlite (proves) no cal
+    from pymongo import monitoring
+
+    class PoolListener(PoolStats, monitoring.ConnectionPoolListener):
+        pass
+
+    stats = PoolListener()
+    monitoring.register(stats)
+    return stats
+
+
+def warm(alias='default'):
+    """
+    Obre el client i fa un ``ping`` (selecció de servidor, handshake) abans
+    de la primera petició. A partir d'aquí pymongo omple el pool fins a
+    ``minPoolSize`` en segon pla.
+    """
+    connection = connections[alias]
+    if connection.settings_dict['ENGINE'] != 'djongo':
+        return
+    from pymongo.errors import PyMongoError
+
+    install()
+    try:
+        connection.ensure_connection()
+        started = time.perf_counter()
+        connection.connection.command('ping')
+        logger.info('MongoDB a punt en %.1f ms', (time.perf_counter() - started) * 1000)
+    except (DatabaseError, PyMongoError):
+        # El worker arrenca igualment: pymongo tornarà a provar a la primera consulta
+        logger.exception("No s'ha pogut connectar a MongoDB en arrencar")
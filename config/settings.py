@@ -19,7 +19,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.TimingMiddleware',  # Server-Timing i mètriques per vista (ha d'anar primer)
     'django.middleware.security.SecurityMiddleware',
+    'config.staticfiles.StaticFilesMiddleware',  # STATIC_ROOT precomprimit (abans de sessions i CSRF)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -48,17 +50,92 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Vistes públiques asíncrones (llistat, detall, categoria, perfil públic).
+# Només tenen sentit servint amb config.asgi (uvicorn, daphne...).
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '') == '1'
+
 # MOD: Canvi de base de dades (sqlite -> MongoDB via djongo)
+# CLIENT són els paràmetres del MongoClient (un per procés, compartit per
+# tots els fils); el pool es dimensiona des de l'entorn (config/mongo.py)
 DATABASES = {
     'default': {  # MOD
         'ENGINE': 'djongo',  # MOD: Motor djongo
-        'NAME': 'streamevents_db',  # MOD: Nom BBDD
+        'NAME': os.environ.get('DB_NAME', 'streamevents_db'),  # MOD: Nom BBDD
         'ENFORCE_SCHEMA': True,  # MOD: Validació d'esquema
+        # Connexió persistent: el pool de pymongo no es tanca en cada petició
+        'CONN_MAX_AGE': None,
         'CLIENT': {  # MOD
-            'host': 'mongodb://localhost:27017'  # MOD: Connexió Mongo
+            'host': os.environ.get('MONGO_URL', 'mongodb://localhost:27017'),  # MOD: Connexió Mongo
+            'appname': 'streamevents',
+            # Màxim per procés (fils del servidor + pool de les vistes asíncrones)
+            'maxPoolSize': int(os.environ.get('MONGO_MAX_POOL_SIZE', 50)),
+            # Connexions que pymongo manté obertes encara que estiguin inactives
+            'minPoolSize': int(os.environ.get('MONGO_MIN_POOL_SIZE', 10)),
+            'maxIdleTimeMS': int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 300000)),
+            # Espera màxima per una connexió lliure del pool abans de fallar
+            'waitQueueTimeoutMS': int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000)),
+            'connectTimeoutMS': int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+            'serverSelectionTimeoutMS': int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+            'socketTimeoutMS': int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 30000)),
+            'readPreference': os.environ.get('MONGO_READ_PREFERENCE', 'primary'),
         }  # MOD
     }  # MOD
 }
+# Vistes que llegeixen els llistats directament amb pymongo (events.repository)
+# en lloc de l'ORM: event_list, events_by_category, event_detail, my_events
+EVENT_MONGO_READ_VIEWS = [name for name in os.environ.get('MONGO_READ_VIEWS', '').split(',') if name]
+
+# Memòria cau (targetes d'esdeveniments renderitzades). En producció amb
+# diversos processos convé una memòria compartida (Redis/Memcached).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'streamevents',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+EVENT_CARD_CACHE_TIMEOUT = 60 * 60 * 24  # Segons; la clau ja inclou updated_at
+
+# Fluxos SSE de canvis d'estat: segons entre heartbeats i entre consultes del
+# vigilant de canvis fets per altres processos (0 el desactiva)
+EVENT_STREAM_HEARTBEAT = 15
+EVENT_STREAM_POLL_INTERVAL = 2
+
+# Miniatures de les portades (events.thumbnails): fils del pool de
+# generació (0 = dins de la mateixa petició) i amplades generades
+EVENT_THUMBNAIL_WORKERS = 2
+EVENT_THUMBNAIL_WIDTHS = (320, 640, 1280)
+
+# Presència d'espectadors (límit max_viewers). CachePresenceStore fa servir
+# la memòria cau 'default': amb diversos processos ha de ser compartida.
+EVENT_PRESENCE_STORE = 'events.presence.CachePresenceStore'
+EVENT_PRESENCE_HEARTBEAT = 15
+
+# Forma part dels ETag de les pàgines HTML (events.conditional): cada
+# desplegament amb plantilles noves invalida les còpies dels navegadors
+PAGE_ETAG_VERSION = os.environ.get('RELEASE_VERSION', '')
+
+# Mètriques Prometheus a /metrics/: usuaris staff, el token (capçalera
+# 'Authorization: Bearer ...') o aquestes IPs, separades per comes. Cap per
+# defecte: darrere d'un proxy local totes les peticions venen de 127.0.0.1
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'default': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'default'},
+    },
+    'loggers': {
+        'events': {'handlers': ['console'], 'level': 'INFO'},
+        'users': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -72,14 +149,33 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = '/static/'  # MOD: Afegit slash inicial per consistència
-# STATICFILES_DIRS = [BASE_DIR / 'static']  # MOD (opcional si tens carpeta pròpia)
-# STATIC_ROOT = BASE_DIR / 'staticfiles'  # MOD (per desplegament)
+STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Producció: collectstatic desa noms amb hash (staticfiles.json) i variants
+# .gz/.br, i config.staticfiles.StaticFilesMiddleware les serveix
+if not DEBUG:
+    STATICFILES_STORAGE = 'config.staticfiles.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'  # MOD: Suport fitxers pujats
 MEDIA_ROOT = BASE_DIR / 'media'  # MOD: Directori media
 
+# Calculen el hash de cada fitxer mentre es rep (config/storage.py)
+FILE_UPLOAD_HANDLERS = [
+    'config.storage.HashingMemoryFileUploadHandler',
+    'config.storage.HashingTemporaryFileUploadHandler',
+]
+
 AUTH_USER_MODEL = 'users.CustomUser'  # MOD: Model d'usuari personalitzat (definir abans primer migrate)
 
+# Login amb nom d'usuari o email: una consulta indexada i un sol hash
+AUTHENTICATION_BACKENDS = ['users.backends.UsernameOrEmailBackend']
+
+# Filtres de disponibilitat de noms i emails (users.availability): segons
+# entre lectures dels usuaris nous i entre reconstruccions completes
+USER_AVAILABILITY_REFRESH = 10
+USER_AVAILABILITY_REBUILD = 60 * 60
+
 LOGIN_URL = 'login'  # MOD: Nom URL login
 LOGIN_REDIRECT_URL = 'home'  # MOD: Destí després d'iniciar sessió
 LOGOUT_REDIRECT_URL = 'login'  # MOD: Destí després de tancar sessió
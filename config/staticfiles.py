@@ -0,0 +1,238 @@
+"""
+Fitxers estàtics de producció sense servidor a part.
+
+- ``CompressedManifestStaticFilesStorage``: ``collectstatic`` hi desa cada
+  fitxer amb el hash del contingut al nom (``main.3f2a1c.css``, via
+  ``staticfiles.json``) i, per als formats de text, les variants ``.gz`` i
+  ``.br`` (Brotli, si el paquet ``brotli`` hi és) ja comprimides.
+- ``StaticFilesMiddleware``: serveix ``STATIC_ROOT`` des del procés (WSGI o
+  ASGI). L'índex de fitxers es llegeix una sola vegada, així que cada
+  petició només obre el fitxer. Tria la variant segons ``Accept-Encoding``
+  i, als noms amb hash, respon amb ``Cache-Control`` immutable: en tornar a
+  carregar una pàgina el navegador no demana cap CSS ni JS.
+"""
+import asyncio
+import gzip
+import json
+import mimetypes
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # Opcional: sense el paquet només es generen els .gz
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Noms sense hash (p. ex. enllaços antics): poc temps i revalidació
+MUTABLE_CACHE_CONTROL = 'public, max-age=60'
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.ttf', '.otf', '.eot'}
+# Variant → (extensió, Content-Encoding), per ordre de preferència
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+# Una variant que no estalvia almenys un 5% no es desa
+MIN_SAVING = 0.95
+
+
+def compress_gzip(data):
+    # mtime=0: el mateix contingut dona sempre el mateix .gz
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def compress_brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+def compressors():
+    yield '.gz', compress_gzip
+    if brotli is not None:
+        yield '.br', compress_brotli
+
+
+def compress_file(path):
+    """Desa les variants comprimides de ``path`` que valguin la pena; en retorna les extensions"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    for extension, compress in compressors():
+        compressed = compress(data)
+        if len(compressed) < len(data) * MIN_SAVING:
+            with open(path + extension, 'wb') as f:
+                f.write(compressed)
+            written.append(extension)
+        elif os.path.exists(path + extension):
+            # Variant d'un contingut anterior
+            os.remove(path + extension)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest amb hash als noms i variants .gz/.br precomprimides"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run=dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.add(name)
+                if hashed_name:
+                    names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                compress_file(self.path(name))
+
+
+class StaticAsset:
+    __slots__ = ('path', 'size', 'mtime', 'content_type', 'variants', 'immutable', 'etag')
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = int(stat.st_mtime)
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.immutable = immutable
+        self.etag = self.variant_etag(None)
+        # Content-Encoding → (camí, mida, ETag)
+        self.variants = {}
+        for extension, encoding in ENCODINGS:
+            if os.path.isfile(path + extension):
+                self.variants[encoding] = (path + extension, os.path.getsize(path + extension), self.variant_etag(encoding))
+
+    def variant_etag(self, encoding):
+        # Cada codificació és una representació diferent: no poden compartir un ETag fort
+        suffix = f'-{encoding}' if encoding else ''
+        return f'"{self.size:x}-{self.mtime:x}{suffix}"'
+
+    def select(self, request):
+        """``(camí, mida, codificació, ETag)`` de la variant per a ``Accept-Encoding``"""
+        accepted = accepted_encodings(request)
+        for encoding, (path, size, etag) in self.variants.items():
+            if encoding in accepted:
+                return path, size, encoding, etag
+        return self.path, self.size, None, self.etag
+
+
+def hashed_names(root):
+    """Noms amb hash del manifest (``staticfiles.json``) de ``root``"""
+    try:
+        with open(os.path.join(root, ManifestStaticFilesStorage.manifest_name), encoding='utf-8') as f:
+            return set(json.load(f).get('paths', {}).values())
+    except (OSError, ValueError):
+        return set()
+
+
+def build_index(root):
+    """Ruta relativa (amb ``/``) → ``StaticAsset`` de tots els fitxers de ``root``"""
+    index = {}
+    if not root or not os.path.isdir(root):
+        return index
+    immutable = hashed_names(root)
+    compressed = tuple(extension for extension, _ in ENCODINGS)
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            if filename.endswith(compressed):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            index[name] = StaticAsset(path, name in immutable)
+    return index
+
+
+def accepted_encodings(request):
+    """Codificacions d'``Accept-Encoding`` amb q > 0"""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """
+    Serveix ``STATIC_ROOT`` abans de la resta de middleware. Si
+    ``collectstatic`` no s'ha executat l'índex és buit i la petició segueix
+    (en desenvolupament els estàtics els serveix ``runserver``). L'índex es
+    llegeix en la primera petició: un desplegament nou reinicia el procés.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+        self._index = None
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = build_index(self.root)
+        return self._index
+
+    def find(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        return self.index.get(request.path_info[len(self.prefix):])
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        asset = self.find(request)
+        if asset is None:
+            return self.get_response(request)
+        return self.serve(request, asset)
+
+    async def __acall__(self, request):
+        # Consulta en memòria (l'índex només es llegeix del disc la primera vegada)
+        asset = self.find(request)
+        if asset is None:
+            return await self.get_response(request)
+        return await sync_to_async(self.serve, thread_sensitive=False)(request, asset)
+
+    def serve(self, request, asset):
+        cache_control = IMMUTABLE_CACHE_CONTROL if asset.immutable else MUTABLE_CACHE_CONTROL
+        # If-None-Match es compara amb l'ETag de la variant que es serviria
+        path, size, encoding, etag = asset.select(request)
+        response = get_conditional_response(request, etag=etag, last_modified=asset.mtime)
+        if response is None:
+            if request.method == 'HEAD':
+                response = HttpResponse()
+            elif isinstance(request, ASGIRequest):
+                # Django 4.1 recorre la resposta dins del bucle d'esdeveniments:
+                # el fitxer (petit) es llegeix aquí, en un fil
+                with open(path, 'rb') as f:
+                    response = HttpResponse(f.read())
+            else:
+                response = FileResponse(open(path, 'rb'))
+                # FileResponse hi posa el nom del fitxer (el .gz/.br inclòs)
+                del response['Content-Disposition']
+            response['Content-Type'] = asset.content_type
+            response['Content-Length'] = size
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Last-Modified'] = http_date(asset.mtime)
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        if asset.variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -0,0 +1,159 @@
+"""
+Emmagatzematge adreçat per contingut per a avatars i portades.
+
+Cada fitxer es desa una sola vegada a ``blobs/ab/cd/<sha256><ext>``: si dos
+usuaris pugen la mateixa imatge (o la mateixa persona la torna a pujar),
+el segon desat no escriu res. Com que el nom depèn del contingut, un fitxer
+no canvia mai i es pot servir amb capçaleres de memòria cau immutables.
+
+El hash es calcula mentre es rep la petició (``HashingMemoryFileUploadHandler``
+i ``HashingTemporaryFileUploadHandler`` a ``FILE_UPLOAD_HANDLERS``), així que
+detectar un duplicat no torna a llegir el fitxer. Si el contingut no ve d'una
+pujada, ``ContentAddressedStorage`` el llegeix a blocs, el hasheja mentre
+l'escriu a un temporal i el mou al seu nom definitiu.
+
+Els blobs es poden compartir entre registres: l'aplicació no els esborra.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.views.static import serve
+
+BLOB_PREFIX = 'blobs'
+CHUNK_SIZE = 64 * 1024
+
+# Bytes inicials que calen per reconèixer el format
+HEADER_BYTES = 16
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def sniff_image(head):
+    """
+    Extensió del format d'imatge a partir de la capçalera (els primers
+    ``HEADER_BYTES`` bytes), o ``None`` si no és cap format acceptat.
+    """
+    if head.startswith(b'\xff\xd8\xff'):
+        return '.jpg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return '.png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return '.gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+def read_head(content):
+    """Capçalera d'un fitxer, la calculada en pujar-lo o llegint-la (sense moure'n la posició)"""
+    head = getattr(content, 'content_head', None)
+    if head is not None:
+        return head
+    position = content.tell()
+    content.seek(0)
+    head = content.read(HEADER_BYTES)
+    content.seek(position)
+    return head
+
+
+def blob_name(digest, extension):
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+class HashingUploadMixin:
+    """Calcula el SHA-256 i la capçalera dels blocs que accepta aquest handler"""
+
+    def new_file(self, *args, **kwargs):
+        # Abans de super(): MemoryFileUploadHandler hi llança StopFutureHandlers
+        self.hasher = hashlib.sha256()
+        self.head = b''
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        # None: el bloc és d'aquest handler (si no, passa al següent de la llista)
+        if remaining is None:
+            self.hasher.update(raw_data)
+            if len(self.head) < HEADER_BYTES:
+                self.head += raw_data[:HEADER_BYTES - len(self.head)]
+        return remaining
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.content_hash = self.hasher.hexdigest()
+            uploaded.content_head = self.head
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    ``FileSystemStorage`` que ignora el nom proposat (``upload_to``) i desa
+    cada contingut amb el seu hash. ``save`` retorna el nom del blob.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # El nom definitiu el decideix _save a partir del contingut
+        return name
+
+    def _save(self, name, content):
+        extension = sniff_image(read_head(content)) or os.path.splitext(name)[1].lower()
+        digest = getattr(content, 'content_hash', None)
+        if digest is not None and self.exists(blob_name(digest, extension)):
+            # Duplicat conegut abans d'escriure: no es toca el disc
+            return blob_name(digest, extension)
+
+        temp_dir = os.path.join(self.location, BLOB_PREFIX)
+        os.makedirs(temp_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir, prefix='.upload-')
+        try:
+            hasher = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    hasher.update(chunk)
+                    f.write(chunk)
+            name = blob_name(hasher.hexdigest(), extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temp_path)
+                return name
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            # Atòmic: dues pujades simultànies del mateix contingut escriuen el mateix
+            os.replace(temp_path, full_path)
+            return name
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+_blob_storage = None
+
+
+def get_blob_storage():
+    """Emmagatzematge dels ``ImageField`` d'avatars i portades"""
+    global _blob_storage
+    if _blob_storage is None:
+        _blob_storage = ContentAddressedStorage()
+    return _blob_storage
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """``django.views.static.serve`` amb capçaleres immutables per als blobs"""
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if path.startswith(BLOB_PREFIX + '/') and response.status_code == 200:
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
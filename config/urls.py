@@ -5,12 +5,17 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 
+from .metrics import metrics_view
+from .storage import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', TemplateView.as_view(template_name='base.html'), name='home'),  # o la teva vista principal
     path('users/', include('users.urls', namespace='users')),
     path('events/', include('events.urls')),
+    path('api/v1/', include('events.api_urls', namespace='api-v1')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
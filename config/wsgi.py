@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Pool de MongoDB obert (i mètriques del pool actives) abans de la primera consulta
+from config import mongo  # noqa: E402
+
+mongo.warm()
+
+# Filtres de disponibilitat de noms i emails construïts abans de la primera petició
+from users.availability import warm  # noqa: E402
+
+warm()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Event
+from .models import Event, Tag
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
@@ -25,4 +25,12 @@ class EventAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'event_count')
+    search_fields = ('name', 'slug')
+    readonly_fields = ('event_count',)
+    ordering = ('-event_count', 'slug')
\ No newline at end of file
@@ -0,0 +1,231 @@
+"""
+API JSON de lectura (``/api/v1/``) per a l'aplicació mòbil i els socis.
+
+- Esdeveniments serialitzats directament de files ``values()``: només es
+  demanen les columnes dels camps sol·licitats amb ``?fields=`` (la
+  descripció només si s'hi inclou, el creador només si cal el JOIN).
+- Paginació per cursor (``events.pagination``) amb ``?cursor=`` i
+  ``?page_size=``.
+- ``ETag`` fort calculat sobre el cos: amb ``If-None-Match`` coincident es
+  respon 304 sense cos.
+
+La versió forma part de la ruta; una v2 incompatible tindria el seu mòdul.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_GET
+
+from .models import Event, parse_tags
+from .pagination import ORDER_BY_CREATED, ORDER_BY_SCHEDULED, CursorPaginator
+
+User = get_user_model()
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+API_CACHE_CONTROL = 'public, max-age=30'
+
+ORDERINGS = {'created': ORDER_BY_CREATED, 'scheduled': ORDER_BY_SCHEDULED}
+
+CATEGORY_NAMES = dict(Event.CATEGORY_CHOICES)
+STATUS_NAMES = dict(Event.STATUS_CHOICES)
+
+
+def _file_url(name):
+    return Event._meta.get_field('thumbnail').storage.url(name) if name else None
+
+
+# Camp de l'API → (columnes de values() que necessita, funció que el construeix)
+EVENT_FIELDS = {
+    'id': (('pk',), lambda row: row['pk']),
+    'title': (('title',), lambda row: row['title']),
+    'description': (('description',), lambda row: row['description']),
+    'category': (('category',), lambda row: row['category']),
+    'category_name': (('category',), lambda row: str(CATEGORY_NAMES.get(row['category'], ''))),
+    'status': (('status',), lambda row: row['status']),
+    'status_name': (('status',), lambda row: str(STATUS_NAMES.get(row['status'], ''))),
+    'scheduled_date': (('scheduled_date',), lambda row: row['scheduled_date']),
+    'thumbnail': (('thumbnail',), lambda row: _file_url(row['thumbnail'])),
+    'max_viewers': (('max_viewers',), lambda row: row['max_viewers']),
+    'is_featured': (('is_featured',), lambda row: row['is_featured']),
+    'tags': (('tags',), lambda row: parse_tags(row['tags'])),
+    'stream_url': (('stream_url',), lambda row: row['stream_url'] or None),
+    'creator': (('creator__username',), lambda row: row['creator__username']),
+    'created_at': (('created_at',), lambda row: row['created_at']),
+    'updated_at': (('updated_at',), lambda row: row['updated_at']),
+    'url': (('pk',), lambda row: reverse('events:event_detail', args=[row['pk']])),
+}
+
+# Sense ?fields=: tot menys els camps llargs
+DEFAULT_EVENT_FIELDS = tuple(name for name in EVENT_FIELDS if name not in ('description', 'stream_url'))
+
+
+class BadRequest(ValueError):
+    """Paràmetre invàlid: es respon 400 amb el missatge"""
+
+
+def parse_fields(request):
+    value = request.GET.get('fields', '').strip()
+    if not value:
+        return DEFAULT_EVENT_FIELDS
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in EVENT_FIELDS]
+    if unknown:
+        raise BadRequest(f"Camps desconeguts: {', '.join(unknown)}")
+    return fields
+
+
+def event_columns(fields, ordering=()):
+    """Columnes de values(): les dels camps i les de l'ordenació (per al cursor)"""
+    columns = {}
+    for name in fields:
+        columns.update(dict.fromkeys(EVENT_FIELDS[name][0]))
+    columns.update(dict.fromkeys(name.lstrip('-') for name in ordering))
+    return tuple(columns)
+
+
+def serialize_event(row, fields):
+    return {name: EVENT_FIELDS[name][1](row) for name in fields}
+
+
+def parse_page_size(request):
+    try:
+        page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('page_size ha de ser un enter')
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def api_response(request, data, status=200):
+    """JSON compacte amb ETag fort; 304 si el client ja el té"""
+    body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['Cache-Control'] = API_CACHE_CONTROL
+        return not_modified
+    response = HttpResponse(body, status=status, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = API_CACHE_CONTROL
+    return response
+
+
+def api_error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def event_page(request, queryset):
+    fields = parse_fields(request)
+    ordering = ORDERINGS.get(request.GET.get('ordering', 'created'))
+    if ordering is None:
+        raise BadRequest(f"ordering ha de ser un de: {', '.join(ORDERINGS)}")
+    columns = event_columns(fields, ordering)
+    paginator = CursorPaginator(queryset.values(*columns), ordering=ordering, page_size=parse_page_size(request))
+    page = paginator.get_page(request.GET.get('cursor'))
+    return {
+        'results': [serialize_event(row, fields) for row in page.object_list],
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    }
+
+
+def filter_events(request, queryset):
+    category = request.GET.get('category', '')
+    if category:
+        if category not in CATEGORY_NAMES:
+            raise BadRequest(f'Categoria desconeguda: {category}')
+        queryset = queryset.filter(category=category)
+    status = request.GET.get('status', '')
+    if status:
+        if status not in STATUS_NAMES:
+            raise BadRequest(f'Estat desconegut: {status}')
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def api_view(view):
+    """GET només, i els BadRequest es tornen 400"""
+    @require_GET
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return api_error(str(e))
+    return wrapped
+
+
+@api_view
+def event_list(request):
+    return api_response(request, event_page(request, filter_events(request, Event.objects.all())))
+
+
+@api_view
+def event_detail(request, pk):
+    fields = parse_fields(request)
+    row = Event.objects.filter(pk=pk).values(*event_columns(fields)).first()
+    if row is None:
+        return api_error('Esdeveniment no trobat', status=404)
+    return api_response(request, serialize_event(row, fields))
+
+
+@api_view
+def category_list(request):
+    counts = dict(
+        Event.objects.order_by().values('category').annotate(n=Count('pk')).values_list('category', 'n')
+    )
+    return api_response(request, {'results': [
+        {
+            'slug': slug,
+            'name': str(name),
+            'event_count': counts.get(slug, 0),
+            'events': f"{reverse('api-v1:event_list')}?category={slug}",
+        }
+        for slug, name in Event.CATEGORY_CHOICES
+    ]})
+
+
+def _creator(username):
+    return (
+        User.objects.filter(username=username)
+        .values('pk', 'username', 'display_name', 'bio', 'event_stats__total')
+        .first()
+    )
+
+
+@api_view
+def creator_detail(request, username):
+    creator = _creator(username)
+    if creator is None:
+        return api_error('Creador no trobat', status=404)
+    return api_response(request, {
+        'username': creator['username'],
+        'display_name': creator['display_name'],
+        'bio': creator['bio'],
+        'event_count': creator['event_stats__total'] or 0,
+        'events': reverse('api-v1:creator_events', args=[creator['username']]),
+    })
+
+
+@api_view
+def creator_events(request, username):
+    creator_id = User.objects.filter(username=username).values_list('pk', flat=True).first()
+    if creator_id is None:
+        return api_error('Creador no trobat', status=404)
+    queryset = filter_events(request, Event.objects.filter(creator_id=creator_id))
+    return api_response(request, event_page(request, queryset))
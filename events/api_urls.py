@@ -0,0 +1,12 @@
+from django.urls import path
+from . import api
+
+app_name = 'api-v1'
+
+urlpatterns = [
+    path('events/', api.event_list, name='event_list'),
+    path('events/<int:pk>/', api.event_detail, name='event_detail'),
+    path('categories/', api.category_list, name='category_list'),
+    path('creators/<str:username>/', api.creator_detail, name='creator_detail'),
+    path('creators/<str:username>/events/', api.creator_events, name='creator_events'),
+]
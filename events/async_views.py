@@ -0,0 +1,107 @@
+"""
+Versions asíncrones de les vistes públiques (``ASYNC_VIEWS = True``).
+
+Sota ``config.asgi`` una vista síncrona ocupa un fil durant tota la
+petició. Aquí les consultes independents (p. ex. la pàgina i els destacats,
+o la pàgina i el recompte) es llancen alhora amb ``gather_queries``, cadascuna
+en un fil del pool, i la renderització es fa amb ``sync_to_async``.
+
+La lògica és la de ``events.views``: aquest mòdul només canvia com
+s'encadenen les crides. El detall i la categoria primer calculen el
+validador (``events.conditional``) i, sense 304, ja només els queda una
+consulta de dades.
+"""
+import asyncio
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+from .conditional import not_modified, page_etag, set_validators
+from .models import Event
+from . import views
+
+
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+async def gather_queries(*funcs):
+    """
+    Executa funcions síncrones independents alhora i en retorna els
+    resultats en ordre.
+
+    Amb ``thread_sensitive=False`` cada crida va a un fil del pool per
+    defecte, i cada fil manté la seva pròpia connexió (tantes com fils té el
+    pool). Les crides no han de compartir instàncies de model.
+    """
+    # Dins d'una transacció (ATOMIC_REQUESTS, proves) els altres fils no
+    # veurien les dades: s'executen en sèrie amb la connexió de la petició
+    if await sync_to_async(_in_transaction)():
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(*(sync_to_async(func, thread_sensitive=False)() for func in funcs))
+
+
+async def event_list_view(request):
+    """Vista per llistar esdeveniments amb gestió d'errors"""
+    try:
+        search_form, filters = views.list_filters(request)
+        if filters:
+            [page] = await gather_queries(partial(views.list_page, request, filters))
+            featured = []
+        else:
+            page, featured = await gather_queries(
+                partial(views.list_page, request, filters),
+                views.featured_events,
+            )
+        return await sync_to_async(views.render_event_list)(
+            request, page, featured, search_form, bool(filters)
+        )
+    except Exception as e:
+        return await sync_to_async(views.render_event_list_error)(request, e)
+
+
+async def event_detail_view(request, pk):
+    try:
+        state = await sync_to_async(views.detail_state)(pk)
+        etag = views.detail_etag(request, pk, state)
+        if etag is not None:
+            response = not_modified(request, etag, state['latest'])
+            if response is not None:
+                return response
+
+        try:
+            event = await Event.objects.select_related('creator').aget(pk=pk)
+        except Event.DoesNotExist:
+            return await sync_to_async(views.event_not_found)(request, pk)
+
+        has_creator = views.creator_exists(event)
+
+        def resolve_is_creator():
+            # request.user és perezós: la sessió es carrega aquí
+            return has_creator and request.user.is_authenticated and request.user.pk == event.creator_id
+
+        # El recompte ja ve del validador
+        is_creator = await sync_to_async(resolve_is_creator)() if has_creator else False
+        creator_events_count = state['total'] if has_creator else 0
+
+        response = await sync_to_async(views.render_event_detail)(request, event, is_creator, creator_events_count)
+        return set_validators(response, etag, state['latest']) if etag else response
+    except Exception as e:
+        return await sync_to_async(views.event_detail_error)(request, pk, e)
+
+
+async def events_by_category_view(request, category):
+    # Verificar que la categoria existeix
+    if category not in dict(Event.CATEGORY_CHOICES):
+        return await sync_to_async(views.invalid_category)(request)
+
+    state = await sync_to_async(views.category_state)(category)
+    etag = page_etag(request, 'category', category, request.GET.urlencode(), state['latest'], state['total'])
+    response = not_modified(request, etag, state['latest'])
+    if response is not None:
+        return response
+
+    [page] = await gather_queries(partial(views.category_page, request, category))
+    response = await sync_to_async(views.render_events_by_category)(request, category, page, state['total'])
+    return set_validators(response, etag, state['latest'])
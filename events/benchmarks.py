@@ -0,0 +1,272 @@
+"""
+Banc de proves de rendiment de les vistes (``manage.py benchmark_views``).
+
+Cada conjunt de dades (1k, 100k, 1M esdeveniments) es genera de forma
+reproduïble amb ``seed_events --bulk --seed`` i les vistes es recorren amb
+el client de proves de Django. Per a cada vista es mesura la latència
+(p50/p95/p99), el nombre de consultes i el pic de memòria; el resultat és un
+diccionari serialitzable a JSON per comparar-lo entre commits.
+
+Les consultes i la memòria es mesuren en peticions a part: ni
+``CaptureQueriesContext`` ni ``tracemalloc`` afecten les latències.
+
+Amb ``concurrency > 1`` les peticions mesurades es llancen en ràfegues
+concurrents a través del handler ASGI (``AsyncClient``), com faria uvicorn;
+així es comparen les vistes síncrones i les asíncrones (``ASYNC_VIEWS``).
+Amb ``--mongo-reads`` es mesuren també les vistes amb la lectura directa
+per pymongo (``events.repository``) al costat de les de l'ORM.
+"""
+import asyncio
+import math
+import platform
+import re
+import subprocess
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection
+from django.conf import settings
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import repository
+from .models import Event
+
+User = get_user_model()
+
+DATASETS = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+BENCHMARK_PASSWORD = 'password123'
+
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+# Mètriques comparades entre execucions (més alt = pitjor)
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_memory_kb')
+
+
+def percentile(samples, pct):
+    """Percentil pel mètode del rang més proper"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def seed_dataset(size, seed, workers=None, stdout=None):
+    """
+    Buida la base de dades i genera ``size`` esdeveniments repartits entre
+    ``size // 200`` creadors (mínim 10), tots amb ``BENCHMARK_PASSWORD``.
+    """
+    call_command('flush', interactive=False, verbosity=0)
+
+    password = make_password(BENCHMARK_PASSWORD)
+    User.objects.bulk_create(
+        [
+            User(
+                username=f'bench{i}',
+                email=f'bench{i}@streamevents.com',
+                email_normalized=f'bench{i}@streamevents.com',
+                password=password,
+            )
+            for i in range(max(10, size // 200))
+        ],
+        batch_size=1000,
+    )
+    call_command('seed_events', bulk=True, events=size, seed=seed, workers=workers, stdout=stdout)
+
+
+def dataset_ready(size):
+    return User.objects.filter(username='bench0').exists() and Event.objects.count() == size
+
+
+def build_scenarios():
+    """
+    Peticions a mesurar. Sempre es fan servir el mateix esdeveniment (el de
+    pk més baix) i el seu creador, perquè els resultats siguin comparables.
+    """
+    event = Event.objects.order_by('pk').only('pk', 'category', 'creator_id').first()
+    if event is None:
+        raise ValueError("No hi ha esdeveniments: genera primer un conjunt de dades")
+    creator = User.objects.get(pk=event.creator_id)
+
+    return [
+        {'name': 'event_list', 'url': reverse('events:event_list')},
+        {'name': 'event_detail', 'url': reverse('events:event_detail', args=[event.pk])},
+        {'name': 'events_by_category', 'url': reverse('events:events_by_category', args=[event.category])},
+        {'name': 'my_events', 'url': reverse('events:my_events'), 'user': creator},
+        {'name': 'login', 'url': reverse('users:login')},
+        {
+            'name': 'login_submit',
+            'url': reverse('users:login'),
+            'data': {'username': creator.email, 'password': BENCHMARK_PASSWORD},
+        },
+        {'name': 'public_profile', 'url': reverse('users:public_profile', args=[creator.username])},
+    ]
+
+
+def measure(scenario, iterations=50, warmup=5, concurrency=1):
+    client = Client()
+    if scenario.get('user'):
+        client.force_login(scenario['user'])
+
+    def request():
+        if 'data' in scenario:
+            return client.post(scenario['url'], scenario['data'])
+        return client.get(scenario['url'])
+
+    for _ in range(warmup):
+        request()
+
+    with CaptureQueriesContext(connection) as queries:
+        response = request()
+    status_code = response.status_code
+    # Server-Timing (config.metrics) compta també les consultes fetes des
+    # d'altres fils (vistes asíncrones); CaptureQueriesContext només veu
+    # la connexió d'aquest fil i llegeix el registre en accedir-hi
+    match = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+    query_count = int(match.group(1)) if match else len(queries.captured_queries)
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        timings = asyncio.run(_measure_concurrent(scenario, client.cookies, iterations, concurrency))
+    else:
+        timings = []
+        for _ in range(iterations):
+            request_started = time.perf_counter()
+            request()
+            timings.append((time.perf_counter() - request_started) * 1000)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': scenario['url'],
+        'status_code': status_code,
+        'iterations': iterations,
+        'concurrency': concurrency,
+        'throughput_rps': round(len(timings) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3) if timings else 0.0,
+        'queries': query_count,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+async def _measure_concurrent(scenario, cookies, iterations, concurrency):
+    client = AsyncClient()
+    client.cookies = cookies  # mateixa sessió que el client síncron
+
+    async def timed():
+        started = time.perf_counter()
+        if 'data' in scenario:
+            # Formulari codificat a mà: l'AsyncClient de Django 4.1 falla amb multipart
+            await client.post(
+                scenario['url'], urlencode(scenario['data']), content_type='application/x-www-form-urlencoded'
+            )
+        else:
+            await client.get(scenario['url'])
+        return (time.perf_counter() - started) * 1000
+
+    timings = []
+    for start in range(0, iterations, concurrency):
+        burst = min(concurrency, iterations - start)
+        timings += await asyncio.gather(*(timed() for _ in range(burst)))
+    return timings
+
+
+def run_views(iterations=50, warmup=5, only=None, concurrency=1):
+    """Mesura totes les vistes (o només les de ``only``) sobre la BBDD actual"""
+    results = {}
+    for scenario in build_scenarios():
+        if only and scenario['name'] not in only:
+            continue
+        results[scenario['name']] = measure(scenario, iterations, warmup, concurrency)
+    return results
+
+
+# Vistes amb camí de lectura directe per pymongo (events.repository)
+MONGO_READ_VIEWS = ('event_list', 'event_detail', 'events_by_category', 'my_events')
+
+
+def run_mongo_reads(iterations=50, warmup=5, only=None, concurrency=1):
+    """
+    Torna a mesurar les vistes de ``MONGO_READ_VIEWS`` amb la lectura per
+    pymongo activada, amb el nom ``<vista>@pymongo`` per comparar-les amb
+    les de l'ORM a la mateixa taula.
+    """
+    if not repository.available():
+        raise ValueError('Les lectures per pymongo només funcionen amb MongoDB (djongo)')
+    results = {}
+    for scenario in build_scenarios():
+        name = scenario['name']
+        if name not in MONGO_READ_VIEWS or (only and name not in only):
+            continue
+        with override_settings(EVENT_MONGO_READ_VIEWS=[name]):
+            results[f'{name}@pymongo'] = measure(scenario, iterations, warmup, concurrency)
+    return results
+
+
+def metadata(iterations, warmup, seed, concurrency=1):
+    return {
+        'created_at': timezone.now().isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'iterations': iterations,
+        'warmup': warmup,
+        'seed': seed,
+        'concurrency': concurrency,
+        'async_views': settings.ASYNC_VIEWS,
+    }
+
+
+def compare(previous, current, threshold=10.0):
+    """
+    Compara dos resultats i retorna ``[(dataset, vista, mètrica, abans, ara,
+    canvi_pct, és_regressió), ...]`` per a les vistes presents a tots dos.
+    """
+    rows = []
+    for dataset, run in current.get('datasets', {}).items():
+        before_views = previous.get('datasets', {}).get(dataset, {}).get('views', {})
+        for view, after in run.get('views', {}).items():
+            before = before_views.get(view)
+            if not before:
+                continue
+            for metric in COMPARED_METRICS:
+                old, new = before.get(metric), after.get(metric)
+                if old is None or new is None:
+                    continue
+                change = ((new - old) / old * 100) if old else (100.0 if new else 0.0)
+                # El recompte de consultes és exacte: qualsevol augment és regressió
+                regression = new > old if metric == 'queries' else change > threshold
+                rows.append((dataset, view, metric, old, new, round(change, 1), regression))
+    return rows
@@ -0,0 +1,152 @@
+"""
+Calendaris iCalendar (RFC 5545) per subscriure-s'hi des d'aplicacions de
+calendari: tots els propers, per categoria i per creador.
+
+Els clients de calendari consulten el feed sovint, així que cada petició
+calcula primer l'ETag amb una sola agregació (``Max('updated_at')`` i
+``Count``): si el client ja té aquesta versió rep un 304 sense generar res.
+Si no, el cos es genera en streaming a partir d'un iterador per blocs de
+``values_list``, sense carregar tots els esdeveniments en memòria.
+
+Amb ASGI, Django 4.1 recorre les respostes en streaming dins del bucle
+d'esdeveniments, on no es pot consultar la base de dades: allà les files
+(com a molt ``FEED_LIMIT``) es llegeixen abans i només la codificació va
+en streaming.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+
+from .models import Event
+
+FEED_LIMIT = 1000
+CHUNK_SIZE = 200
+FEED_CACHE_CONTROL = 'public, max-age=300'
+
+FEED_FIELDS = ('pk', 'title', 'description', 'category', 'scheduled_date', 'status', 'updated_at')
+
+# Ordre de les files abans del límit: els feeds de categoria i creador
+# guarden els FEED_LIMIT més recents; el de propers, els més pròxims
+LATEST_FIRST = ('-scheduled_date', '-pk')
+SOONEST_FIRST = ('scheduled_date', 'pk')
+
+# Durada per categoria (Event.get_duration) calculada una sola vegada
+DURATIONS = {category: Event(category=category).get_duration() for category, _ in Event.CATEGORY_CHOICES}
+CATEGORY_NAMES = dict(Event.CATEGORY_CHOICES)
+
+# Els esdeveniments començats fa menys d'això (la durada més llarga) encara són "propers"
+UPCOMING_GRACE = timedelta(minutes=max(DURATIONS.values()))
+
+
+def upcoming_events(now=None):
+    """Programats o en directe que no han acabat, per al feed de propers (amb ``SOONEST_FIRST``)"""
+    now = now or timezone.now()
+    return Event.objects.filter(status__in=('scheduled', 'live'), scheduled_date__gte=now - UPCOMING_GRACE)
+
+
+def feed_etag(scope, events):
+    """ETag fort de la versió del feed: canvia amb qualsevol desat, alta o baixa"""
+    state = events.aggregate(latest=Max('updated_at'), total=Count('pk'))
+    latest = state['latest'].timestamp() if state['latest'] else 0
+    digest = hashlib.sha1(f'{scope}:{latest}:{state["total"]}'.encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def escape_text(value):
+    return (
+        (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '')
+    )
+
+
+def fold(line):
+    """Talla les línies a 75 octets (les continuacions comencen amb un espai)"""
+    data = line.encode()
+    if len(data) <= 75:
+        return data + b'\r\n'
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # No tallar un caràcter UTF-8 per la meitat
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end])
+        start, limit = end, 74
+    return b'\r\n '.join(parts) + b'\r\n'
+
+
+def format_utc(value):
+    if timezone.is_aware(value):
+        value = value.astimezone(timezone.utc)
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def vevent(row, base_url, domain):
+    pk, title, description, category, scheduled_date, status, updated_at = row
+    end = scheduled_date + timedelta(minutes=DURATIONS.get(category, Event.DEFAULT_DURATION))
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{pk}@{domain}',
+        f'DTSTAMP:{format_utc(updated_at)}',
+        f'LAST-MODIFIED:{format_utc(updated_at)}',
+        f'DTSTART:{format_utc(scheduled_date)}',
+        f'DTEND:{format_utc(end)}',
+        f'SUMMARY:{escape_text(title)}',
+        f'DESCRIPTION:{escape_text(description)}',
+        f'CATEGORIES:{escape_text(str(CATEGORY_NAMES.get(category, category)))}',
+        f'URL:{base_url}{reverse("events:event_detail", args=[pk])}',
+        f'STATUS:{"CANCELLED" if status == "cancelled" else "CONFIRMED"}',
+        'END:VEVENT',
+    ]
+    return b''.join(fold(line) for line in lines)
+
+
+def feed_rows(events, ordering=LATEST_FIRST):
+    rows = events.order_by(*ordering).values_list(*FEED_FIELDS)[:FEED_LIMIT]
+    return rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+def calendar_chunks(rows, name, base_url, domain):
+    yield b''.join(fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//StreamEvents//Calendari//CA',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ))
+    chunk = []
+    for row in rows:
+        chunk.append(vevent(row, base_url, domain))
+        if len(chunk) >= CHUNK_SIZE:
+            yield b''.join(chunk)
+            chunk = []
+    chunk.append(fold('END:VCALENDAR'))
+    yield b''.join(chunk)
+
+
+def calendar_response(request, scope, name, events, ordering=LATEST_FIRST):
+    """304 si el client ja té la versió; si no, el calendari en streaming"""
+    etag = feed_etag(scope, events)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['Cache-Control'] = FEED_CACHE_CONTROL
+        return not_modified
+
+    rows = feed_rows(events, ordering)
+    if isinstance(request, ASGIRequest):
+        rows = list(rows)
+    base_url = f'{request.scheme}://{request.get_host()}'
+    response = StreamingHttpResponse(
+        calendar_chunks(rows, name, base_url, request.get_host().split(':')[0]),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['ETag'] = etag
+    response['Cache-Control'] = FEED_CACHE_CONTROL
+    response['Content-Disposition'] = f'inline; filename="{scope.replace(":", "-")}.ics"'
+    return response
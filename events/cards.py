@@ -0,0 +1,76 @@
+"""
+Memòria cau de fragments per a les targetes d'esdeveniment.
+
+Cada targeta renderitzada es desa amb la clau ``(variant, pk, updated_at,
+idioma)``: qualsevol desat de l'esdeveniment canvia ``updated_at`` i, per
+tant, la clau. Els llistats demanen totes les targetes d'una pàgina amb un
+sol ``get_many`` i només renderitzen les que falten.
+
+Les dades del creador (``creator.username``) no formen part de la clau,
+així que els canvis d'usuari s'invaliden explícitament des dels senyals.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATES = {
+    'card': 'events/includes/event_card.html',
+    'compact': 'events/includes/event_card_compact.html',
+}
+
+CARD_TIMEOUT = getattr(settings, 'EVENT_CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def card_cache_key(pk, updated_at, variant='card', language=None):
+    language = language or translation.get_language() or settings.LANGUAGE_CODE
+    stamp = updated_at.timestamp() if updated_at else 0
+    return f'event_card:{variant}:{pk}:{stamp}:{language}'
+
+
+def render_cards(events, variant='card'):
+    """
+    Retorna ``[(event, html), ...]`` en el mateix ordre que ``events``.
+
+    Les targetes ja renderitzades surten de la memòria cau; la resta es
+    renderitzen i es desen amb un sol ``set_many``.
+    """
+    events = list(events)
+    if not events:
+        return []
+
+    template_name = CARD_TEMPLATES[variant]
+    keys = [card_cache_key(event.pk, event.updated_at, variant) for event in events]
+    cached = cache.get_many(keys)
+
+    rendered = {}
+    cards = []
+    for key, event in zip(keys, events):
+        html = cached.get(key)
+        if html is None:
+            html = render_to_string(template_name, {'event': event})
+            rendered[key] = str(html)
+        cards.append((event, mark_safe(html)))
+
+    if rendered:
+        cache.set_many(rendered, CARD_TIMEOUT)
+    return cards
+
+
+def _languages():
+    # Sense LocaleMiddleware tothom rep LANGUAGE_CODE; afegim l'idioma actiu
+    # per si la invalidació es fa des d'un context amb un altre idioma
+    return {settings.LANGUAGE_CODE, translation.get_language() or settings.LANGUAGE_CODE}
+
+
+def invalidate_cards(rows):
+    """Esborra les targetes de les parelles ``(pk, updated_at)`` donades"""
+    keys = [
+        card_cache_key(pk, updated_at, variant, language)
+        for pk, updated_at in rows
+        for variant in CARD_TEMPLATES
+        for language in _languages()
+    ]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,57 @@
+"""
+GET condicional (``ETag`` / ``Last-Modified``) per a les pàgines HTML.
+
+Cada vista calcula primer un validador amb una sola consulta indexada (p.
+ex. ``Max('updated_at')`` i ``Count`` del conjunt que mostra) i, si el
+navegador ja té aquesta versió, respon 304 abans de carregar res més o de
+renderitzar cap plantilla.
+
+Les pàgines depenen també de qui les mira (botons del creador, barra de
+navegació, token CSRF), així que l'ETag inclou les galetes de sessió i de
+CSRF: un canvi de sessió (login, logout) dona un ETag nou sense consultar
+la sessió. Amb missatges pendents no es respon mai 304 (s'han de mostrar),
+i ``PAGE_ETAG_VERSION`` permet invalidar-ho tot en desplegar plantilles.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+PAGE_CACHE_CONTROL = 'private, no-cache'
+
+# Galeta de django.contrib.messages.storage.cookie.CookieStorage
+MESSAGES_COOKIE = 'messages'
+
+
+def page_etag(request, *parts):
+    raw = '|'.join(str(part) for part in (
+        getattr(settings, 'PAGE_ETAG_VERSION', ''),
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME, ''),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ) + parts)
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def not_modified(request, etag, last_modified=None):
+    """Resposta 304 si el client ja té la versió, o ``None`` si cal renderitzar"""
+    if request.method not in ('GET', 'HEAD') or MESSAGES_COOKIE in request.COOKIES:
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    """Afegeix els validadors a una resposta 200 (o 304)"""
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Sempre es revalida, i mai en una memòria cau compartida (depèn de la sessió)
+    response['Cache-Control'] = PAGE_CACHE_CONTROL
+    patch_vary_headers(response, ('Cookie',))
+    return response
@@ -0,0 +1,83 @@
+"""
+Registre de proveïdors de streaming per convertir URLs en URLs d'embed.
+
+Cada proveïdor té un patró precompilat i una funció que construeix l'URL
+d'embed a partir del match. Els patrons s'ancoren a l'inici de l'URL perquè
+un altre host (``notyoutube.com``, ``?u=twitch.tv/...``) no hi coincideixi.
+La resolució es fa en desar l'esdeveniment (``Event.stream_embed_url``), no
+en renderitzar. Per afegir una plataforma
+n'hi ha prou amb ``register_provider``; després convé executar
+``manage.py resolve_embed_urls`` per actualitzar les files existents.
+"""
+import re
+
+from django.conf import settings
+
+
+class EmbedProvider:
+    def __init__(self, name, pattern, build):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.build = build
+
+    def resolve(self, url):
+        """URL d'embed, o ``None`` si ``url`` no és d'aquest proveïdor"""
+        match = self.pattern.search(url.strip())
+        return self.build(match) if match else None
+
+
+_providers = []
+
+
+def register_provider(name, pattern, build):
+    """Afegeix (o substitueix) un proveïdor; l'ordre de registre és l'ordre de prova"""
+    unregister_provider(name)
+    _providers.append(EmbedProvider(name, pattern, build))
+
+
+def unregister_provider(name):
+    _providers[:] = [provider for provider in _providers if provider.name != name]
+
+
+def get_providers():
+    return list(_providers)
+
+
+def embed_parent_host():
+    """Host que Twitch exigeix al paràmetre 'parent'"""
+    return settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+
+
+def resolve_embed_url(url):
+    """
+    Retorna l'URL d'embed per a ``url``.
+
+    Si cap proveïdor la reconeix es retorna la mateixa URL (plataformes
+    personalitzades); si no hi ha URL, ``''``.
+    """
+    if not url:
+        return ''
+    for provider in _providers:
+        embed_url = provider.resolve(url)
+        if embed_url:
+            return embed_url
+    return url
+
+
+# --- Proveïdors per defecte ---
+
+register_provider(
+    'youtube',
+    r'^(?:https?:\/\/)?(?:www\.|m\.)?youtube\.com\/(?:watch\?(?:.*&)?v=|live\/|shorts\/)([a-zA-Z0-9_-]+)',
+    lambda m: f"https://www.youtube.com/embed/{m.group(1)}",
+)
+register_provider(
+    'youtu.be',
+    r'^(?:https?:\/\/)?youtu\.be\/([a-zA-Z0-9_-]+)',
+    lambda m: f"https://www.youtube.com/embed/{m.group(1)}",
+)
+register_provider(
+    'twitch',
+    r'^(?:https?:\/\/)?(?:www\.)?twitch\.tv\/([a-zA-Z0-9_]+)',
+    lambda m: f"https://player.twitch.tv/?channel={m.group(1)}&parent={embed_parent_host()}",
+)
@@ -0,0 +1,61 @@
+# events/management/commands/backfill_tags.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from events.models import Event
+from events.tags import EventTag, backfill_tags, recount_tags
+
+
+class Command(BaseCommand):
+    help = "Omple les etiquetes normalitzades a partir del camp 'tags' per blocs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Esdeveniments processats per bloc (default: 1000)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help="Torna a crear les relacions de tots els esdeveniments (p. ex. després de canviar els slugs)"
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        rebuild = options['rebuild']
+
+        if rebuild:
+            events = Event.objects.only('pk', 'tags').order_by('pk')
+        else:
+            # Només els esdeveniments que encara no tenen cap relació d'etiqueta
+            tagged_ids = EventTag.objects.values('event_id')
+            events = (
+                Event.objects.exclude(tags='')
+                .exclude(pk__in=tagged_ids)
+                .only('pk', 'tags')
+                .order_by('pk')
+            )
+
+        processed = links = 0
+        last_pk = 0
+        while True:
+            chunk = list(events.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            if rebuild:
+                # Cada bloc es refà sencer: la resta continua servint-se mentrestant
+                with transaction.atomic():
+                    EventTag.objects.filter(event_id__in=[event.pk for event in chunk]).delete()
+                    links += backfill_tags(chunk)
+            else:
+                links += backfill_tags(chunk)
+            processed += len(chunk)
+            last_pk = chunk[-1].pk
+            self.stdout.write(f"   • {processed} esdeveniments processats...")
+
+        total_tags = recount_tags()
+        self.stdout.write(self.style.SUCCESS(
+            f"🏷️ {processed} esdeveniments, {links} relacions, {total_tags} etiquetes recomptades"
+        ))
@@ -0,0 +1,171 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from events import benchmarks, repository
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesura la latència (p50/p95/p99), les consultes i la memòria de les vistes "
+        "principals sobre conjunts de dades reproduïbles i desa el resultat en JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dataset',
+            action='append',
+            choices=list(benchmarks.DATASETS),
+            help='Mida del conjunt de dades; es pot repetir (default: 1k)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Peticions mesurades per vista (default: 50)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Peticions d\'escalfament per vista, no mesurades (default: 5)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Peticions simultànies pel handler ASGI (compara ASYNC_VIEWS=1 amb les síncrones)'
+        )
+        parser.add_argument(
+            '--view',
+            action='append',
+            help='Mesura només aquesta vista; es pot repetir (p. ex. event_list)'
+        )
+        parser.add_argument(
+            '--mongo-reads',
+            action='store_true',
+            help='Mesura també les vistes amb lectura directa per pymongo (<vista>@pymongo; només MongoDB)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Llavor de generació de dades (default: 42)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processos generadors per a seed_events --bulk'
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Conserva la base de dades de proves i reaprofita el conjunt si ja hi és'
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark-results.json',
+            help='Fitxer JSON de resultats (default: benchmark-results.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Fitxer JSON d\'una execució anterior amb què comparar'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=10.0,
+            help='Percentatge a partir del qual un empitjorament és regressió (default: 10)'
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Acaba amb error si hi ha alguna regressió respecte de --compare'
+        )
+
+    def handle(self, *args, **options):
+        datasets = options['dataset'] or ['1k']
+        if options['mongo_reads'] and not repository.available():
+            raise CommandError('--mongo-reads necessita MongoDB (djongo) com a base de dades')
+        iterations = options['iterations']
+        warmup = options['warmup']
+
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    previous = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No s'ha pogut llegir {options['compare']}: {e}")
+
+        # Sempre sobre una base de dades de proves: mai es toquen dades reals
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            results = {
+                'meta': benchmarks.metadata(iterations, warmup, options['seed'], options['concurrency']),
+                'datasets': {},
+            }
+            for name in sorted(datasets, key=benchmarks.DATASETS.get):
+                size = benchmarks.DATASETS[name]
+                if options['keepdb'] and benchmarks.dataset_ready(size):
+                    self.stdout.write(f"♻️ Reaprofitant el conjunt {name} ({size} esdeveniments)")
+                else:
+                    self.stdout.write(f"🌱 Generant el conjunt {name} ({size} esdeveniments)...")
+                    benchmarks.seed_dataset(size, options['seed'], options['workers'], stdout=self.stdout)
+
+                self.stdout.write(f"⏱️ Mesurant vistes ({iterations} peticions per vista)...")
+                views = benchmarks.run_views(iterations, warmup, only=options['view'], concurrency=options['concurrency'])
+                if options['mongo_reads']:
+                    views.update(benchmarks.run_mongo_reads(
+                        iterations, warmup, only=options['view'], concurrency=options['concurrency']
+                    ))
+                results['datasets'][name] = {'events': size, 'views': views}
+                self.write_table(name, views)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"💾 Resultats desats a {options['output']}"))
+
+        if previous is not None:
+            regressions = self.write_comparison(previous, results, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"{regressions} regressions respecte de {options['compare']}")
+
+    def write_table(self, dataset, views):
+        self.stdout.write(f"\n📊 {dataset}")
+        self.stdout.write(
+            f"   {'vista':<28} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8} {'consultes':>9} {'memòria':>10}"
+        )
+        for view, row in views.items():
+            self.stdout.write(
+                f"   {view:<28} {row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms "
+                f"{row['throughput_rps']:>8.0f} {row['queries']:>9} {row['peak_memory_kb']:>8.0f}KB"
+            )
+        self.stdout.write("")
+
+    def write_comparison(self, previous, current, threshold):
+        rows = benchmarks.compare(previous, current, threshold)
+        commit = previous.get('meta', {}).get('git_commit', '')[:10] or '?'
+        self.stdout.write(f"🔍 Comparació amb {commit}:")
+        regressions = 0
+        for dataset, view, metric, old, new, change, regression in rows:
+            line = f"   {dataset:<5} {view:<28} {metric:<15} {old:>10} → {new:<10} ({change:+.1f}%)"
+            if regression:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("✅ Cap regressió"))
+        return regressions
@@ -0,0 +1,60 @@
+# events/management/commands/generate_thumbnails.py
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from events.models import Event
+from events.thumbnails import process_event
+
+
+def process_one(pk):
+    try:
+        return pk, process_event(pk), None
+    except Exception as e:
+        return pk, None, e
+
+
+def _process(pk):
+    try:
+        return process_one(pk)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Genera les miniatures (JPEG i WebP) de les portades que encara no en tenen"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenera també les que ja tenen derivats (p. ex. després de canviar les amplades)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Fils generadors; 1 processa dins del fil principal (default: 4)'
+        )
+
+    def handle(self, *args, **options):
+        events = Event.objects.exclude(thumbnail='').exclude(thumbnail__isnull=True)
+        if not options['force']:
+            events = events.filter(thumbnail_widths='')
+        pks = list(events.order_by('pk').values_list('pk', flat=True))
+        self.stdout.write(f"🖼️ {len(pks)} portades per processar")
+
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            results = pool.map(_process, pks) if options['workers'] > 1 else map(process_one, pks)
+            for pk, widths, error in results:
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f"   ❌ Esdeveniment {pk}: {error}")
+                    continue
+                done += 1
+                if done % 100 == 0:
+                    self.stdout.write(f"   • {done} processades...")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {done} portades amb miniatures, {failed} errors"))
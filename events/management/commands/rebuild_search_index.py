@@ -0,0 +1,39 @@
+# events/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from events.models import Event
+from events.search import index_events
+
+
+class Command(BaseCommand):
+    help = "Reconstrueix l'índex de cerca d'esdeveniments per blocs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Esdeveniments processats per bloc (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        # Sense buidar l'índex abans: cada bloc se substitueix en una transacció
+        # i la cerca continua funcionant durant tota la reconstrucció. Les
+        # entrades dels esdeveniments esborrats ja les elimina la cascada.
+        events = Event.objects.only(
+            'pk', 'title', 'description', 'tags', 'category', 'status', 'scheduled_date'
+        ).order_by('pk')
+
+        indexed = 0
+        last_pk = 0
+        while True:
+            chunk = list(events.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            index_events(chunk, batch_size=chunk_size)
+            indexed += len(chunk)
+            last_pk = chunk[-1].pk
+            self.stdout.write(f"   • {indexed} esdeveniments indexats...")
+
+        self.stdout.write(self.style.SUCCESS(f"🔎 Índex reconstruït: {indexed} esdeveniments"))
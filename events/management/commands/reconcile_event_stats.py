@@ -0,0 +1,19 @@
+# events/management/commands/reconcile_event_stats.py
+from django.core.management.base import BaseCommand
+from events.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = "Reconstrueix des de zero els comptadors d'esdeveniments per creador i estat, i per categoria"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Files inserides per lot (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        creators = reconcile(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"📊 Comptadors reconstruïts per a {creators} creadors"))
@@ -0,0 +1,50 @@
+# events/management/commands/resolve_embed_urls.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from events.embeds import get_providers, resolve_embed_url
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = "Torna a resoldre les URLs d'embed (després de canviar proveïdors o ALLOWED_HOSTS)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Esdeveniments processats per bloc (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        providers = ', '.join(provider.name for provider in get_providers())
+        self.stdout.write(f"🔗 Proveïdors registrats: {providers}")
+
+        events = (
+            Event.objects.exclude(stream_url='')
+            .order_by('pk')
+            .values_list('pk', 'stream_url', 'stream_embed_url')
+        )
+
+        processed = updated = 0
+        last_pk = 0
+        while True:
+            chunk = list(events.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            now = timezone.now()
+            with transaction.atomic():
+                for pk, stream_url, current in chunk:
+                    embed_url = resolve_embed_url(stream_url)
+                    if embed_url != current:
+                        # updated_at canvia perquè la pàgina de detall mostra l'embed
+                        Event.objects.filter(pk=pk).update(stream_embed_url=embed_url, updated_at=now)
+                        updated += 1
+            processed += len(chunk)
+            last_pk = chunk[-1][0]
+            self.stdout.write(f"   • {processed} esdeveniments revisats...")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {updated} URLs d'embed actualitzades de {processed}"))
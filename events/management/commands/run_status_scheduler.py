@@ -0,0 +1,64 @@
+# events/management/commands/run_status_scheduler.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events.scheduler import StatusScheduler
+
+
+class Command(BaseCommand):
+    help = "Aplica les transicions d'estat (programat → en directe → finalitzat) en segon pla"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Aplica les transicions vençudes i surt (útil des de cron)'
+        )
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=15,
+            help='Minuts de terminis que es carreguen a la cua (default: 15)'
+        )
+        parser.add_argument(
+            '--refresh',
+            type=int,
+            default=60,
+            help='Segons entre recàrregues de la cua des de la BBDD (default: 60)'
+        )
+
+    def handle(self, *args, **options):
+        scheduler = StatusScheduler(horizon=timedelta(minutes=options['horizon']))
+        refresh_every = timedelta(seconds=options['refresh'])
+
+        self.stdout.write("⏱️ Iniciant el planificador d'estats...")
+
+        next_refresh = None
+        try:
+            while True:
+                now = timezone.now()
+                if next_refresh is None or now >= next_refresh:
+                    queued = scheduler.refresh(now)
+                    next_refresh = now + refresh_every
+                    self.stdout.write(f"   • Cua recarregada: {queued} terminis")
+
+                for (from_status, to_status), count in scheduler.run_due(now).items():
+                    if count:
+                        self.stdout.write(self.style.SUCCESS(
+                            f"   • {count} esdeveniments: {from_status} → {to_status}"
+                        ))
+
+                if options['once']:
+                    break
+
+                # Dormim fins al pròxim termini o la pròxima recàrrega
+                wake_at = next_refresh
+                deadline = scheduler.next_deadline()
+                if deadline is not None and deadline < wake_at:
+                    wake_at = deadline
+                time.sleep(max(0.1, (wake_at - timezone.now()).total_seconds()))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("⏹️ Planificador aturat"))
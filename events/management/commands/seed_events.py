@@ -1,10 +1,16 @@
 # events/management/commands/seed_events.py
+import os
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.db.models import Count
+from events.embeds import resolve_embed_url
 from events.models import Event
+from events.seeding import CATEGORIES, build_event, generate_chunk
 from django.utils import timezone
-from datetime import timedelta
 from faker import Faker
 
 User = get_user_model()
@@ -29,6 +35,40 @@ class Command(BaseCommand):
             action='store_true',
             help='Crea usuaris de prova si no n\'hi ha'
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Mode massiu: generació en paral·lel i inserció amb bulk_create'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Llavor per obtenir sempre les mateixes dades en mode --bulk'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processos generadors en mode --bulk (default: nombre de CPUs)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Esdeveniments generats per bloc en mode --bulk (default: 10000)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Files per INSERT en mode --bulk (default: 1000)'
+        )
+        parser.add_argument(
+            '--skip-derived',
+            action='store_true',
+            help='En mode --bulk, no reconstrueix etiquetes, comptadors ni índex de cerca'
+        )
 
     def handle(self, *args, **options):
         faker = Faker('es_ES')
@@ -53,8 +93,11 @@ class Command(BaseCommand):
                     )
                 self.stdout.write(self.style.SUCCESS("✅ 5 usuaris de prova creats"))
         
-        # Obtenir usuaris existents
-        users = list(User.objects.all())
+        # Obtenir usuaris existents (en mode bulk només calen els ids)
+        if options['bulk']:
+            users = list(User.objects.values_list('pk', flat=True))
+        else:
+            users = list(User.objects.all())
         if not users:
             self.stdout.write(self.style.ERROR("❌ No hi ha usuaris a la base de dades!"))
             self.stdout.write("Executa: python manage.py seed_users --users 5")
@@ -65,166 +108,23 @@ class Command(BaseCommand):
             deleted_count = Event.objects.all().delete()[0]
             self.stdout.write(self.style.WARNING(f"🧹 Esdeveniments eliminats: {deleted_count}"))
 
-        # --- Categories i estatistics ---
-        categories = [
-            ('gaming', '🎮'),
-            ('music', '🎵'), 
-            ('talk', '💬'),
-            ('education', '📚'),
-            ('sports', '⚽'),
-            ('entertainment', '🎭'),
-            ('technology', '💻'),
-            ('art', '🎨'),
-            ('other', '📅'),
-        ]
-        
-        status_choices = ['scheduled', 'live', 'finished', 'cancelled']
-        # Pesos per a la probabilitat de cada estat
-        status_weights = [50, 15, 30, 5]  # 50% scheduled, 15% live, 30% finished, 5% cancelled
-
-        # --- Tags per categories ---
-        tags_by_category = {
-            'gaming': ['fortnite', 'valorant', 'league of legends', 'minecraft', 'gaming', 'torneig', 'esports'],
-            'music': ['jazz', 'rock', 'electrònica', 'acústic', 'concert', 'música', 'en viu', 'dj'],
-            'talk': ['debat', 'xerrada', 'conferència', 'discussió', 'educatiu', 'tecnologia'],
-            'education': ['taller', 'tutorial', 'curs', 'aprenentatge', 'programació', 'python', 'web'],
-            'sports': ['futbol', 'esports', 'competició', 'marató', 'fitness', 'entrenament'],
-            'entertainment': ['comèdia', 'cuina', 'creatiu', 'divertiment', 'streaming'],
-            'technology': ['ia', 'blockchain', 'programació', 'tecnologia', 'innovació', 'startup'],
-            'art': ['fotografia', 'dibuix', 'pintura', 'creativitat', 'disseny', 'art digital'],
-            'other': ['comunitat', 'xarrada', 'q&a', 'reunió', 'networking'],
-        }
-
-        # --- Stream URLs per categories ---
-        stream_urls = {
-            'gaming': [
-                'https://www.twitch.tv/gamingstream',
-                'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
-                'https://www.twitch.tv/esportstv',
-            ],
-            'music': [
-                'https://youtu.be/6LASz6HAL7E?si=WH4iBi4sjZSDyCkp',
-                'https://youtu.be/9vDL7AgLdYQ?si=3uA1VJAs-VQ_zmCv',
-                'https://youtu.be/Ov5ljc44Ajs?si=x10x7CMZQf9LPIG8',
-            ],
-            'talk': [
-                'https://www.youtube.com/watch?v=video_id_talk1',
-                'https://www.youtube.com/watch?v=video_id_talk2',
-            ],
-            'education': [
-                'https://www.youtube.com/watch?v=video_id_edu1',
-                'https://www.youtube.com/watch?v=video_id_edu2',
-            ],
-            'other': [
-                'https://www.twitch.tv/community',
-                'https://www.youtube.com/watch?v=video_id_other',
-            ]
-        }
-
-        # --- Crear esdeveniments ---
-        created_count = 0
-        for i in range(num_events):
-            # Seleccionar categoria aleatòria
-            category_code, category_emoji = random.choice(categories)
-            
-            # Seleccionar estat amb probabilitats
-            status = random.choices(status_choices, weights=status_weights, k=1)[0]
-            
-            # Crear data programada (dels darrers 30 dies als pròxims 60 dies)
-            days_offset = random.randint(-30, 60)
-            hours_offset = random.randint(0, 23)
-            minutes_offset = random.randint(0, 59)
-            
-            scheduled_date = timezone.now() + timedelta(
-                days=days_offset,
-                hours=hours_offset,
-                minutes=minutes_offset
-            )
-            
-            # Ajustar estat segons la data
-            if scheduled_date < timezone.now() and status == 'scheduled':
-                status = random.choice(['finished', 'live'])
-            elif scheduled_date > timezone.now() + timedelta(days=1) and status == 'live':
-                status = 'scheduled'
-            
-            # Títol i descripció segons categoria
-            if category_code == 'gaming':
-                games = ['Fortnite', 'Valorant', 'League of Legends', 'Minecraft', 'Call of Duty']
-                game = random.choice(games)
-                title = f"{category_emoji} {random.choice(['Torneig', 'Marató', 'Streaming', 'Competició'])} de {game}"
-                description = faker.paragraph(nb_sentences=3) + f" {game} amb jugadors de diferents nivells."
-                
-            elif category_code == 'music':
-                genres = ['Jazz', 'Rock', 'Electrònica', 'Acústic', 'Hip Hop']
-                genre = random.choice(genres)
-                title = f"{category_emoji} {random.choice(['Concert', 'Jam Session', 'Live Set', 'Sessió'])} de {genre}"
-                description = faker.paragraph(nb_sentences=3) + f" Gènere {genre.lower()} amb artistes {random.choice(['locals', 'internacionals', 'emergents'])}."
-                
-            elif category_code == 'talk':
-                topics = ['Intel·ligència Artificial', 'Canvi Climàtic', 'Salut Mental', 'Blockchain', 'Emprenedoria']
-                topic = random.choice(topics)
-                title = f"{category_emoji} {random.choice(['Xerrada', 'Debat', 'Conferència', 'Ponent'])}: {topic}"
-                description = faker.paragraph(nb_sentences=3) + f" Sobre {topic.lower()} amb experts del sector."
-                
-            elif category_code == 'education':
-                subjects = ['Python', 'Desenvolupament Web', 'Fotografia', 'Dibuix Digital', 'Cuina']
-                subject = random.choice(subjects)
-                title = f"{category_emoji} {random.choice(['Taller', 'Curs', 'Tutorial', 'Masterclass'])}: {subject}"
-                description = faker.paragraph(nb_sentences=3) + f" Aprengues {subject.lower()} des de zero amb professionals."
-                
-            else:
-                title = f"{category_emoji} {faker.sentence(nb_words=4)}"
-                description = faker.paragraph(nb_sentences=3)
-            
-            # Tags aleatoris
-            tags_list = random.sample(tags_by_category.get(category_code, ['esdeveniment', 'streaming']), 
-                                     min(3, len(tags_by_category.get(category_code, ['esdeveniment']))))
-            tags = ', '.join(tags_list)
-            
-            # Stream URL segons categoria
-            stream_url = random.choice(stream_urls.get(category_code, stream_urls['other']))
-            
-            # Seleccionar creador aleatori
-            creator = random.choice(users)
-            
-            # Determinar si és destacat (20% de probabilitat)
-            is_featured = random.random() < 0.2
-            
-            # Màxim d'espectadors
-            max_viewers = random.choice([50, 100, 150, 200, 300, 500])
-            
-            # Crear l'esdeveniment
-            try:
-                event = Event.objects.create(
-                    title=title,
-                    description=description,
-                    creator=creator,
-                    category=category_code,
-                    scheduled_date=scheduled_date,
-                    status=status,
-                    max_viewers=max_viewers,
-                    is_featured=is_featured,
-                    tags=tags,
-                    stream_url=stream_url,
-                )
-                
-                created_count += 1
-                featured_str = " ⭐" if is_featured else ""
-                self.stdout.write(f"{category_emoji} '{title}'{featured_str} creat per {creator.username}")
-                
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"❌ Error creant esdeveniment: {e}"))
+        if options['bulk']:
+            created_count = self.bulk_seed(options, users)
+        else:
+            created_count = self.seed(faker, users, num_events)
 
         self.stdout.write(self.style.SUCCESS(f"🎉 {created_count} esdeveniments creats correctament!"))
         self.stdout.write("\n📊 Resum:")
-        self.stdout.write(f"   • Total esdeveniments: {Event.objects.count()}")
         
-        # Safer way to count featured and live events without complex WHERE clauses
-        all_events = list(Event.objects.all())  # Get all events as a list
-        featured_count = sum(1 for event in all_events if event.is_featured)
-        live_count = sum(1 for event in all_events if event.status == 'live')
-        scheduled_count = sum(1 for event in all_events if event.status == 'scheduled')
+        # Recomptes agregats a la base de dades (sense carregar cap esdeveniment)
+        by_status = dict(
+            Event.objects.order_by().values('status').annotate(n=Count('id')).values_list('status', 'n')
+        )
+        featured_count = Event.objects.filter(is_featured=True).count()
+        live_count = by_status.get('live', 0)
+        scheduled_count = by_status.get('scheduled', 0)
         
+        self.stdout.write(f"   • Total esdeveniments: {sum(by_status.values())}")
         self.stdout.write(f"   • Esdeveniments destacats: {featured_count}")
         self.stdout.write(f"   • En directe ara: {live_count}")
         self.stdout.write(f"   • Programats: {scheduled_count}")
@@ -232,4 +132,76 @@ class Command(BaseCommand):
         # Mostrar consells
         self.stdout.write("\n💡 Consells:")
         self.stdout.write("   • Per crear més esdeveniments: python manage.py seed_events --events 20")
-        self.stdout.write("   • Per reiniciar: python manage.py seed_events --clear --events 15")
\ No newline at end of file
+        self.stdout.write("   • Per reiniciar: python manage.py seed_events --clear --events 15")
+        self.stdout.write("   • Per a proves de càrrega: python manage.py seed_events --bulk --events 1000000 --seed 42")
+
+    def seed(self, faker, users, num_events):
+        """Mode normal: un esdeveniment per vegada (passa per save() i els senyals)"""
+        created_count = 0
+        now = timezone.now()
+        for i in range(num_events):
+            data = build_event(random, faker, now, users)
+            category_emoji = dict(CATEGORIES)[data['category']]
+            
+            # Crear l'esdeveniment
+            try:
+                Event.objects.create(**data)
+                
+                created_count += 1
+                featured_str = " ⭐" if data['is_featured'] else ""
+                self.stdout.write(f"{category_emoji} '{data['title']}'{featured_str} creat per {data['creator'].username}")
+                
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"❌ Error creant esdeveniment: {e}"))
+        return created_count
+
+    def bulk_seed(self, options, creator_ids):
+        """
+        Mode massiu: les files es generen en un pool de processos (una llavor
+        determinista per bloc) i s'insereixen amb bulk_create per lots.
+
+        bulk_create no crida save() ni els senyals, així que els camps
+        derivats es calculen aquí i els índexs/comptadors es reconstrueixen
+        al final.
+        """
+        num_events = options['events']
+        chunk_size = options['chunk_size']
+        batch_size = options['batch_size']
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 31)
+        workers = options['workers'] or os.cpu_count() or 1
+        now = timezone.now()
+
+        chunks = [
+            (seed, index, min(chunk_size, num_events - start), now, creator_ids)
+            for index, start in enumerate(range(0, num_events, chunk_size))
+        ]
+        self.stdout.write(
+            f"⚡ Mode bulk: {num_events} esdeveniments, {len(chunks)} blocs, "
+            f"{workers} processos, llavor {seed}"
+        )
+
+        created_count = 0
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(generate_chunk, *zip(*chunks)) if chunks else []
+            for rows in results:
+                events = [
+                    Event(stream_embed_url=resolve_embed_url(row['stream_url']), **row)
+                    for row in rows
+                ]
+                Event.objects.bulk_create(events, batch_size=batch_size)
+                created_count += len(events)
+                rate = created_count / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"   • {created_count}/{num_events} inserits ({rate:,.0f}/s)")
+
+        if options['skip_derived']:
+            self.stdout.write(self.style.WARNING(
+                "⚠️ Dades derivades omeses: executa backfill_tags, reconcile_event_stats i rebuild_search_index"
+            ))
+        else:
+            self.stdout.write("🔁 Reconstruint etiquetes, comptadors i índex de cerca...")
+            call_command('backfill_tags', chunk_size=batch_size, stdout=self.stdout)
+            call_command('reconcile_event_stats', stdout=self.stdout)
+            call_command('rebuild_search_index', chunk_size=batch_size, stdout=self.stdout)
+
+        return created_count
\ No newline at end of file
@@ -0,0 +1,25 @@
+# Generated by Django 4.1.13 on 2026-10-18 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['-created_at', 'id'], name='events_even_created_9d747d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['category', '-scheduled_date', 'id'], name='events_even_categor_e6195e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['creator', '-created_at', 'id'], name='events_even_creator_c9ed33_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.1.13 on 2026-10-18 01:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('category', models.CharField(max_length=50)),
+                ('status', models.CharField(max_length=20)),
+                ('scheduled_date', models.DateTimeField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='events.event')),
+            ],
+            options={
+                'verbose_name': 'Terme de cerca',
+                'verbose_name_plural': 'Termes de cerca',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='eventsearchtoken',
+            index=models.Index(fields=['term', 'category', 'status', 'scheduled_date'], name='events_even_term_8a126e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventsearchtoken',
+            index=models.Index(fields=['term', 'scheduled_date'], name='events_even_term_5fb1f9_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='eventsearchtoken',
+            unique_together={('term', 'event')},
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.13 on 2026-10-18 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nom')),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('event_count', models.PositiveIntegerField(default=0, verbose_name='Esdeveniments')),
+            ],
+            options={
+                'verbose_name': 'Etiqueta',
+                'verbose_name_plural': 'Etiquetes',
+                'ordering': ['-event_count', 'slug'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-event_count'], name='events_tag_event_c_c558e1_idx'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='tag_items',
+            field=models.ManyToManyField(blank=True, related_name='events', to='events.tag', verbose_name='Etiquetes normalitzades'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-18 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_tags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'category', 'scheduled_date'], name='events_even_status_ebba36_idx'),
+        ),
+    ]
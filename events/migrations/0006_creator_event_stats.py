@@ -0,0 +1,32 @@
+# Generated by Django 4.1.13 on 2026-10-18 01:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0005_status_scheduler_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreatorEventStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('scheduled', models.IntegerField(default=0)),
+                ('live', models.IntegerField(default=0)),
+                ('finished', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('creator', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='event_stats', to=settings.AUTH_USER_MODEL, verbose_name='Creador')),
+            ],
+            options={
+                'verbose_name': 'Estadístiques del creador',
+                'verbose_name_plural': 'Estadístiques dels creadors',
+            },
+        ),
+    ]
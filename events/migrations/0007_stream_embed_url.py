@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_creator_event_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='stream_embed_url',
+            field=models.URLField(blank=True, editable=False, max_length=500, verbose_name="URL d'embed"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-18 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_stream_embed_url'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['updated_at'], name='events_even_updated_1878aa_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_event_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='thumbnail_widths',
+            field=models.CharField(blank=True, editable=False, max_length=50, verbose_name='Amplades de les miniatures'),
+        ),
+    ]
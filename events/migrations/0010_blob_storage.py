@@ -0,0 +1,19 @@
+# Generated by Django 4.1.13 on 2026-10-18 02:27
+
+import config.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_event_thumbnail_widths'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=config.storage.get_blob_storage, upload_to='events/thumbnails/', verbose_name='Imatge de portada'),
+        ),
+    ]
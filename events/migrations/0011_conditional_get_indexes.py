@@ -0,0 +1,21 @@
+# Generated by Django 4.1.13 on 2026-10-18 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_blob_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['category', 'updated_at'], name='events_even_categor_ebb0f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['creator', 'updated_at'], name='events_even_creator_beb16d_idx'),
+        ),
+    ]
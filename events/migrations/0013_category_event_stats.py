@@ -0,0 +1,34 @@
+# Generated by Django 4.1.13 on 2026-10-18 03:12
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_category_stats(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    CategoryEventStats = apps.get_model('events', 'CategoryEventStats')
+    rows = Event.objects.order_by().values('category').annotate(n=Count('id')).values_list('category', 'n')
+    CategoryEventStats.objects.bulk_create([CategoryEventStats(category=category, total=n) for category, n in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_tag_unicode_slugs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryEventStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=50, unique=True, verbose_name='Categoria')),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Estadístiques de la categoria',
+                'verbose_name_plural': 'Estadístiques de les categories',
+            },
+        ),
+        migrations.RunPython(fill_category_stats, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,75 @@
+import hashlib
+import re
+
 from django.db import models
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.text import slugify
 from datetime import timedelta
-import re
+
+from config.storage import get_blob_storage
+
+from .embeds import resolve_embed_url
+
+TAG_NAME_LENGTH = 100
+TAG_SLUG_LENGTH = 100
+# El que slugify descarta a part dels separadors (espais, guions, _)
+TAG_LOSSY_CHARS = re.compile(r'[^\w\s-]')
+
+
+def tag_slug(name):
+    """
+    Slug d'una etiqueta, únic per nom (sense distingir majúscules).
+
+    Conserva les lletres no llatines (ciríl·lic, CJK...). Si el nom té
+    caràcters que l'slug no pot representar (``C++``, ``C#``, emojis)
+    s'hi afegeix un hash curt del nom perquè no col·lideixin entre ells.
+    """
+    name = ' '.join(name.split()).casefold()
+    slug = slugify(name, allow_unicode=True)
+    if slug and not TAG_LOSSY_CHARS.search(name):
+        return slug[:TAG_SLUG_LENGTH]
+    digest = hashlib.sha1(name.encode()).hexdigest()[:8]
+    prefix = slug[:TAG_SLUG_LENGTH - len(digest) - 1] or 'tag'
+    return f'{prefix}-{digest}'
+
+
+def parse_tags(value):
+    """
+    Converteix la sintaxi de comes ('a, b, c') en una llista de noms.
+
+    Elimina espais, etiquetes buides i duplicats (mateix ``tag_slug``).
+    """
+    if not value:
+        return []
+    names, seen = [], set()
+    for raw in value.split(','):
+        name = raw.strip()[:TAG_NAME_LENGTH]
+        if not name:
+            continue
+        slug = tag_slug(name)
+        if slug in seen:
+            continue
+        seen.add(slug)
+        names.append(name)
+    return names
+
+
+# Camps que necessiten les targetes i taules dels llistats (sense 'description')
+LISTING_FIELDS = (
+    'id', 'title', 'category', 'scheduled_date', 'status', 'thumbnail',
+    'thumbnail_widths', 'max_viewers', 'is_featured', 'tags', 'created_at', 'updated_at',
+    'creator_id',
+)
+
+
+class EventQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Projecció per als llistats: creador en la mateixa consulta i sense la descripció"""
+        return self.select_related('creator').only(*LISTING_FIELDS, 'creator__username')
+
 
 class Event(models.Model):
     CATEGORY_CHOICES = [
@@ -48,10 +114,19 @@ class Event(models.Model):
     )
     thumbnail = models.ImageField(
         upload_to='events/thumbnails/',
+        # Adreçat per contingut: el nom final és el hash (config/storage.py)
+        storage=get_blob_storage,
         blank=True,
         null=True,
         verbose_name="Imatge de portada"
     )
+    # Amplades dels derivats ja generats ('320,640,1280'), vegeu events/thumbnails.py
+    thumbnail_widths = models.CharField(
+        max_length=50,
+        blank=True,
+        editable=False,
+        verbose_name="Amplades de les miniatures"
+    )
     max_viewers = models.PositiveIntegerField(
         default=100,
         verbose_name="Màxim espectadors"
@@ -70,9 +145,24 @@ class Event(models.Model):
         blank=True,
         verbose_name="URL del streaming"
     )
+    stream_embed_url = models.URLField(
+        max_length=500,
+        blank=True,
+        editable=False,
+        verbose_name="URL d'embed"
+    )
+    # Etiquetes normalitzades (es sincronitzen des de 'tags' en desar)
+    tag_items = models.ManyToManyField(
+        'Tag',
+        related_name='events',
+        blank=True,
+        verbose_name="Etiquetes normalitzades"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EventQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Esdeveniment'
@@ -82,11 +172,33 @@ class Event(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['category']),
             models.Index(fields=['scheduled_date']),
+            # Índexs per a la paginació per cursor dels llistats
+            models.Index(fields=['-created_at', 'id']),
+            models.Index(fields=['category', '-scheduled_date', 'id']),
+            models.Index(fields=['creator', '-created_at', 'id']),
+            # Cua de transicions d'estat del planificador
+            models.Index(fields=['status', 'category', 'scheduled_date']),
+            # Vigilant de canvis d'estat dels fluxos SSE (events.streams)
+            models.Index(fields=['updated_at']),
+            # Validadors dels GET condicionals (events.conditional)
+            models.Index(fields=['category', 'updated_at']),
+            models.Index(fields=['creator', 'updated_at']),
         ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordem l'estat i el creador carregats per mantenir els comptadors
+        loaded = dict(zip(field_names, values))
+        instance._loaded_status = loaded.get('status')
+        instance._loaded_creator_id = loaded.get('creator_id')
+        instance._loaded_category = loaded.get('category')
+        instance._loaded_thumbnail = loaded.get('thumbnail')
+        return instance
+
     def get_absolute_url(self):
         return reverse('events:event_detail', kwargs={'pk': self.pk})
 
@@ -98,20 +210,27 @@ class Event(models.Model):
     def is_upcoming(self):
         return self.status == 'scheduled' and self.scheduled_date > timezone.now()
 
+    # Durada de cada categoria en minuts
+    CATEGORY_DURATIONS = {
+        'gaming': 180,        # 3 hores
+        'music': 90,          # 1.5 hores  
+        'talk': 60,           # 1 hora
+        'education': 120,     # 2 hores
+        'sports': 150,        # 2.5 hores
+        'entertainment': 120, # 2 hores
+        'technology': 90,     # 1.5 hores
+        'art': 120,           # 2 hores
+        'other': 90,          # 1.5 hores
+    }
+    DEFAULT_DURATION = 90
+
     def get_duration(self):
         """Calcula la durada de l'esdeveniment en minuts"""
-        category_durations = {
-            'gaming': 180,        # 3 hores
-            'music': 90,          # 1.5 hores  
-            'talk': 60,           # 1 hora
-            'education': 120,     # 2 hores
-            'sports': 150,        # 2.5 hores
-            'entertainment': 120, # 2 hores
-            'technology': 90,     # 1.5 hores
-            'art': 120,           # 2 hores
-            'other': 90,          # 1.5 hores
-        }
-        return category_durations.get(self.category, 90)
+        return self.CATEGORY_DURATIONS.get(self.category, self.DEFAULT_DURATION)
+
+    def get_end_date(self):
+        """Moment en què l'esdeveniment en directe passa a finalitzat"""
+        return self.scheduled_date + timedelta(minutes=self.get_duration())
 
     def get_duration_display(self):
         minutes = self.get_duration()
@@ -126,50 +245,66 @@ class Event(models.Model):
             return f"{hours}h {mins}min"
 
     def get_tags_list(self):
-        """Retorna les etiquetes com a llista"""
-        if self.tags:
-            return [tag.strip() for tag in self.tags.split(',')]
-        return []
+        """Retorna les etiquetes com a llista (memoritzada mentre 'tags' no canviï)"""
+        cached = getattr(self, '_tags_list_cache', None)
+        if cached is None or cached[0] != self.tags:
+            cached = (self.tags, parse_tags(self.tags))
+            self._tags_list_cache = cached
+        return cached[1]
+
+    def get_tag_links(self):
+        """``[(nom, slug), ...]`` per enllaçar cada etiqueta a ``events:events_by_tag``"""
+        return [(name, tag_slug(name)) for name in self.get_tags_list()]
 
     def get_stream_embed_url(self):
-        """Converteix URLs de YouTube/Twitch a format embed"""
+        """URL d'embed precalculada en desar (vegeu events/embeds.py)"""
         if not self.stream_url:
             return None
-            
-        # YouTube
-        youtube_pattern = r'(?:https?:\/\/)?(?:www\.)?(?:youtube\.com\/watch\?v=|youtu\.be\/)([a-zA-Z0-9_-]+)'
-        youtube_match = re.search(youtube_pattern, self.stream_url)
-        if youtube_match:
-            video_id = youtube_match.group(1)
-            return f"https://www.youtube.com/embed/{video_id}"
-        
-        # Twitch
-        twitch_pattern = r'(?:https?:\/\/)?(?:www\.)?twitch\.tv\/([a-zA-Z0-9_]+)'
-        twitch_match = re.search(twitch_pattern, self.stream_url)
-        if twitch_match:
-            channel = twitch_match.group(1)
-            return f"https://player.twitch.tv/?channel={channel}&parent={settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'}"
-        
-        return self.stream_url
+        if self.stream_embed_url:
+            return self.stream_embed_url
+        # Files antigues encara sense resoldre (manage.py resolve_embed_urls)
+        return resolve_embed_url(self.stream_url)
 
-    def update_status(self):
-        """Actualitza l'estat automàticament segons la data programada"""
-        now = timezone.now()
-        
-        if self.status == 'cancelled' or self.status == 'finished':
-            return False
-            
-        if self.status == 'scheduled' and now >= self.scheduled_date:
-            self.status = 'live'
-            self.save()
-            return True
-            
-        if self.status == 'live' and now >= self.scheduled_date + timedelta(minutes=self.get_duration()):
-            self.status = 'finished'
-            self.save()
-            return True
-            
-        return False
+    def get_thumbnail_derivatives(self):
+        """``[(amplada, url_jpeg, url_webp), ...]`` dels derivats generats"""
+        from .thumbnails import derived_name, parse_widths
+
+        if not self.thumbnail:
+            return []
+        return [
+            (
+                width,
+                default_storage.url(derived_name(self.thumbnail.name, width, 'jpg')),
+                default_storage.url(derived_name(self.thumbnail.name, width, 'webp')),
+            )
+            for width in parse_widths(self.thumbnail_widths)
+        ]
+
+    def get_thumbnail_srcset(self):
+        return ', '.join(f'{jpeg} {width}w' for width, jpeg, webp in self.get_thumbnail_derivatives())
+
+    def get_thumbnail_webp_srcset(self):
+        return ', '.join(f'{webp} {width}w' for width, jpeg, webp in self.get_thumbnail_derivatives())
+
+    def get_thumbnail_src(self):
+        """El derivat més petit (fallback de ``srcset``) o l'original si encara no n'hi ha"""
+        derivatives = self.get_thumbnail_derivatives()
+        return derivatives[0][1] if derivatives else self.thumbnail.url
+
+    def save(self, *args, **kwargs):
+        # L'URL d'embed es resol aquí un sol cop, no a cada renderitzat
+        self.stream_embed_url = resolve_embed_url(self.stream_url)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'stream_url' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'stream_embed_url'}
+        # Portada nova: els derivats anteriors ja no serveixen (es regeneren en segon pla)
+        self._thumbnail_changed = (self.thumbnail.name or '') != (getattr(self, '_loaded_thumbnail', None) or '')
+        if self._thumbnail_changed:
+            self.thumbnail_widths = ''
+            if update_fields is not None and 'thumbnail' in update_fields:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'thumbnail_widths'}
+        super().save(*args, **kwargs)
+        self._loaded_thumbnail = self.thumbnail.name
 
     def get_status_badge_class(self):
         """Retorna la classe Bootstrap per al badge d'estat"""
@@ -194,4 +329,99 @@ class Event(models.Model):
             'art': '🎨',
             'other': '📅',
         }
-        return icons.get(self.category, '📅')
\ No newline at end of file
+        return icons.get(self.category, '📅')
+
+class Tag(models.Model):
+    """Etiqueta normalitzada amb el recompte d'esdeveniments precalculat"""
+    name = models.CharField(max_length=TAG_NAME_LENGTH, verbose_name="Nom")
+    slug = models.SlugField(max_length=TAG_SLUG_LENGTH, unique=True, allow_unicode=True)
+    event_count = models.PositiveIntegerField(default=0, verbose_name="Esdeveniments")
+
+    class Meta:
+        ordering = ['-event_count', 'slug']
+        verbose_name = 'Etiqueta'
+        verbose_name_plural = 'Etiquetes'
+        indexes = [
+            models.Index(fields=['-event_count']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def get_absolute_url(self):
+        return reverse('events:events_by_tag', kwargs={'slug': self.slug})
+
+
+class CreatorEventStats(models.Model):
+    """
+    Comptadors materialitzats d'esdeveniments per creador i estat.
+
+    Es mantenen de manera incremental (vegeu events/stats.py) i es poden
+    reconstruir amb ``manage.py reconcile_event_stats``.
+    """
+    creator = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='event_stats',
+        verbose_name="Creador"
+    )
+    total = models.IntegerField(default=0)
+    scheduled = models.IntegerField(default=0)
+    live = models.IntegerField(default=0)
+    finished = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Estadístiques del creador'
+        verbose_name_plural = 'Estadístiques dels creadors'
+
+    def __str__(self):
+        return f'{self.creator_id}: {self.total}'
+
+
+class CategoryEventStats(models.Model):
+    """
+    Nombre d'esdeveniments per categoria, mantingut com ``CreatorEventStats``
+    (vegeu events/stats.py). El validador de la pàgina de categoria el llegeix
+    per clau en lloc de comptar tota la categoria a cada petició.
+    """
+    category = models.CharField(max_length=50, unique=True, verbose_name="Categoria")
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Estadístiques de la categoria'
+        verbose_name_plural = 'Estadístiques de les categories'
+
+    def __str__(self):
+        return f'{self.category}: {self.total}'
+
+
+class EventSearchToken(models.Model):
+    """
+    Entrada de l'índex invertit de cerca (un terme per esdeveniment).
+
+    Es desnormalitzen categoria, estat i data perquè els filtres del
+    formulari de cerca s'apliquin directament sobre l'índex.
+    """
+    term = models.CharField(max_length=64)
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+    weight = models.PositiveIntegerField(default=1)
+    category = models.CharField(max_length=50)
+    status = models.CharField(max_length=20)
+    scheduled_date = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Terme de cerca'
+        verbose_name_plural = 'Termes de cerca'
+        unique_together = [('term', 'event')]
+        indexes = [
+            models.Index(fields=['term', 'category', 'status', 'scheduled_date']),
+            models.Index(fields=['term', 'scheduled_date']),
+        ]
+
+    def __str__(self):
+        return f'{self.term} → {self.event_id}'
@@ -0,0 +1,175 @@
+"""
+Paginació per cursor (keyset) per als llistats d'esdeveniments.
+
+En lloc de fer OFFSET (o carregar-ho tot i tallar en Python), cada pàgina
+es demana a la base de dades amb un filtre sobre l'última fila vista, un
+ORDER BY fix i un LIMIT de ``page_size + 1`` per saber si hi ha pàgina
+següent. El cost per pàgina és el mateix tant si hi ha 1k com 5M files.
+"""
+import base64
+import json
+
+from django.db.models import Q
+
+# Ordenacions suportades pels llistats
+ORDER_BY_CREATED = ('-created_at', 'pk')
+ORDER_BY_SCHEDULED = ('-scheduled_date', 'pk')
+
+
+class InvalidCursor(ValueError):
+    """El cursor rebut no es pot descodificar."""
+
+
+class CursorPage:
+    """Una pàgina de resultats amb els cursors per anar endavant i enrere"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, querystring=''):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        # Paràmetres GET (sense el cursor) per construir els enllaços
+        self.querystring = querystring
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class CursorPaginator:
+    """
+    Pagina un queryset per una ordenació fixa acabada en 'pk' (desempat únic).
+
+    El cursor és un token opac (base64) amb la direcció i els valors de les
+    columnes d'ordenació de la fila frontera.
+    """
+
+    def __init__(self, queryset, ordering=ORDER_BY_CREATED, page_size=12):
+        if not ordering or ordering[-1].lstrip('-') not in ('pk', 'id'):
+            raise ValueError("L'ordenació ha d'acabar en 'pk' per ser determinista")
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+        self._fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in self.ordering
+        ]
+
+    # --- Codificació del cursor ---
+
+    def _model_field(self, name):
+        meta = self.queryset.model._meta
+        return meta.pk if name == 'pk' else meta.get_field(name)
+
+    def encode_cursor(self, obj, direction):
+        # obj pot ser una instància o un diccionari de values() (l'API)
+        values = []
+        for name, _ in self._fields:
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        raw = json.dumps([direction] + values, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, values = data[0], data[1:]
+            if direction not in ('n', 'p') or len(values) != len(self._fields):
+                raise InvalidCursor(cursor)
+            values = [
+                self._model_field(name).to_python(value)
+                for (name, _), value in zip(self._fields, values)
+            ]
+        except InvalidCursor:
+            raise
+        except Exception as e:
+            raise InvalidCursor(cursor) from e
+        return direction, values
+
+    # --- Consulta ---
+
+    def _keyset_filter(self, values, reverse):
+        """
+        Construeix (a > x) OR (a = x AND b > y) ... respectant la direcció
+        de cada columna.
+        """
+        condition = Q()
+        for i, (name, descending) in enumerate(self._fields):
+            if descending != reverse:
+                lookup = f'{name}__lt'
+            else:
+                lookup = f'{name}__gt'
+            term = Q(**{lookup: values[i]})
+            for j, (prev_name, _) in enumerate(self._fields[:i]):
+                term &= Q(**{prev_name: values[j]})
+            condition |= term
+        return condition
+
+    def _order_by(self, reverse):
+        order = []
+        for name, descending in self._fields:
+            order.append(f'-{name}' if descending != reverse else name)
+        return order
+
+    def fetch(self, values, reverse, limit):
+        """
+        Fins a ``limit`` files a partir de la frontera ``values`` (``None``:
+        des de l'inici), en l'ordre de la pàgina o en l'invers si ``reverse``.
+        """
+        queryset = self.queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._keyset_filter(values, reverse))
+        return list(queryset[:limit])
+
+    def get_page(self, cursor=None, querystring=''):
+        """Retorna la pàgina indicada pel cursor; un cursor invàlid torna a l'inici"""
+        direction, values = 'n', None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = 'n', None
+
+        reverse = direction == 'p'
+        rows = self.fetch(values, reverse, self.page_size + 1)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        next_cursor = self.encode_cursor(rows[-1], 'n') if rows and has_next else None
+        previous_cursor = self.encode_cursor(rows[0], 'p') if rows and has_previous else None
+
+        return CursorPage(rows, next_cursor, previous_cursor, querystring)
+
+
+def paginate(request, paginator):
+    """Pàgina de ``paginator`` indicada pel paràmetre GET ``cursor`` de la petició"""
+    params = request.GET.copy()
+    cursor = params.pop('cursor', [None])[-1]
+    return paginator.get_page(cursor, querystring=params.urlencode())
+
+
+def paginate_queryset(request, queryset, ordering=ORDER_BY_CREATED, page_size=12):
+    """Pagina ``queryset`` amb el paràmetre GET ``cursor`` de la petició"""
+    return paginate(request, CursorPaginator(queryset, ordering=ordering, page_size=page_size))
@@ -0,0 +1,228 @@
+"""
+Presència d'espectadors i límit ``Event.max_viewers``.
+
+Cada espectador (identificat per un id aleatori que genera el navegador)
+entra amb ``join`` i després envia un heartbeat cada ``HEARTBEAT`` segons;
+qui deixa d'enviar-ne caduca sol. Cap operació escriu a la base de dades:
+l'estat viu al magatzem configurat a ``EVENT_PRESENCE_STORE``.
+
+- ``MemoryPresenceStore``: exacte, dins del procés (proves, un sol worker).
+- ``CachePresenceStore``: compartit entre processos a través de la memòria
+  cau de Django (Redis/Memcached en producció), O(1) per operació.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.module_loading import import_string
+
+from .models import Event
+
+HEARTBEAT = getattr(settings, 'EVENT_PRESENCE_HEARTBEAT', 15)
+
+# Segons que es guarda max_viewers a la memòria cau (evita una consulta per entrada)
+CAPACITY_TIMEOUT = 60
+
+
+class Admission:
+    def __init__(self, admitted, watching):
+        self.admitted = admitted
+        self.watching = watching
+
+
+class MemoryPresenceStore:
+    """
+    Sessions per esdeveniment en un ``OrderedDict`` ordenat per darrer
+    heartbeat: els caducats sempre són al principi i es purguen en O(1)
+    amortitzat. Un sol lock fa atòmiques l'admissió i la caducitat.
+    """
+
+    def __init__(self, ttl=None, clock=time.monotonic):
+        self.ttl = ttl or HEARTBEAT * 2
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._events = {}
+
+    def _purge(self, sessions, now):
+        while sessions:
+            session_id, expires = next(iter(sessions.items()))
+            if expires > now:
+                break
+            del sessions[session_id]
+
+    def join(self, event_id, session_id, capacity):
+        now = self.clock()
+        with self._lock:
+            sessions = self._events.setdefault(event_id, OrderedDict())
+            self._purge(sessions, now)
+            if session_id not in sessions and capacity and len(sessions) >= capacity:
+                return Admission(False, len(sessions))
+            sessions[session_id] = now + self.ttl
+            sessions.move_to_end(session_id)
+            return Admission(True, len(sessions))
+
+    def heartbeat(self, event_id, session_id):
+        now = self.clock()
+        with self._lock:
+            sessions = self._events.get(event_id)
+            if sessions is None:
+                return False
+            self._purge(sessions, now)
+            if session_id not in sessions:
+                return False
+            sessions[session_id] = now + self.ttl
+            sessions.move_to_end(session_id)
+            return True
+
+    def leave(self, event_id, session_id):
+        with self._lock:
+            sessions = self._events.get(event_id)
+            if sessions is not None:
+                sessions.pop(session_id, None)
+
+    def count(self, event_id):
+        now = self.clock()
+        with self._lock:
+            sessions = self._events.get(event_id)
+            if not sessions:
+                return 0
+            self._purge(sessions, now)
+            return len(sessions)
+
+
+class CachePresenceStore:
+    """
+    Presència compartida amb operacions atòmiques de la memòria cau
+    (``add``/``incr``), sense llistes de sessions.
+
+    El temps es divideix en finestres de com a mínim ``2 * HEARTBEAT``
+    segons. Cada sessió es marca una vegada per finestra (``add`` d'una clau
+    pròpia) i suma 1 al comptador ``seen`` de la finestra. Una sessió és
+    activa si està marcada a la finestra actual o a l'anterior: amb finestres
+    del doble del heartbeat, dos heartbeats seguits (encara que arribin amb
+    retard) no se salten mai una finestra sencera.
+
+    L'ocupació és la de la finestra anterior (on ja hi són tots els actius)
+    més les entrades noves de l'actual, que reserven plaça amb ``incr`` i la
+    tornen si s'han passat. ``leave`` resta la sessió de ``seen`` (i de les
+    entrades, si ha entrat a la finestra actual); qui deixa d'enviar
+    heartbeats allibera la plaça en una o dues finestres.
+    """
+
+    # Valor de la marca d'una sessió que ha entrat (no renovat) a la finestra
+    JOINED = 'joined'
+
+    def __init__(self, cache_alias='default', window=None, clock=time.time):
+        self.cache = caches[cache_alias]
+        self.window = max(window or 0, HEARTBEAT * 2)
+        self.clock = clock
+
+    def _windows(self):
+        current = int(self.clock() // self.window)
+        return current, current - 1
+
+    def _key(self, event_id, window, suffix):
+        return f'presence:{event_id}:{window}:{suffix}'
+
+    def _incr(self, key):
+        timeout = self.window * 3
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # La clau ha caducat entre add i incr
+            self.cache.set(key, 1, timeout)
+            return 1
+
+    def _decr(self, key):
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            # El comptador ja ha caducat
+            pass
+
+    def _mark(self, event_id, session_id, window, value=1):
+        """Marca la sessió a la finestra (una vegada) i la compta"""
+        if self.cache.add(self._key(event_id, window, f's:{session_id}'), value, self.window * 3):
+            self._incr(self._key(event_id, window, 'seen'))
+
+    def _is_active(self, event_id, session_id, current, previous):
+        keys = [self._key(event_id, w, f's:{session_id}') for w in (current, previous)]
+        return bool(self.cache.get_many(keys))
+
+    def join(self, event_id, session_id, capacity):
+        current, previous = self._windows()
+        if self._is_active(event_id, session_id, current, previous):
+            self._mark(event_id, session_id, current)
+            return Admission(True, self.count(event_id))
+
+        joins_key = self._key(event_id, current, 'joins')
+        joins = self._incr(joins_key)
+        occupied = (self.cache.get(self._key(event_id, previous, 'seen')) or 0) + joins
+        if capacity and occupied > capacity:
+            self.cache.decr(joins_key)
+            return Admission(False, occupied - 1)
+
+        self._mark(event_id, session_id, current, self.JOINED)
+        return Admission(True, max(occupied, self.count(event_id)))
+
+    def heartbeat(self, event_id, session_id):
+        current, previous = self._windows()
+        if not self._is_active(event_id, session_id, current, previous):
+            return False
+        self._mark(event_id, session_id, current)
+        return True
+
+    def leave(self, event_id, session_id):
+        current, previous = self._windows()
+        for window in (current, previous):
+            key = self._key(event_id, window, f's:{session_id}')
+            mark = self.cache.get(key)
+            # Només qui esborra la marca descompta (dues sortides alhora no resten dues vegades)
+            if mark is None or not self.cache.delete(key):
+                continue
+            self._decr(self._key(event_id, window, 'seen'))
+            if mark == self.JOINED:
+                self._decr(self._key(event_id, window, 'joins'))
+
+    def count(self, event_id):
+        current, previous = self._windows()
+        keys = [self._key(event_id, w, 'seen') for w in (current, previous)]
+        counts = self.cache.get_many(keys)
+        return max(counts.values(), default=0)
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        path = getattr(settings, 'EVENT_PRESENCE_STORE', 'events.presence.CachePresenceStore')
+        _store = import_string(path)()
+    return _store
+
+
+def set_store(store):
+    """Substitueix el magatzem (p. ex. a les proves); retorna l'anterior"""
+    global _store
+    previous, _store = _store, store
+    return previous
+
+
+def capacity_key(event_id):
+    return f'presence:capacity:{event_id}'
+
+
+def get_capacity(event_id):
+    """``max_viewers`` de l'esdeveniment, o ``None`` si no existeix"""
+    key = capacity_key(event_id)
+    capacity = cache.get(key)
+    if capacity is None:
+        capacity = Event.objects.filter(pk=event_id).values_list('max_viewers', flat=True).first()
+        if capacity is None:
+            return None
+        cache.set(key, capacity, CAPACITY_TIMEOUT)
+    return capacity
@@ -0,0 +1,247 @@
+"""
+Lectures calentes directament amb pymongo, sense passar per djongo.
+
+Cada consulta de l'ORM amb djongo genera SQL, l'analitza amb sqlparse i en
+reconstrueix una consulta de Mongo. Per als llistats més demanats (portada i
+destacats, categoria, esdeveniments d'un creador) i els seus recomptes,
+aquest mòdul envia directament pipelines d'agregació amb projecció (només
+les columnes de ``LISTING_FIELDS`` i el nom d'usuari del creador amb un
+``$lookup`` per índex) i en construeix instàncies amb ``Event.from_db``,
+com faria l'ORM. Les escriptures continuen passant per l'ORM.
+
+S'activa per vista amb ``EVENT_MONGO_READ_VIEWS`` (p. ex. ``event_list``,
+``events_by_category``, ``event_detail``, ``my_events``). Amb un altre motor
+(sqlite a les proves) les vistes fan servir sempre l'ORM. Els cursors de
+paginació són els de ``events.pagination``: es poden barrejar els dos camins.
+"""
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from config.metrics import record_query
+
+from .models import LISTING_FIELDS, CategoryEventStats, Event
+from .pagination import ORDER_BY_CREATED, ORDER_BY_SCHEDULED, CursorPaginator, paginate
+from .search import date_bounds
+
+User = get_user_model()
+
+EVENTS = Event._meta.db_table
+CATEGORY_STATS = CategoryEventStats._meta.db_table
+USERS = User._meta.db_table
+CREATOR_USERNAME = 'creator_username'
+
+
+def available(alias=DEFAULT_DB_ALIAS):
+    return connections[alias].settings_dict['ENGINE'] == 'djongo'
+
+
+def enabled(view):
+    """La vista ``view`` llegeix amb pymongo (si la base de dades és MongoDB)"""
+    return view in getattr(settings, 'EVENT_MONGO_READ_VIEWS', ()) and available()
+
+
+def get_database(alias=DEFAULT_DB_ALIAS):
+    """``pymongo.database.Database`` de la connexió de Django (client compartit)"""
+    connection = connections[alias]
+    connection.ensure_connection()
+    return connection.connection
+
+
+def aggregate(collection, pipeline):
+    started = time.perf_counter()
+    try:
+        return list(get_database()[collection].aggregate(pipeline))
+    finally:
+        # Es compta a Server-Timing i a /metrics/ com qualsevol consulta
+        record_query(time.perf_counter() - started)
+
+
+# --- Documents → instàncies ---
+
+def _fields(model, names):
+    """Camps concrets de ``names``, en l'ordre que espera ``Model.from_db``"""
+    attnames = {model._meta.get_field(name).attname for name in names}
+    return [field for field in model._meta.concrete_fields if field.attname in attnames]
+
+
+LISTING_COLUMNS = _fields(Event, LISTING_FIELDS)
+CREATOR_COLUMNS = _fields(User, ('id', 'username'))
+
+
+def _aware(value):
+    # pymongo retorna les dates en UTC i sense zona
+    if isinstance(value, datetime) and settings.USE_TZ and timezone.is_naive(value):
+        return timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def _value(field, document):
+    if field.column not in document:
+        # Document anterior al camp (djongo no afegeix columnes noves als existents)
+        return field.get_default()
+    return _aware(document[field.column])
+
+
+def _instance(model, fields, document):
+    return model.from_db(
+        DEFAULT_DB_ALIAS,
+        [field.attname for field in fields],
+        [_value(field, document) for field in fields],
+    )
+
+
+def to_event(document):
+    event = _instance(Event, LISTING_COLUMNS, document)
+    if CREATOR_USERNAME in document:
+        creator = None
+        if document[CREATOR_USERNAME] is not None:
+            creator = _instance(User, CREATOR_COLUMNS, {'id': event.creator_id, 'username': document[CREATOR_USERNAME]})
+        # Com select_related: event.creator no torna a consultar
+        Event.creator.field.set_cached_value(event, creator)
+    return event
+
+
+# --- Pipelines ---
+
+def column(name):
+    return 'id' if name == 'pk' else Event._meta.get_field(name).column
+
+
+def projection(with_creator):
+    fields = {'_id': 0, **{field.column: 1 for field in LISTING_COLUMNS}}
+    if with_creator:
+        fields[CREATOR_USERNAME] = {'$ifNull': [{'$arrayElemAt': ['$creator.username', 0]}, None]}
+    return fields
+
+
+def listing_pipeline(match, sort, limit, with_creator=True):
+    """Filtre, ordenació i límit sobre índexs; el $lookup només per a les files finals"""
+    pipeline = [{'$match': match}, {'$sort': sort}, {'$limit': limit}]
+    if with_creator:
+        pipeline.append({
+            '$lookup': {'from': USERS, 'localField': 'creator_id', 'foreignField': 'id', 'as': 'creator'},
+        })
+    pipeline.append({'$project': projection(with_creator)})
+    return pipeline
+
+
+def keyset_match(fields, values, reverse):
+    """Equivalent de ``CursorPaginator._keyset_filter`` en un filtre de Mongo"""
+    terms = []
+    for i, (name, descending) in enumerate(fields):
+        operator = '$lt' if descending != reverse else '$gt'
+        term = {column(prev_name): values[j] for j, (prev_name, _) in enumerate(fields[:i])}
+        term[column(name)] = {operator: values[i]}
+        terms.append(term)
+    return {'$or': terms}
+
+
+def listing_match(category='', status='', date_from=None, date_to=None, **extra):
+    """Equivalent de ``events.search.apply_filters``"""
+    match = {column(name): value for name, value in extra.items()}
+    if category:
+        match['category'] = category
+    if status:
+        match['status'] = status
+    start, end = date_bounds(date_from, date_to)
+    if start or end:
+        match['scheduled_date'] = {}
+        if start:
+            match['scheduled_date']['$gte'] = start
+        if end:
+            match['scheduled_date']['$lt'] = end
+    return match
+
+
+class MongoCursorPaginator(CursorPaginator):
+    """``CursorPaginator`` amb la mateixa ordenació i cursors, llegit amb pymongo"""
+
+    def __init__(self, match, ordering=ORDER_BY_CREATED, page_size=12, with_creator=True):
+        # El queryset només serveix per als tipus dels camps del cursor
+        super().__init__(Event.objects.none(), ordering=ordering, page_size=page_size)
+        self.match = match
+        self.with_creator = with_creator
+
+    def fetch(self, values, reverse, limit):
+        match = self.match
+        if values is not None:
+            keyset = keyset_match(self._fields, values, reverse)
+            match = {'$and': [match, keyset]} if match else keyset
+        sort = {column(name): -1 if descending != reverse else 1 for name, descending in self._fields}
+        documents = aggregate(EVENTS, listing_pipeline(match, sort, limit, self.with_creator))
+        return [to_event(document) for document in documents]
+
+
+# --- Lectures de les vistes ---
+
+def list_page(request, filters):
+    """``events.views.list_page`` sense cerca de text"""
+    match = listing_match(
+        filters.get('category', ''), filters.get('status', ''), filters.get('date_from'), filters.get('date_to'),
+    )
+    return paginate(request, MongoCursorPaginator(match, ORDER_BY_CREATED, page_size=12))
+
+
+def featured_events():
+    match = {'is_featured': True, 'status': {'$in': ['scheduled', 'live']}}
+    documents = aggregate(EVENTS, listing_pipeline(match, {'created_at': -1, 'id': 1}, 6))
+    return [to_event(document) for document in documents]
+
+
+def category_page(request, category):
+    return paginate(request, MongoCursorPaginator({'category': category}, ORDER_BY_SCHEDULED, page_size=12))
+
+
+def creator_page(request, creator_id, status=''):
+    """Esdeveniments d'un creador (``my_events``): el creador ja és conegut, sense $lookup"""
+    match = listing_match(status=status, creator=creator_id)
+    return paginate(request, MongoCursorPaginator(match, ORDER_BY_CREATED, page_size=20, with_creator=False))
+
+
+def _state(match):
+    """Darrer ``updated_at`` i recompte dels documents de ``match`` (només aquests dos valors)"""
+    rows = aggregate(EVENTS, [
+        {'$match': match},
+        {'$group': {'_id': None, 'latest': {'$max': '$updated_at'}, 'total': {'$sum': 1}}},
+    ])
+    if not rows:
+        return {'latest': None, 'total': 0}
+    return {'latest': _aware(rows[0]['latest']), 'total': rows[0]['total']}
+
+
+def _find_one(collection, query, projection, sort=None):
+    started = time.perf_counter()
+    try:
+        return get_database()[collection].find_one(query, projection, sort=sort)
+    finally:
+        record_query(time.perf_counter() - started)
+
+
+def category_state(category):
+    """
+    Com ``events.views.category_state``: el recompte per clau a
+    ``CategoryEventStats`` i el darrer canvi amb un sol salt a l'índex
+    (category, updated_at), sense recórrer la categoria.
+    """
+    counter = _find_one(CATEGORY_STATS, {'category': category}, {'_id': 0, 'total': 1})
+    if counter is None:
+        return {'latest': None, 'total': 0}
+    latest = _find_one(EVENTS, {'category': category}, {'_id': 0, 'updated_at': 1}, sort=[('updated_at', -1)])
+    return {'latest': _aware(latest['updated_at']) if latest else None, 'total': counter['total']}
+
+
+def detail_state(pk):
+    """
+    Com ``events.views.detail_state``. El creador es llegeix primer (índex
+    id) i l'agregació es fa sobre l'índex (creator, updated_at): el servidor
+    no carrega cap document sencer dels altres esdeveniments.
+    """
+    event = _find_one(EVENTS, {'id': pk}, {'_id': 0, 'creator_id': 1})
+    if event is None or event.get('creator_id') is None:
+        return {'latest': None, 'total': 0}
+    return _state({'creator_id': event['creator_id']})
@@ -0,0 +1,150 @@
+"""
+Planificador de transicions d'estat dels esdeveniments.
+
+Manté una cua ordenada per temps (heap) amb els pròxims terminis
+``scheduled → live`` (a ``scheduled_date``) i ``live → finished``
+(a ``scheduled_date + get_duration()``) dins d'un horitzó. Quan un termini
+vence, les transicions s'apliquen en bloc amb ``update()`` condicionals
+(``WHERE pk IN (...) AND status = <estat anterior>``), de manera que una
+edició concurrent (p. ex. cancel·lar) mai es trepitja. Des de la cua també
+es comprova que el termini continuï vençut: una entrada d'un esdeveniment
+ajornat després de carregar la cua no el fa passar a directe abans d'hora.
+"""
+import heapq
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Event, EventSearchToken
+from .signals import event_status_changed
+
+SCHEDULED_TO_LIVE = ('scheduled', 'live')
+LIVE_TO_FINISHED = ('live', 'finished')
+
+CHUNK_SIZE = 1000
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _due_filter(transition, now):
+    """Esdeveniments amb el termini de ``transition`` vençut a ``now``"""
+    if transition == SCHEDULED_TO_LIVE:
+        return Q(scheduled_date__lte=now)
+    due = Q()
+    for category, _, latest_start in _live_deadline_filters(now):
+        due |= Q(category=category, scheduled_date__lte=latest_start)
+    return due
+
+
+def apply_transition(pks, transition, now=None, due_only=False):
+    """
+    Aplica una transició a un conjunt d'esdeveniments de forma condicional.
+
+    Amb ``due_only`` només canvien els que tenen el termini vençut a
+    ``now`` (les entrades de la cua poden haver quedat desfasades).
+    Retorna la llista de pks que realment han canviat d'estat.
+    """
+    from_status, to_status = transition
+    now = now or timezone.now()
+    changed = []
+    for chunk in _chunks(list(pks)):
+        # Només canvien els que encara tenen l'estat anterior
+        eligible = Event.objects.filter(pk__in=chunk, status=from_status)
+        if due_only:
+            eligible = eligible.filter(_due_filter(transition, now))
+        eligible = list(eligible.values_list('pk', flat=True))
+        if not eligible:
+            continue
+        Event.objects.filter(pk__in=eligible, status=from_status).update(
+            status=to_status, updated_at=now
+        )
+        # L'índex de cerca desnormalitza l'estat
+        EventSearchToken.objects.filter(event_id__in=eligible).update(status=to_status)
+        changed.extend(eligible)
+
+    if changed:
+        event_status_changed.send(
+            sender=Event, pks=changed, from_status=from_status, to_status=to_status
+        )
+    return changed
+
+
+def _live_deadline_filters(until):
+    """Un filtre per categoria: en directe i amb final abans de ``until``"""
+    for category, _ in Event.CATEGORY_CHOICES:
+        minutes = Event.CATEGORY_DURATIONS.get(category, Event.DEFAULT_DURATION)
+        yield category, minutes, until - timedelta(minutes=minutes)
+
+
+class StatusScheduler:
+    """Cua de terminis de transició d'estat ordenada per temps"""
+
+    def __init__(self, horizon=timedelta(minutes=15), clock=timezone.now):
+        self.horizon = horizon
+        self.clock = clock
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, deadline, pk, transition):
+        heapq.heappush(self._heap, (deadline, pk, transition))
+
+    def refresh(self, now=None):
+        """Recarrega la cua amb tots els terminis fins a ``now + horizon``"""
+        now = now or self.clock()
+        until = now + self.horizon
+        self._heap = []
+
+        scheduled = Event.objects.filter(
+            status='scheduled', scheduled_date__lte=until
+        ).values_list('pk', 'scheduled_date')
+        for pk, scheduled_date in scheduled.iterator():
+            self._heap.append((scheduled_date, pk, SCHEDULED_TO_LIVE))
+
+        for category, minutes, latest_start in _live_deadline_filters(until):
+            live = Event.objects.filter(
+                status='live', category=category, scheduled_date__lte=latest_start
+            ).values_list('pk', 'scheduled_date')
+            for pk, scheduled_date in live.iterator():
+                self._heap.append((scheduled_date + timedelta(minutes=minutes), pk, LIVE_TO_FINISHED))
+
+        heapq.heapify(self._heap)
+        return len(self._heap)
+
+    def next_deadline(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Treu de la cua totes les entrades vençudes, agrupades per transició"""
+        now = now or self.clock()
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            _, pk, transition = heapq.heappop(self._heap)
+            due.setdefault(transition, []).append(pk)
+        return due
+
+    def run_due(self, now=None):
+        """Aplica les transicions vençudes i retorna {transició: nombre}"""
+        now = now or self.clock()
+        applied = {}
+        for transition, pks in self.pop_due(now).items():
+            changed = apply_transition(pks, transition, now, due_only=True)
+            applied[transition] = len(changed)
+            if transition == SCHEDULED_TO_LIVE and changed:
+                self._queue_finish(changed, now)
+        return applied
+
+    def _queue_finish(self, pks, now):
+        """Afegeix a la cua el final dels que acaben d'entrar en directe"""
+        until = now + self.horizon
+        rows = Event.objects.filter(pk__in=pks).values_list('pk', 'category', 'scheduled_date')
+        for pk, category, scheduled_date in rows:
+            minutes = Event.CATEGORY_DURATIONS.get(category, Event.DEFAULT_DURATION)
+            end = scheduled_date + timedelta(minutes=minutes)
+            if end <= until:
+                self.push(end, pk, LIVE_TO_FINISHED)
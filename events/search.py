@@ -0,0 +1,184 @@
+"""
+Cerca d'esdeveniments amb un índex invertit.
+
+Cada esdeveniment es tokenitza (títol, descripció i etiquetes) i es desa
+una fila ``EventSearchToken`` per terme amb un pes. Una cerca només llegeix
+les entrades dels termes demanats, filtrades per categoria/estat/data dins
+del mateix índex, i les agrega per esdeveniment per ordenar-les per
+rellevància.
+"""
+import re
+import unicodedata
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .models import Event, EventSearchToken
+from .pagination import CursorPage
+
+# Pes de cada camp en la puntuació
+TITLE_WEIGHT = 5
+TAGS_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+STOPWORDS = frozenset({
+    'a', 'al', 'amb', 'de', 'del', 'dels', 'el', 'els', 'en', 'es', 'i',
+    'la', 'les', 'per', 'que', 'un', 'una', 'y', 'the', 'and', 'of', 'to',
+})
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Normalitza (minúscules, sense accents) i separa el text en termes"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in _TOKEN_RE.findall(text)
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def build_terms(event):
+    """Retorna {terme: pes} per a un esdeveniment"""
+    weights = {}
+    fields = (
+        (event.title, TITLE_WEIGHT),
+        (event.tags, TAGS_WEIGHT),
+        (event.description, DESCRIPTION_WEIGHT),
+    )
+    for text, weight in fields:
+        for term in tokenize(text):
+            weights[term] = weights.get(term, 0) + weight
+    return weights
+
+
+def build_tokens(event):
+    return [
+        EventSearchToken(
+            term=term,
+            event_id=event.pk,
+            weight=weight,
+            category=event.category,
+            status=event.status,
+            scheduled_date=event.scheduled_date,
+        )
+        for term, weight in build_terms(event).items()
+    ]
+
+
+def index_event(event):
+    """(Re)indexa un esdeveniment: substitueix les seves entrades de l'índex"""
+    index_events([event])
+
+
+def index_events(events, batch_size=None):
+    """
+    (Re)indexa un bloc d'esdeveniments en una transacció: les cerques veuen
+    les entrades anteriors o les noves, mai el bloc sense indexar.
+    Retorna el nombre d'entrades creades.
+    """
+    tokens = []
+    for event in events:
+        tokens.extend(build_tokens(event))
+    with transaction.atomic():
+        EventSearchToken.objects.filter(event_id__in=[event.pk for event in events]).delete()
+        EventSearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+    return len(tokens)
+
+
+def unindex_event(event_id):
+    EventSearchToken.objects.filter(event_id=event_id).delete()
+
+
+def date_bounds(date_from, date_to):
+    tz = timezone.get_current_timezone()
+    start = end = None
+    if date_from:
+        start = timezone.make_aware(datetime.combine(date_from, time.min), tz)
+    if date_to:
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def apply_filters(queryset, category='', status='', date_from=None, date_to=None):
+    """Aplica els filtres del formulari (sobre Event o sobre l'índex)"""
+    if category:
+        queryset = queryset.filter(category=category)
+    if status:
+        queryset = queryset.filter(status=status)
+    start, end = date_bounds(date_from, date_to)
+    if start:
+        queryset = queryset.filter(scheduled_date__gte=start)
+    if end:
+        queryset = queryset.filter(scheduled_date__lt=end)
+    return queryset
+
+
+def search_events(query, category='', status='', date_from=None, date_to=None,
+                  offset=0, limit=12):
+    """
+    Cerca esdeveniments que contenen tots els termes de ``query``.
+
+    Retorna ``(events, has_next)`` amb els esdeveniments ordenats per
+    puntuació (suma de pesos) i, en cas d'empat, pels més propers.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return [], False
+
+    postings = apply_filters(
+        EventSearchToken.objects.filter(term__in=terms),
+        category, status, date_from, date_to,
+    )
+    ranked = list(
+        postings.values('event_id')
+        .annotate(matches=Count('term'), score=Sum('weight'), date=Max('scheduled_date'))
+        .filter(matches=len(terms))
+        .order_by('-score', '-date', 'event_id')
+        .values_list('event_id', flat=True)[offset:offset + limit + 1]
+    )
+    has_next = len(ranked) > limit
+    ranked = ranked[:limit]
+
+    events_by_id = Event.objects.for_listing().in_bulk(ranked)
+    return [events_by_id[pk] for pk in ranked if pk in events_by_id], has_next
+
+
+def paginate_search(request, filters, page_size=12):
+    """
+    Pàgina de resultats de cerca compatible amb ``CursorPage``.
+
+    Els resultats estan ordenats per rellevància, no per una clau estable,
+    així que aquí el cursor és simplement el desplaçament dins del rànquing.
+    """
+    params = request.GET.copy()
+    cursor = params.pop('cursor', ['0'])[-1]
+    try:
+        offset = max(0, int(cursor))
+    except (TypeError, ValueError):
+        offset = 0
+
+    events, has_next = search_events(
+        filters.get('search', ''),
+        category=filters.get('category', ''),
+        status=filters.get('status', ''),
+        date_from=filters.get('date_from'),
+        date_to=filters.get('date_to'),
+        offset=offset,
+        limit=page_size,
+    )
+    return CursorPage(
+        events,
+        next_cursor=str(offset + page_size) if has_next else None,
+        previous_cursor=str(max(0, offset - page_size)) if offset else None,
+        querystring=params.urlencode(),
+    )
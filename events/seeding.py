@@ -0,0 +1,184 @@
+"""
+Generació de dades de prova per a ``seed_events``.
+
+Aquest mòdul no depèn de l'ORM perquè el mode ``--bulk`` el pugui executar
+en processos separats: cada bloc rep la seva llavor i genera diccionaris
+amb els camps de l'esdeveniment, que el procés principal insereix amb
+``bulk_create``.
+"""
+import random
+from datetime import timedelta
+
+from faker import Faker
+
+# --- Categories i estadístiques ---
+CATEGORIES = [
+    ('gaming', '🎮'),
+    ('music', '🎵'), 
+    ('talk', '💬'),
+    ('education', '📚'),
+    ('sports', '⚽'),
+    ('entertainment', '🎭'),
+    ('technology', '💻'),
+    ('art', '🎨'),
+    ('other', '📅'),
+]
+
+STATUS_CHOICES = ['scheduled', 'live', 'finished', 'cancelled']
+# Pesos per a la probabilitat de cada estat
+STATUS_WEIGHTS = [50, 15, 30, 5]  # 50% scheduled, 15% live, 30% finished, 5% cancelled
+
+# --- Tags per categories ---
+TAGS_BY_CATEGORY = {
+    'gaming': ['fortnite', 'valorant', 'league of legends', 'minecraft', 'gaming', 'torneig', 'esports'],
+    'music': ['jazz', 'rock', 'electrònica', 'acústic', 'concert', 'música', 'en viu', 'dj'],
+    'talk': ['debat', 'xerrada', 'conferència', 'discussió', 'educatiu', 'tecnologia'],
+    'education': ['taller', 'tutorial', 'curs', 'aprenentatge', 'programació', 'python', 'web'],
+    'sports': ['futbol', 'esports', 'competició', 'marató', 'fitness', 'entrenament'],
+    'entertainment': ['comèdia', 'cuina', 'creatiu', 'divertiment', 'streaming'],
+    'technology': ['ia', 'blockchain', 'programació', 'tecnologia', 'innovació', 'startup'],
+    'art': ['fotografia', 'dibuix', 'pintura', 'creativitat', 'disseny', 'art digital'],
+    'other': ['comunitat', 'xarrada', 'q&a', 'reunió', 'networking'],
+}
+
+# --- Stream URLs per categories ---
+STREAM_URLS = {
+    'gaming': [
+        'https://www.twitch.tv/gamingstream',
+        'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+        'https://www.twitch.tv/esportstv',
+    ],
+    'music': [
+        'https://youtu.be/6LASz6HAL7E?si=WH4iBi4sjZSDyCkp',
+        'https://youtu.be/9vDL7AgLdYQ?si=3uA1VJAs-VQ_zmCv',
+        'https://youtu.be/Ov5ljc44Ajs?si=x10x7CMZQf9LPIG8',
+    ],
+    'talk': [
+        'https://www.youtube.com/watch?v=video_id_talk1',
+        'https://www.youtube.com/watch?v=video_id_talk2',
+    ],
+    'education': [
+        'https://www.youtube.com/watch?v=video_id_edu1',
+        'https://www.youtube.com/watch?v=video_id_edu2',
+    ],
+    'other': [
+        'https://www.twitch.tv/community',
+        'https://www.youtube.com/watch?v=video_id_other',
+    ]
+}
+
+
+def build_event(rng, faker, now, creators):
+    """Genera els camps d'un esdeveniment aleatori (creador triat de ``creators``)"""
+    # Seleccionar categoria aleatòria
+    category_code, category_emoji = rng.choice(CATEGORIES)
+
+    # Seleccionar estat amb probabilitats
+    status = rng.choices(STATUS_CHOICES, weights=STATUS_WEIGHTS, k=1)[0]
+
+    # Crear data programada (dels darrers 30 dies als pròxims 60 dies)
+    days_offset = rng.randint(-30, 60)
+    hours_offset = rng.randint(0, 23)
+    minutes_offset = rng.randint(0, 59)
+
+    scheduled_date = now + timedelta(
+        days=days_offset,
+        hours=hours_offset,
+        minutes=minutes_offset
+    )
+
+    # Ajustar estat segons la data
+    if scheduled_date < now and status == 'scheduled':
+        status = rng.choice(['finished', 'live'])
+    elif scheduled_date > now + timedelta(days=1) and status == 'live':
+        status = 'scheduled'
+
+    # Títol i descripció segons categoria
+    if category_code == 'gaming':
+        games = ['Fortnite', 'Valorant', 'League of Legends', 'Minecraft', 'Call of Duty']
+        game = rng.choice(games)
+        title = f"{category_emoji} {rng.choice(['Torneig', 'Marató', 'Streaming', 'Competició'])} de {game}"
+        description = faker.paragraph(nb_sentences=3) + f" {game} amb jugadors de diferents nivells."
+
+    elif category_code == 'music':
+        genres = ['Jazz', 'Rock', 'Electrònica', 'Acústic', 'Hip Hop']
+        genre = rng.choice(genres)
+        title = f"{category_emoji} {rng.choice(['Concert', 'Jam Session', 'Live Set', 'Sessió'])} de {genre}"
+        description = faker.paragraph(nb_sentences=3) + f" Gènere {genre.lower()} amb artistes {rng.choice(['locals', 'internacionals', 'emergents'])}."
+
+    elif category_code == 'talk':
+        topics = ['Intel·ligència Artificial', 'Canvi Climàtic', 'Salut Mental', 'Blockchain', 'Emprenedoria']
+        topic = rng.choice(topics)
+        title = f"{category_emoji} {rng.choice(['Xerrada', 'Debat', 'Conferència', 'Ponent'])}: {topic}"
+        description = faker.paragraph(nb_sentences=3) + f" Sobre {topic.lower()} amb experts del sector."
+
+    elif category_code == 'education':
+        subjects = ['Python', 'Desenvolupament Web', 'Fotografia', 'Dibuix Digital', 'Cuina']
+        subject = rng.choice(subjects)
+        title = f"{category_emoji} {rng.choice(['Taller', 'Curs', 'Tutorial', 'Masterclass'])}: {subject}"
+        description = faker.paragraph(nb_sentences=3) + f" Aprengues {subject.lower()} des de zero amb professionals."
+
+    else:
+        title = f"{category_emoji} {faker.sentence(nb_words=4)}"
+        description = faker.paragraph(nb_sentences=3)
+
+    # Tags aleatoris
+    tags_list = rng.sample(TAGS_BY_CATEGORY.get(category_code, ['esdeveniment', 'streaming']), 
+                           min(3, len(TAGS_BY_CATEGORY.get(category_code, ['esdeveniment']))))
+    tags = ', '.join(tags_list)
+
+    # Stream URL segons categoria
+    stream_url = rng.choice(STREAM_URLS.get(category_code, STREAM_URLS['other']))
+
+    # Seleccionar creador aleatori
+    creator = rng.choice(creators)
+
+    # Determinar si és destacat (20% de probabilitat)
+    is_featured = rng.random() < 0.2
+
+    # Màxim d'espectadors
+    max_viewers = rng.choice([50, 100, 150, 200, 300, 500])
+
+    return {
+        'title': title,
+        'description': description,
+        'creator': creator,
+        'category': category_code,
+        'scheduled_date': scheduled_date,
+        'status': status,
+        'max_viewers': max_viewers,
+        'is_featured': is_featured,
+        'tags': tags,
+        'stream_url': stream_url,
+    }
+
+
+_faker = None
+
+
+def _get_faker():
+    # Un sol Faker per procés (crear-lo és car)
+    global _faker
+    if _faker is None:
+        _faker = Faker('es_ES')
+    return _faker
+
+
+def generate_chunk(seed, chunk_index, size, now, creator_ids):
+    """
+    Genera ``size`` esdeveniments de forma determinista per a (seed, chunk_index).
+
+    Es pot cridar des d'un ProcessPoolExecutor: només rep i retorna tipus
+    simples. El creador es retorna com a ``creator_id``.
+    """
+    chunk_seed = seed * 1_000_003 + chunk_index
+    rng = random.Random(chunk_seed)
+    faker = _get_faker()
+    faker.seed_instance(chunk_seed)
+
+    rows = []
+    for _ in range(size):
+        row = build_event(rng, faker, now, creator_ids)
+        row['creator_id'] = row.pop('creator')
+        rows.append(row)
+    return rows
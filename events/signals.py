@@ -0,0 +1,142 @@
+# events/signals.py
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from .cards import invalidate_cards
+from .models import Event
+from .presence import capacity_key
+from .search import index_event
+from . import stats
+from .streams import broker
+from .tags import release_event_tags, sync_event_tags
+from . import thumbnails
+
+# Enviat quan el planificador canvia l'estat d'esdeveniments en bloc
+# (update() no dispara post_save). Arguments: pks, from_status, to_status
+event_status_changed = Signal()
+
+
+@receiver(post_save, sender=Event)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    """Manté l'índex de cerca al dia a cada desat (l'esborrat va en cascada)"""
+    if raw:
+        return
+    index_event(instance)
+
+
+@receiver(post_save, sender=Event)
+def update_event_tags(sender, instance, raw=False, **kwargs):
+    """Sincronitza les etiquetes normalitzades amb la llista de comes"""
+    if raw:
+        return
+    sync_event_tags(instance)
+
+
+@receiver(pre_delete, sender=Event)
+def release_tags_on_delete(sender, instance, **kwargs):
+    release_event_tags(instance.pk)
+
+
+@receiver(post_save, sender=Event)
+def update_creator_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    stats.event_saved(instance, created)
+
+
+@receiver(post_delete, sender=Event)
+def update_creator_stats_on_delete(sender, instance, **kwargs):
+    stats.event_deleted(instance)
+
+
+@receiver(event_status_changed, sender=Event)
+def update_creator_stats_on_transition(sender, pks, from_status, to_status, **kwargs):
+    stats.events_transitioned(pks, from_status, to_status)
+
+
+@receiver(pre_save, sender=Event)
+def remember_status_change(sender, instance, raw=False, **kwargs):
+    """
+    Abans de desar, '_loaded_status' encara és l'estat llegit de la BBDD
+    (stats.event_saved l'actualitza al post_save).
+    """
+    previous = getattr(instance, '_loaded_status', None)
+    instance._status_change = None
+    if not raw and previous is not None and previous != instance.status:
+        instance._status_change = (previous, instance.status)
+
+
+@receiver(post_save, sender=Event)
+def publish_status_change(sender, instance, raw=False, **kwargs):
+    change = getattr(instance, '_status_change', None)
+    if raw or not change:
+        return
+    previous, status = change
+    pk = instance.pk
+    transaction.on_commit(lambda: broker.publish(pk, status, previous))
+
+
+@receiver(event_status_changed, sender=Event)
+def publish_transitions(sender, pks, from_status, to_status, **kwargs):
+    pks = list(pks)
+
+    def publish():
+        for pk in pks:
+            broker.publish(pk, to_status, from_status)
+
+    transaction.on_commit(publish)
+
+
+@receiver(pre_save, sender=Event)
+def invalidate_card_on_save(sender, instance, raw=False, **kwargs):
+    """
+    En aquest punt 'updated_at' encara té el valor carregat (auto_now s'aplica
+    després), així que podem esborrar la targeta antiga sense cap consulta.
+    """
+    if raw or instance.pk is None:
+        return
+    invalidate_cards([(instance.pk, instance.updated_at)])
+
+
+@receiver(post_save, sender=Event)
+def forget_presence_capacity(sender, instance, created, raw=False, **kwargs):
+    """max_viewers es guarda a la memòria cau per admetre sense consultes"""
+    if raw or created:
+        return
+    cache.delete(capacity_key(instance.pk))
+
+
+@receiver(post_save, sender=Event)
+def schedule_thumbnails(sender, instance, raw=False, **kwargs):
+    """Portada nova: els derivats es generen en segon pla després del commit"""
+    if raw or not instance.thumbnail or not getattr(instance, '_thumbnail_changed', False):
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: thumbnails.schedule(pk))
+
+
+@receiver(post_delete, sender=Event)
+def invalidate_card_on_delete(sender, instance, **kwargs):
+    invalidate_cards([(instance.pk, instance.updated_at)])
+
+
+def invalidate_creator_cards(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    El nom del creador surt a les targetes però no a la clau: les esborrem.
+    (En eliminar un usuari, els seus esdeveniments s'eliminen en cascada i
+    ja passen per invalidate_card_on_delete.)
+    """
+    if raw or instance.pk is None:
+        return
+    # p. ex. el login només actualitza 'last_login'
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    invalidate_cards(
+        Event.objects.filter(creator_id=instance.pk).values_list('pk', 'updated_at').iterator()
+    )
+
+
+post_save.connect(invalidate_creator_cards, sender=get_user_model())
@@ -0,0 +1,159 @@
+"""
+Manteniment dels comptadors ``CreatorEventStats`` i ``CategoryEventStats``.
+
+Cada creació, eliminació o canvi d'estat (o de categoria) ajusta els
+comptadors amb ``update()`` i expressions ``F()`` (atòmiques a la base de
+dades), de manera que el tauler de "Els meus esdeveniments" i el validador
+de la pàgina de categoria només han de llegir una fila.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import CategoryEventStats, CreatorEventStats, Event
+
+STATUS_FIELDS = tuple(code for code, _ in Event.STATUS_CHOICES)
+
+
+def adjust(creator_id, **deltas):
+    """Suma ``deltas`` (camp → increment) als comptadors d'un creador"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not creator_id or not deltas:
+        return
+
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if CreatorEventStats.objects.filter(creator_id=creator_id).update(**updates):
+        return
+    if not any(delta > 0 for delta in deltas.values()):
+        # Només restes sense fila: p. ex. l'esborrat en cascada d'un usuari,
+        # que ja ha eliminat la seva fila (no s'ha de tornar a crear)
+        return
+
+    # Primera vegada per aquest creador: partim del recompte real
+    try:
+        with transaction.atomic():
+            CreatorEventStats.objects.create(creator_id=creator_id, **count_for_creator(creator_id))
+    except IntegrityError:
+        # Un altre procés l'ha creat alhora: n'hi ha prou amb l'increment
+        CreatorEventStats.objects.filter(creator_id=creator_id).update(**updates)
+
+
+def adjust_category(category, delta):
+    """Suma ``delta`` al recompte de ``category`` (com ``adjust``)"""
+    if not category or not delta:
+        return
+    if CategoryEventStats.objects.filter(category=category).update(total=F('total') + delta):
+        return
+    if delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            CategoryEventStats.objects.create(
+                category=category, total=Event.objects.filter(category=category).count()
+            )
+    except IntegrityError:
+        CategoryEventStats.objects.filter(category=category).update(total=F('total') + delta)
+
+
+def count_for_creator(creator_id):
+    counts = dict.fromkeys(STATUS_FIELDS, 0)
+    rows = (
+        Event.objects.filter(creator_id=creator_id)
+        .order_by()
+        .values('status')
+        .annotate(n=Count('id'))
+        .values_list('status', 'n')
+    )
+    for status, n in rows:
+        if status in counts:
+            counts[status] = n
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def event_saved(event, created):
+    if created:
+        adjust(event.creator_id, total=1, **{event.status: 1})
+        adjust_category(event.category, 1)
+        event._loaded_category = event.category
+        return
+
+    old_category = getattr(event, '_loaded_category', None)
+    if old_category is not None:
+        if old_category != event.category:
+            adjust_category(old_category, -1)
+            adjust_category(event.category, 1)
+        event._loaded_category = event.category
+
+    old_status = getattr(event, '_loaded_status', None)
+    old_creator_id = getattr(event, '_loaded_creator_id', None)
+    if old_status is None or old_creator_id is None:
+        # Instància no carregada de la BBDD (o amb camps diferits): no sabem
+        # què ha canviat; la reconciliació ho corregirà
+        return
+
+    if old_creator_id != event.creator_id:
+        adjust(old_creator_id, total=-1, **{old_status: -1})
+        adjust(event.creator_id, total=1, **{event.status: 1})
+    elif old_status != event.status:
+        adjust(event.creator_id, **{old_status: -1, event.status: 1})
+
+    event._loaded_status = event.status
+    event._loaded_creator_id = event.creator_id
+
+
+def event_deleted(event):
+    status = getattr(event, '_loaded_status', None) or event.status
+    creator_id = getattr(event, '_loaded_creator_id', None) or event.creator_id
+    adjust(creator_id, total=-1, **{status: -1})
+    adjust_category(getattr(event, '_loaded_category', None) or event.category, -1)
+
+
+def events_transitioned(pks, from_status, to_status):
+    """Ajusta els comptadors després d'un canvi d'estat en bloc"""
+    per_creator = (
+        Event.objects.filter(pk__in=list(pks))
+        .order_by()
+        .values('creator_id')
+        .annotate(n=Count('id'))
+        .values_list('creator_id', 'n')
+    )
+    for creator_id, n in per_creator:
+        adjust(creator_id, **{from_status: -n, to_status: n})
+
+
+def get_stats(creator):
+    """Retorna els comptadors d'un creador (una lectura per clau única)"""
+    stats = CreatorEventStats.objects.filter(creator=creator).first()
+    return stats or CreatorEventStats(creator=creator)
+
+
+def reconcile(chunk_size=1000):
+    """Reconstrueix tots els comptadors des de la taula d'esdeveniments"""
+    counts = {}
+    rows = (
+        Event.objects.order_by()
+        .values('creator_id', 'status')
+        .annotate(n=Count('id'))
+        .values_list('creator_id', 'status', 'n')
+    )
+    for creator_id, status, n in rows:
+        entry = counts.setdefault(creator_id, dict.fromkeys(STATUS_FIELDS, 0))
+        if status in entry:
+            entry[status] += n
+
+    categories = Event.objects.order_by().values('category').annotate(n=Count('id')).values_list('category', 'n')
+
+    with transaction.atomic():
+        CategoryEventStats.objects.all().delete()
+        CategoryEventStats.objects.bulk_create(
+            [CategoryEventStats(category=category, total=n) for category, n in categories]
+        )
+        CreatorEventStats.objects.all().delete()
+        CreatorEventStats.objects.bulk_create(
+            [
+                CreatorEventStats(creator_id=creator_id, total=sum(entry.values()), **entry)
+                for creator_id, entry in counts.items()
+            ],
+            batch_size=chunk_size,
+        )
+    return len(counts)
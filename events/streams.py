@@ -0,0 +1,323 @@
+"""
+Canvis d'estat en directe amb Server-Sent Events.
+
+``broker`` és un publish/subscribe dins del procés: els desats que canvien
+``Event.status`` i les transicions en bloc del planificador
+(``event_status_changed``) hi publiquen un missatge després del commit. Els
+clients se subscriuen a tots els esdeveniments (``/events/stream/``) o a un
+de sol (``/events/<pk>/stream/``).
+
+Els canvis fets en altres processos (el planificador, altres workers) els
+recull un únic fil vigilant per procés, que només consulta la base de dades
+mentre hi ha subscriptors: una consulta cada ``EVENT_STREAM_POLL_INTERVAL``
+segons per procés en lloc d'un refresc de pàgina per navegador.
+
+Amb Django 4.1 el handler ASGI recorre les respostes en streaming de forma
+síncrona, així que ``StreamRouter`` (a ``config.asgi``) serveix aquestes
+rutes directament com a aplicació ASGI: cada connexió inactiva és només una
+corutina i una cua. Amb WSGI, ``event_stream_view`` serveix el mateix flux
+ocupant un fil per connexió.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = getattr(settings, 'EVENT_STREAM_HEARTBEAT', 15)
+POLL_INTERVAL = getattr(settings, 'EVENT_STREAM_POLL_INTERVAL', 2)
+QUEUE_SIZE = 100
+# Files per consulta del vigilant (es llegeixen pàgines fins a una de curta)
+POLL_PAGE_SIZE = 1000
+RETRY_MS = 5000
+
+ALL = '*'
+
+STREAM_VIEWS = {'events:event_stream', 'events:event_detail_stream'}
+
+
+def status_message(pk, status, previous=None):
+    # Instància en memòria només per reutilitzar l'etiqueta i el color del badge
+    event = Event(status=status)
+    return {
+        'pk': pk,
+        'status': status,
+        'previous': previous,
+        'label': str(event.get_status_display()),
+        'badge_class': event.get_status_badge_class(),
+    }
+
+
+def encode_message(message_id, message):
+    data = json.dumps(message, separators=(',', ':'))
+    return f'id: {message_id}\nevent: status\ndata: {data}\n\n'.encode()
+
+
+HEARTBEAT_CHUNK = b': heartbeat\n\n'
+RETRY_CHUNK = f'retry: {RETRY_MS}\n\n'.encode()
+
+
+class Subscription:
+    """Cua d'un client. Si el client no llegeix, es descarten els més antics."""
+
+    def __init__(self, broker, topics):
+        self.broker = broker
+        self.topics = frozenset(topics)
+
+    def deliver(self, chunk):
+        raise NotImplementedError
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class SyncSubscription(Subscription):
+    def __init__(self, broker, topics):
+        super().__init__(broker, topics)
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+
+    def deliver(self, chunk):
+        while True:
+            try:
+                self.queue.put_nowait(chunk)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    def __init__(self, broker, topics, loop):
+        super().__init__(broker, topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def deliver(self, chunk):
+        # Es publica des de qualsevol fil: la cua només es toca dins del bucle
+        self.loop.call_soon_threadsafe(self._put, chunk)
+
+    def _put(self, chunk):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(chunk)
+
+
+class StatusBroker:
+    def __init__(self, poll_interval=POLL_INTERVAL, remember=10000):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        # Últim estat publicat per esdeveniment: evita duplicats entre els
+        # desats d'aquest procés i el que després troba el vigilant
+        self._last_status = OrderedDict()
+        self._remember = remember
+        self.poll_interval = poll_interval
+        self._watcher = None
+
+    # --- Subscripcions ---
+
+    def subscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+        self._ensure_watcher()
+        return subscription
+
+    def subscribe_sync(self, topics):
+        return self.subscribe(SyncSubscription(self, topics))
+
+    def subscribe_async(self, topics, loop=None):
+        return self.subscribe(AsyncSubscription(self, topics, loop or asyncio.get_running_loop()))
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._subscribers.values())) if self._subscribers else 0
+
+    # --- Publicació ---
+
+    def publish(self, pk, status, previous=None):
+        """Envia el canvi d'estat als subscriptors de ``pk`` i de tots"""
+        with self._lock:
+            if self._last_status.get(pk) == status:
+                return
+            self._last_status[pk] = status
+            self._last_status.move_to_end(pk)
+            while len(self._last_status) > self._remember:
+                self._last_status.popitem(last=False)
+
+            targets = set(self._subscribers.get(ALL, ())) | set(self._subscribers.get(pk, ()))
+            if not targets:
+                return
+            chunk = encode_message(next(self._ids), status_message(pk, status, previous))
+
+        for subscription in targets:
+            subscription.deliver(chunk)
+
+    # --- Vigilant de canvis d'altres processos ---
+
+    def _ensure_watcher(self):
+        if not self.poll_interval:
+            return
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch, name='event-status-watcher', daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        cursor = (timezone.now(), 0)
+        try:
+            while True:
+                time.sleep(self.poll_interval)
+                with self._lock:
+                    # Sense subscriptors el vigilant s'atura (i deixa de consultar)
+                    if not self._subscribers:
+                        self._watcher = None
+                        return
+                try:
+                    cursor = self.poll(cursor)
+                except Exception:
+                    logger.exception("Error consultant canvis d'estat")
+                    close_old_connections()
+        finally:
+            connections.close_all()
+
+    def poll(self, cursor):
+        """
+        Publica l'estat dels esdeveniments modificats després de ``cursor``
+        (``(updated_at, pk)``) i retorna el cursor nou. El planificador dona
+        el mateix ``updated_at`` a tot un bloc de files, així que el pk
+        desempata: el cursor sempre avança encara que una pàgina sencera
+        comparteixi l'instant.
+        """
+        since, last_pk = cursor
+        while True:
+            rows = list(
+                Event.objects.filter(Q(updated_at__gt=since) | Q(updated_at=since, pk__gt=last_pk))
+                .order_by('updated_at', 'pk')
+                .values_list('pk', 'status', 'updated_at')[:POLL_PAGE_SIZE]
+            )
+            for pk, status, updated_at in rows:
+                self.publish(pk, status)
+            if rows:
+                last_pk, _, since = rows[-1]
+            if len(rows) < POLL_PAGE_SIZE:
+                return since, last_pk
+
+
+broker = StatusBroker()
+
+
+def topics_for(pk=None):
+    return [int(pk)] if pk is not None else [ALL]
+
+
+# --- WSGI: un fil per connexió ---
+
+def stream_chunks(topics, heartbeat=HEARTBEAT):
+    subscription = broker.subscribe_sync(topics)
+    try:
+        yield RETRY_CHUNK
+        while True:
+            chunk = subscription.get(timeout=heartbeat)
+            yield chunk if chunk is not None else HEARTBEAT_CHUNK
+    finally:
+        subscription.close()
+
+
+def stream_response(pk=None):
+    response = StreamingHttpResponse(stream_chunks(topics_for(pk)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: no acumular el flux
+    return response
+
+
+# --- ASGI: una corutina per connexió ---
+
+class StreamRouter:
+    """
+    Aplicació ASGI que serveix les rutes de flux (``STREAM_VIEWS``) i passa
+    la resta de peticions a Django.
+    """
+
+    def __init__(self, application, heartbeat=HEARTBEAT):
+        self.application = application
+        self.heartbeat = heartbeat
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'].endswith('/stream/'):
+            try:
+                match = resolve(scope['path'])
+            except Resolver404:
+                match = None
+            if match is not None and match.view_name in STREAM_VIEWS:
+                return await self.stream(topics_for(match.kwargs.get('pk')), receive, send)
+        return await self.application(scope, receive, send)
+
+    async def stream(self, topics, receive, send):
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        subscription = broker.subscribe_async(topics)
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            await send({'type': 'http.response.body', 'body': RETRY_CHUNK, 'more_body': True})
+            while True:
+                next_chunk = asyncio.ensure_future(subscription.queue.get())
+                done, _ = await asyncio.wait(
+                    {next_chunk, disconnected}, timeout=self.heartbeat, return_when=asyncio.FIRST_COMPLETED
+                )
+                if next_chunk not in done:
+                    next_chunk.cancel()
+                if disconnected in done:
+                    break
+                chunk = next_chunk.result() if next_chunk in done else HEARTBEAT_CHUNK
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            subscription.close()
+            disconnected.cancel()
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
@@ -0,0 +1,101 @@
+"""
+Sincronització entre la llista de comes ``Event.tags`` i les etiquetes
+normalitzades (``Tag`` + relació ``Event.tag_items``).
+
+Els formularis, l'admin i ``seed_events`` continuen escrivint ``tags``;
+aquí es tradueix a files de la relació i es mantenen els recomptes
+``Tag.event_count`` de manera incremental.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Event, Tag, parse_tags, tag_slug
+
+EventTag = Event.tag_items.through
+
+
+def get_or_create_tags(names):
+    """Retorna {slug: Tag} per als noms donats, creant els que faltin"""
+    wanted = {}
+    for name in names:
+        wanted.setdefault(tag_slug(name), name)
+    if not wanted:
+        return {}
+
+    tags = {tag.slug: tag for tag in Tag.objects.filter(slug__in=list(wanted))}
+    missing = [Tag(name=name, slug=slug) for slug, name in wanted.items() if slug not in tags]
+    if missing:
+        Tag.objects.bulk_create(missing, ignore_conflicts=True)
+        tags.update(
+            (tag.slug, tag)
+            for tag in Tag.objects.filter(slug__in=[t.slug for t in missing])
+        )
+    return tags
+
+
+def _adjust_counts(tag_ids, delta):
+    if tag_ids:
+        Tag.objects.filter(pk__in=list(tag_ids)).update(event_count=F('event_count') + delta)
+
+
+def sync_event_tags(event):
+    """Fa que ``event.tag_items`` coincideixi amb ``event.tags``"""
+    with transaction.atomic():
+        tags = get_or_create_tags(parse_tags(event.tags))
+        wanted = {tag.pk for tag in tags.values()}
+        current = set(
+            EventTag.objects.filter(event_id=event.pk).values_list('tag_id', flat=True)
+        )
+
+        added = wanted - current
+        removed = current - wanted
+        if removed:
+            EventTag.objects.filter(event_id=event.pk, tag_id__in=list(removed)).delete()
+            _adjust_counts(removed, -1)
+        if added:
+            EventTag.objects.bulk_create(
+                [EventTag(event_id=event.pk, tag_id=tag_id) for tag_id in added],
+                ignore_conflicts=True,
+            )
+            _adjust_counts(added, 1)
+
+
+def release_event_tags(event_id):
+    """Descompta les etiquetes d'un esdeveniment que s'eliminarà"""
+    tag_ids = set(
+        EventTag.objects.filter(event_id=event_id).values_list('tag_id', flat=True)
+    )
+    _adjust_counts(tag_ids, -1)
+
+
+def backfill_tags(events):
+    """
+    Crea les relacions per a un bloc d'esdeveniments (sense relacions prèvies).
+
+    Retorna el nombre de relacions creades. Els recomptes s'han de
+    recalcular després amb ``recount_tags``.
+    """
+    names = []
+    for event in events:
+        names.extend(parse_tags(event.tags))
+    tags = get_or_create_tags(names)
+
+    links = []
+    for event in events:
+        for name in parse_tags(event.tags):
+            links.append(EventTag(event_id=event.pk, tag_id=tags[tag_slug(name)].pk))
+    EventTag.objects.bulk_create(links, ignore_conflicts=True)
+    return len(links)
+
+
+def recount_tags():
+    """Recalcula ``Tag.event_count`` des de la relació"""
+    counts = dict(
+        EventTag.objects.values('tag_id').annotate(n=Count('id')).values_list('tag_id', 'n')
+    )
+
+    tags = list(Tag.objects.all())
+    for tag in tags:
+        tag.event_count = counts.get(tag.pk, 0)
+    Tag.objects.bulk_update(tags, ['event_count'], batch_size=1000)
+    return len(tags)
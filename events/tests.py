@@ -1,3 +1,1430 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from config import metrics, mongo
+from users import async_views as user_async_views, views as user_views
+
+from . import async_views, benchmarks, calendar, embeds, presence, repository, search, views
+from .cards import render_cards
+from .models import LISTING_FIELDS, CategoryEventStats, CreatorEventStats, Event, EventSearchToken, Tag, tag_slug
+from .pagination import ORDER_BY_CREATED
+from .scheduler import LIVE_TO_FINISHED, SCHEDULED_TO_LIVE, StatusScheduler, apply_transition
+from .signals import event_status_changed
+from .stats import get_stats
+from .streams import StreamRouter, broker, stream_chunks, topics_for
+from .tags import EventTag
+
+User = get_user_model()
+
+
+class EventQueryCountTests(TestCase):
+    """
+    Els llistats han de fer sempre el mateix nombre de consultes,
+    independentment de quants esdeveniments (i creadors) hi hagi a la pàgina.
+    """
+
+    def setUp(self):
+        # Les targetes en memòria cau amagarien les consultes del creador
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'password123')
+
+    def create_events(self, count, category='music', tags='python, web'):
+        now = timezone.now()
+        for i in range(count):
+            # Un creador diferent per esdeveniment per detectar N+1
+            n = Event.objects.count()
+            creator = User.objects.create(username=f'creator{n}', email=f'creator{n}@example.com')
+            Event.objects.create(
+                title=f'Esdeveniment {i}',
+                description='Descripció llarga ' * 50,
+                creator=creator,
+                category=category,
+                scheduled_date=now + timedelta(days=1, minutes=i),
+                is_featured=i % 2 == 0,
+                tags=tags,
+            )
+
+    def assertConstantQueries(self, url, expected):
+        self.create_events(2)
+        cache.clear()
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.create_events(10)
+        cache.clear()
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_event_list_query_count(self):
+        # destacats + pàgina
+        self.assertConstantQueries(reverse('events:event_list'), 2)
+
+    def test_event_list_filtered_query_count(self):
+        # Amb filtres no hi ha destacats: només la pàgina
+        self.assertConstantQueries(reverse('events:event_list') + '?category=music', 1)
+
+    def test_event_search_query_count(self):
+        # rànquing a l'índex + càrrega dels esdeveniments
+        self.assertConstantQueries(reverse('events:event_list') + '?search=python', 2)
+
+    def test_events_by_category_query_count(self):
+        # recompte + pàgina
+        self.assertConstantQueries(reverse('events:events_by_category', args=['music']), 2)
+
+    def test_events_by_tag_query_count(self):
+        # etiqueta + pàgina
+        self.assertConstantQueries(reverse('events:events_by_tag', args=['python']), 2)
+
+    def test_my_events_query_count(self):
+        def create_own_events(count):
+            now = timezone.now()
+            for i in range(count):
+                Event.objects.create(
+                    title=f'Meu {Event.objects.count()}',
+                    description='Descripció',
+                    creator=self.owner,
+                    scheduled_date=now + timedelta(days=1),
+                )
+
+        self.client.force_login(self.owner)
+        create_own_events(2)
+        # sessió + usuari + comptadors + pàgina
+        with self.assertNumQueries(4):
+            self.client.get(reverse('events:my_events'))
+        create_own_events(25)
+        with self.assertNumQueries(4):
+            self.client.get(reverse('events:my_events'))
+
+    def test_event_detail_query_count(self):
+        self.create_events(1)
+        event = Event.objects.get()
+        # esdeveniment amb creador + recompte d'esdeveniments del creador
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('events:event_detail', args=[event.pk]))
+        self.assertContains(response, event.creator.username)
+
+    def test_listing_does_not_load_description(self):
+        self.create_events(1)
+        event = Event.objects.for_listing().get()
+        self.assertIn('description', event.get_deferred_fields())
+        with self.assertNumQueries(0):
+            self.assertTrue(event.creator.username)
+
+
+class EventTagTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('tagger', 'tagger@example.com', 'password123')
+
+    def test_tag_counts_follow_saves_and_deletes(self):
+        now = timezone.now()
+        first = Event.objects.create(
+            title='A', description='d', creator=self.user, scheduled_date=now, tags='Python, web, python'
+        )
+        second = Event.objects.create(
+            title='B', description='d', creator=self.user, scheduled_date=now, tags='python'
+        )
+        # El camp 'tags' es desa tal com s'ha escrit; la llista ja no té duplicats
+        self.assertEqual(first.tags, 'Python, web, python')
+        self.assertEqual(first.get_tags_list(), ['Python', 'web'])
+        self.assertEqual(Tag.objects.get(slug='python').event_count, 2)
+
+        first.tags = 'web'
+        first.save()
+        self.assertEqual(Tag.objects.get(slug='python').event_count, 1)
+
+        second.delete()
+        self.assertEqual(Tag.objects.get(slug='python').event_count, 0)
+        self.assertEqual(Tag.objects.get(slug='web').event_count, 1)
+
+
+    def test_unicode_and_symbol_tags_get_distinct_slugs(self):
+        event = Event.objects.create(
+            title='A', description='d', creator=self.user, scheduled_date=timezone.now(),
+            tags='C++, C#, c++, Музика, 音楽, 🎮, Web dev, web-dev'
+        )
+        self.assertEqual(event.get_tags_list(), ['C++', 'C#', 'Музика', '音楽', '🎮', 'Web dev'])
+        slugs = [slug for _, slug in event.get_tag_links()]
+        self.assertEqual(len(set(slugs)), 6)
+        self.assertIn('музика', slugs)
+        self.assertIn('音楽', slugs)
+        self.assertEqual(tag_slug('Web dev'), 'web-dev')
+        self.assertEqual(tag_slug('c++'), tag_slug('C++'))
+        self.assertTrue(tag_slug('🎮').startswith('tag-'))
+        self.assertEqual(set(event.tag_items.values_list('slug', flat=True)), set(slugs))
+
+        for slug in slugs:
+            response = self.client.get(reverse('events:events_by_tag', args=[slug]))
+            self.assertContains(response, 'A')
+
+    def test_backfill_command(self):
+        now = timezone.now()
+        events = [
+            Event.objects.create(title=f'E{i}', description='d', creator=self.user, scheduled_date=now, tags=tags)
+            for i, tags in enumerate(['python, C++', 'Музика, python', 'C#', ''])
+        ]
+        # Com abans de la sincronització: sense relacions ni recomptes
+        EventTag.objects.all().delete()
+        Tag.objects.all().delete()
+
+        out = StringIO()
+        call_command('backfill_tags', chunk_size=2, stdout=out)
+        self.assertIn('3 esdeveniments, 5 relacions', out.getvalue())
+        self.assertEqual(Tag.objects.get(slug='python').event_count, 2)
+        self.assertEqual(Tag.objects.get(slug=tag_slug('C++')).event_count, 1)
+        self.assertEqual(Tag.objects.get(slug=tag_slug('C#')).event_count, 1)
+        self.assertEqual(Tag.objects.get(slug='музика').event_count, 1)
+
+        # Sense --rebuild, els que ja tenen relacions no es tornen a processar
+        call_command('backfill_tags', stdout=StringIO())
+        self.assertEqual(EventTag.objects.count(), 5)
+
+        # --rebuild refà les relacions de slugs antics (p. ex. 'c' per a C++ i C#)
+        stale = Tag.objects.create(name='c', slug='c')
+        EventTag.objects.filter(event_id=events[2].pk).update(tag=stale)
+        call_command('backfill_tags', rebuild=True, chunk_size=2, stdout=StringIO())
+        self.assertEqual(Tag.objects.get(slug='c').event_count, 0)
+        self.assertEqual(Tag.objects.get(slug=tag_slug('C#')).event_count, 1)
+        self.assertEqual(EventTag.objects.count(), 5)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='cercador', email='cercador@example.com')
+        self.now = timezone.now()
+
+    def create(self, title, description='d', tags='', days=1, **kwargs):
+        return Event.objects.create(
+            title=title, description=description, tags=tags, creator=self.user,
+            scheduled_date=self.now + timedelta(days=days), **kwargs
+        )
+
+    def search(self, query, **filters):
+        return [event.title for event in search.search_events(query, **filters)[0]]
+
+    def test_ranking_weights_title_over_tags_over_description(self):
+        self.create('Concert', description='Un vespre de jazz')
+        self.create('Jazz al parc')
+        self.create('Sessió', tags='jazz, directe')
+        # Mateixa puntuació: primer el més llunyà (data més gran)
+        self.create('Jazz nocturn', days=5)
+        self.assertEqual(self.search('JAZZ'), ['Jazz nocturn', 'Jazz al parc', 'Sessió', 'Concert'])
+
+    def test_all_terms_are_required(self):
+        self.create('Python per a principiants')
+        self.create('Python avançat', description='Rendiment i perfils')
+        self.create('Rendiment web')
+        self.assertEqual(self.search('python rendiment'), ['Python avançat'])
+        # Accents i paraules buides no compten
+        self.assertEqual(self.search('el AVANCAT de python'), ['Python avançat'])
+        self.assertEqual(self.search('python inexistent'), [])
+        self.assertEqual(self.search('de la'), [])
+
+    def test_search_combines_with_filters(self):
+        self.create('Xerrada Django', category='talk', days=1)
+        self.create('Taller Django', category='education', days=1)
+        self.create('Django en directe', category='talk', status='live', days=3)
+        self.create('Django ajornat', category='talk', status='cancelled', days=10)
+
+        self.assertEqual(
+            self.search('django', category='talk'),
+            ['Django ajornat', 'Django en directe', 'Xerrada Django'],
+        )
+        self.assertEqual(self.search('django', category='talk', status='live'), ['Django en directe'])
+        day = timezone.localdate(self.now + timedelta(days=1))
+        self.assertEqual(
+            self.search('django', date_from=day, date_to=day),
+            ['Xerrada Django', 'Taller Django'],
+        )
+        self.assertEqual(self.search('django', category='talk', date_from=day + timedelta(days=1)), ['Django ajornat', 'Django en directe'])
+
+    def test_index_follows_edits_and_deletes(self):
+        event = self.create('Festival de primavera')
+        event.title = 'Festival de tardor'
+        event.save()
+        self.assertEqual(self.search('primavera'), [])
+        self.assertEqual(self.search('tardor'), ['Festival de tardor'])
+        event.delete()
+        self.assertFalse(EventSearchToken.objects.exists())
+
+    def test_rebuild_replaces_the_index_chunk_by_chunk(self):
+        events = [self.create(f'Esdeveniment {i}', tags='streaming') for i in range(5)]
+        # Entrades desfasades (p. ex. d'un canvi de tokenització) i un esdeveniment sense indexar
+        EventSearchToken.objects.filter(event=events[0], term='streaming').update(term='antic')
+        EventSearchToken.objects.filter(event=events[1]).delete()
+        before = {event.pk: sorted(search.build_terms(event).items()) for event in events}
+
+        indexed = []
+        original = search.index_events
+
+        def index_events(chunk, **kwargs):
+            # Durant la reconstrucció la resta de l'índex continua disponible
+            indexed.append(len(self.search('streaming')))
+            return original(chunk, **kwargs)
+
+        with mock.patch('events.management.commands.rebuild_search_index.index_events', index_events):
+            call_command('rebuild_search_index', chunk_size=2, stdout=StringIO())
+
+        self.assertEqual(indexed, [3, 5, 5])
+        self.assertEqual(len(self.search('streaming')), 5)
+        self.assertFalse(EventSearchToken.objects.filter(term='antic').exists())
+        for event in events:
+            terms = sorted(EventSearchToken.objects.filter(event=event).values_list('term', 'weight'))
+            self.assertEqual(terms, before[event.pk])
+
+
+class CreatorEventStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('stats', 'stats@example.com', 'password123')
+        self.other = User.objects.create_user('other', 'other@example.com', 'password123')
+
+    def create_event(self, **kwargs):
+        defaults = {
+            'title': 'Esdeveniment',
+            'description': 'd',
+            'creator': self.user,
+            'scheduled_date': timezone.now() + timedelta(days=1),
+        }
+        defaults.update(kwargs)
+        return Event.objects.create(**defaults)
+
+    def assertStats(self, user, **expected):
+        stats = get_stats(user)
+        for field, value in expected.items():
+            self.assertEqual(getattr(stats, field), value, field)
+
+    def test_counters_follow_creates_edits_and_deletes(self):
+        first = self.create_event()
+        self.create_event(status='live')
+        self.assertStats(self.user, total=2, scheduled=1, live=1)
+
+        first = Event.objects.get(pk=first.pk)
+        first.status = 'cancelled'
+        first.save()
+        self.assertStats(self.user, total=2, scheduled=0, live=1, cancelled=1)
+
+        first.creator = self.other
+        first.save()
+        self.assertStats(self.user, total=1, cancelled=0)
+        self.assertStats(self.other, total=1, cancelled=1)
+
+        first.delete()
+        self.assertStats(self.other, total=0, cancelled=0)
+
+    def test_counters_follow_scheduler_transitions(self):
+        event = self.create_event(scheduled_date=timezone.now() - timedelta(minutes=1))
+        apply_transition([event.pk], SCHEDULED_TO_LIVE)
+        self.assertStats(self.user, total=1, scheduled=0, live=1)
+
+    def test_reconcile_rebuilds_from_events(self):
+        self.create_event()
+        self.create_event(status='finished')
+        CreatorEventStats.objects.update(total=99, scheduled=99)
+
+        call_command('reconcile_event_stats', stdout=StringIO())
+        self.assertStats(self.user, total=2, scheduled=1, finished=1)
+
+    def test_category_counters_and_state(self):
+        def totals():
+            return dict(CategoryEventStats.objects.filter(total__gt=0).values_list('category', 'total'))
+
+        first = self.create_event(category='music')
+        self.create_event(category='music')
+        self.assertEqual(totals(), {'music': 2})
+
+        first = Event.objects.get(pk=first.pk)
+        first.category = 'talk'
+        first.save()
+        self.assertEqual(totals(), {'music': 1, 'talk': 1})
+        # Un desat amb camps diferits no toca els comptadors
+        Event.objects.only('pk', 'title').get(pk=first.pk).save()
+        self.assertEqual(totals(), {'music': 1, 'talk': 1})
+
+        with self.assertNumQueries(1):
+            state = views.category_state('talk')
+        self.assertEqual(state, {'latest': Event.objects.get(pk=first.pk).updated_at, 'total': 1})
+        self.assertEqual(views.category_state('art'), {'latest': None, 'total': 0})
+
+        first.delete()
+        self.assertEqual(totals(), {'music': 1})
+        CategoryEventStats.objects.update(total=99)
+        call_command('reconcile_event_stats', stdout=StringIO())
+        self.assertEqual(totals(), {'music': 1})
+
+    def test_deleting_a_creator_with_events(self):
+        self.create_event()
+        self.create_event(status='live')
+        self.create_event(creator=self.other)
+        self.user.delete()
+        self.assertFalse(Event.objects.filter(creator_id=self.user.pk).exists())
+        self.assertFalse(CreatorEventStats.objects.filter(creator_id=self.user.pk).exists())
+        self.assertStats(self.other, total=1, scheduled=1)
+
+
+class StatusSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='planificador', email='planificador@example.com')
+        self.clock = FakeClock(timezone.now().replace(microsecond=0))
+        self.scheduler = StatusScheduler(horizon=timedelta(hours=4), clock=self.clock)
+        self.sent = []
+        event_status_changed.connect(self.record, sender=Event)
+        self.addCleanup(event_status_changed.disconnect, self.record, sender=Event)
+
+    def record(self, sender, pks, from_status, to_status, **kwargs):
+        self.sent.append((sorted(pks), from_status, to_status))
+
+    def create(self, minutes, category='talk', **kwargs):
+        return Event.objects.create(
+            title='Planificat', description='d', creator=self.user, category=category,
+            scheduled_date=self.clock.now + timedelta(minutes=minutes), **kwargs
+        )
+
+    def advance(self, minutes):
+        self.clock.now += timedelta(minutes=minutes)
+
+    def status(self, event):
+        return Event.objects.values_list('status', flat=True).get(pk=event.pk)
+
+    def test_heap_pops_deadlines_in_order(self):
+        third = self.create(30)
+        first = self.create(10)
+        second = self.create(20)
+        # En directe fa 50 minuts (xerrada d'1 hora): acaba d'aquí a 10
+        live = self.create(-50, status='live')
+        self.create(60 * 5)  # Fora de l'horitzó
+
+        self.assertEqual(self.scheduler.refresh(), 4)
+        self.assertEqual(self.scheduler.next_deadline(), self.clock.now + timedelta(minutes=10))
+
+        self.advance(20)
+        due = self.scheduler.pop_due()
+        self.assertEqual(due, {SCHEDULED_TO_LIVE: [first.pk, second.pk], LIVE_TO_FINISHED: [live.pk]})
+        self.assertEqual(len(self.scheduler), 1)
+        self.assertEqual(self.scheduler.next_deadline(), third.scheduled_date)
+
+    def test_run_due_applies_transitions_and_queues_the_finish(self):
+        event = self.create(5)
+        self.scheduler.refresh()
+        self.assertEqual(self.scheduler.run_due(), {})
+
+        self.advance(5)
+        self.assertEqual(self.scheduler.run_due(), {SCHEDULED_TO_LIVE: 1})
+        self.assertEqual(self.status(event), 'live')
+        # El final (1 hora) ja és a la cua sense recarregar-la
+        self.assertEqual(self.scheduler.next_deadline(), event.scheduled_date + timedelta(minutes=60))
+
+        self.advance(60)
+        self.assertEqual(self.scheduler.run_due(), {LIVE_TO_FINISHED: 1})
+        self.assertEqual(self.status(event), 'finished')
+        self.assertEqual(self.sent, [
+            ([event.pk], 'scheduled', 'live'),
+            ([event.pk], 'live', 'finished'),
+        ])
+
+    def test_refresh_picks_up_new_and_edited_events(self):
+        postponed = self.create(5)
+        self.scheduler.refresh()
+        new = self.create(5)
+        postponed.scheduled_date += timedelta(hours=1)
+        postponed.save()
+
+        self.advance(5)
+        # L'entrada desfasada no l'avança; el nou encara no és a la cua
+        self.assertEqual(self.scheduler.run_due(), {SCHEDULED_TO_LIVE: 0})
+        self.assertEqual((self.status(postponed), self.status(new)), ('scheduled', 'scheduled'))
+        self.assertEqual(self.sent, [])
+
+        self.assertEqual(self.scheduler.refresh(), 2)
+        self.assertEqual(self.scheduler.run_due(), {SCHEDULED_TO_LIVE: 1})
+        self.assertEqual(self.status(new), 'live')
+
+        self.advance(60)
+        self.assertEqual(self.scheduler.run_due(), {SCHEDULED_TO_LIVE: 1, LIVE_TO_FINISHED: 1})
+        self.assertEqual(self.status(postponed), 'live')
+
+    def test_conditional_update_does_not_fire_twice(self):
+        event = self.create(5)
+        cancelled = self.create(5)
+        # Dos processos amb la mateixa cua
+        other = StatusScheduler(horizon=timedelta(hours=4), clock=self.clock)
+        self.scheduler.refresh()
+        other.refresh()
+        cancelled.status = 'cancelled'
+        cancelled.save()
+
+        self.advance(5)
+        self.assertEqual(self.scheduler.run_due(), {SCHEDULED_TO_LIVE: 1})
+        self.assertEqual(other.run_due(), {SCHEDULED_TO_LIVE: 0})
+        self.assertEqual(self.sent, [([event.pk], 'scheduled', 'live')])
+        self.assertEqual(self.status(cancelled), 'cancelled')
+        self.assertEqual(apply_transition([event.pk], SCHEDULED_TO_LIVE), [])
+        self.assertEqual(len(self.sent), 1)
+
+
+class SeedEventsBulkTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create(username=f'seed{i}', email=f'seed{i}@example.com') for i in range(3)
+        ]
+
+    def seed(self, **options):
+        out = StringIO()
+        call_command('seed_events', bulk=True, workers=1, seed=7, stdout=out, **options)
+        return out.getvalue()
+
+    def derived(self):
+        """Etiquetes, comptadors i índex de cerca, independents dels ids de Tag"""
+        return {
+            'links': set(EventTag.objects.values_list('event_id', 'tag__slug')),
+            'tags': {slug: n for slug, n in Tag.objects.values_list('slug', 'event_count') if n},
+            'stats': {
+                row['creator_id']: row for row in
+                CreatorEventStats.objects.values('creator_id', 'total', 'scheduled', 'live', 'finished', 'cancelled')
+            },
+            'tokens': set(EventSearchToken.objects.values_list(
+                'event_id', 'term', 'weight', 'category', 'status', 'scheduled_date'
+            )),
+        }
+
+    def test_bulk_seed_inserts_rows_and_derived_data(self):
+        out = self.seed(events=25, chunk_size=10, batch_size=7)
+        self.assertIn('25 esdeveniments creats', out)
+        self.assertEqual(Event.objects.count(), 25)
+        self.assertEqual(set(Event.objects.values_list('creator_id', flat=True)) - {u.pk for u in self.users}, set())
+        for stream_url, embed_url in Event.objects.values_list('stream_url', 'stream_embed_url'):
+            self.assertEqual(embed_url, embeds.resolve_embed_url(stream_url))
+
+        stats = sum(CreatorEventStats.objects.values_list('total', flat=True))
+        self.assertEqual(stats, 25)
+        self.assertEqual(EventSearchToken.objects.values('event_id').distinct().count(), 25)
+        self.assertEqual(
+            EventTag.objects.values('event_id').distinct().count(), Event.objects.exclude(tags='').count()
+        )
+
+    def test_same_seed_generates_the_same_events(self):
+        fields = ('title', 'category', 'status', 'tags', 'stream_url', 'creator_id', 'max_viewers', 'is_featured')
+        self.seed(events=12, chunk_size=5)
+        first = list(Event.objects.order_by('pk').values_list(*fields))
+        self.seed(events=12, chunk_size=5, clear=True)
+        self.assertEqual(list(Event.objects.order_by('pk').values_list(*fields)), first)
+
+    def test_derived_data_matches_the_orm_path(self):
+        self.seed(events=20, chunk_size=8)
+        bulk = self.derived()
+        rows = list(Event.objects.order_by('pk').values(
+            'pk', 'title', 'description', 'creator_id', 'category', 'scheduled_date', 'status',
+            'max_viewers', 'is_featured', 'tags', 'stream_url',
+        ))
+
+        # Les mateixes files creades una per una (save() i senyals)
+        Event.objects.all().delete()
+        Tag.objects.all().delete()
+        CreatorEventStats.objects.all().delete()
+        for row in rows:
+            Event.objects.create(**row)
+        self.assertEqual(self.derived(), bulk)
+
+
+class BenchmarkTests(TestCase):
+    def test_run_views_reports_every_view(self):
+        user = User.objects.create_user('bench', 'bench@example.com', benchmarks.BENCHMARK_PASSWORD)
+        Event.objects.create(
+            title='Bench', description='d', creator=user, scheduled_date=timezone.now() + timedelta(days=1)
+        )
+        results = benchmarks.run_views(iterations=2, warmup=0)
+
+        self.assertEqual(
+            set(results),
+            {'event_list', 'event_detail', 'events_by_category', 'my_events', 'login', 'login_submit', 'public_profile'},
+        )
+        self.assertEqual(results['login_submit']['status_code'], 302)
+        self.assertEqual(results['event_list']['queries'], 2)
+        self.assertLessEqual(results['event_list']['p50_ms'], results['event_list']['p99_ms'])
+
+    def test_compare_flags_regressions(self):
+        before = {'datasets': {'1k': {'views': {'event_list': {'p50_ms': 10.0, 'queries': 2}}}}}
+        after = {'datasets': {'1k': {'views': {'event_list': {'p50_ms': 10.5, 'queries': 3}}}}}
+        regressions = {row[2] for row in benchmarks.compare(before, after, threshold=10) if row[-1]}
+        self.assertEqual(regressions, {'queries'})
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+
+    def test_server_timing_header_counts_queries(self):
+        response = self.client.get(reverse('events:event_list'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+    def test_metrics_endpoint_is_restricted(self):
+        self.client.get(reverse('events:event_list'))
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.1').status_code, 404)
+        # Darrere d'un proxy local totes les peticions venen de 127.0.0.1
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='127.0.0.1').status_code, 404)
+
+        with override_settings(METRICS_ALLOWED_IPS=['10.0.0.9'], METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.9').status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer altre').status_code, 404)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Basic s3cret').status_code, 404)
+
+        staff = User.objects.create(username='staff', email='staff@example.com', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'streamevents_request_duration_seconds_count{view="events:event_list"} 1')
+        self.assertContains(response, 'streamevents_db_queries_total{view="events:event_list"} 2')
+
+    def test_mongo_pool_metrics(self):
+        clock = FakeClock()
+        stats = mongo.PoolStats(clock=clock)
+        address = ('db', 27017)
+        stats.pool_created(SimpleNamespace(address=address, options={'maxPoolSize': 4}))
+        stats.connection_check_out_started(SimpleNamespace(address=address))
+        stats.connection_created(SimpleNamespace(address=address))
+        clock.now += 0.02
+        stats.connection_checked_out(SimpleNamespace(address=address))
+        stats.connection_check_out_started(SimpleNamespace(address=address))
+        stats.connection_check_out_failed(SimpleNamespace(address=address, reason='timeout'))
+
+        text = metrics.registry.render()
+        self.assertIn('# TYPE streamevents_mongo_pool_saturation gauge', text)
+        self.assertIn('streamevents_mongo_pool_saturation{address="db:27017"} 0.25', text)
+        self.assertIn('streamevents_mongo_pool_open{address="db:27017"} 1', text)
+        self.assertIn('streamevents_mongo_pool_waiting{address="db:27017"} 0', text)
+        self.assertIn('streamevents_mongo_checkout_seconds_bucket{address="db:27017",le="0.025"} 1', text)
+        self.assertIn('streamevents_mongo_checkout_failed_total{address="db:27017",reason="timeout"} 1', text)
+
+        stats.connection_checked_in(SimpleNamespace(address=address))
+        self.assertIn('streamevents_mongo_pool_in_use{address="db:27017"} 0', metrics.registry.render())
+
+
+class AsyncViewTests(TransactionTestCase):
+    """Les vistes asíncrones han de donar exactament la mateixa pàgina"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='async', email='async@example.com')
+        now = timezone.now()
+        self.events = [
+            Event.objects.create(
+                title=f'Async {i}', description='d', creator=self.user, category='music',
+                scheduled_date=now + timedelta(days=1, minutes=i), is_featured=i % 2 == 0,
+            )
+            for i in range(3)
+        ]
+
+    def assertSameResponse(self, path, sync_view, async_view, *args):
+        sync_request = RequestFactory().get(path)
+        async_request = AsyncRequestFactory().get(path)
+        sync_request.user = async_request.user = AnonymousUser()
+
+        expected = sync_view(sync_request, *args)
+        response = async_to_sync(async_view)(async_request, *args)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+
+    def test_async_views_match_sync_views(self):
+        pk = self.events[0].pk
+        self.assertSameResponse('/events/', views.event_list_view, async_views.event_list_view)
+        self.assertSameResponse('/events/?category=music', views.event_list_view, async_views.event_list_view)
+        self.assertSameResponse(f'/events/{pk}/', views.event_detail_view, async_views.event_detail_view, pk)
+        self.assertSameResponse(
+            '/events/category/music/', views.events_by_category_view, async_views.events_by_category_view, 'music'
+        )
+        self.assertSameResponse(
+            '/users/async/', user_views.public_profile_view, user_async_views.public_profile_view, 'async'
+        )
+
+
+class StatusStreamTests(TestCase):
+    def setUp(self):
+        # Sense vigilant: a les proves tots els canvis es fan en aquest procés
+        self.poll_interval, broker.poll_interval = broker.poll_interval, 0
+        broker._last_status.clear()
+        self.user = User.objects.create(username='stream', email='stream@example.com')
+        self.event = Event.objects.create(
+            title='Directe', description='d', creator=self.user, scheduled_date=timezone.now() - timedelta(minutes=1)
+        )
+
+    def tearDown(self):
+        broker.poll_interval = self.poll_interval
+
+    def receive(self, subscription):
+        chunk = subscription.get(timeout=0)
+        self.assertIsNotNone(chunk)
+        return json.loads(chunk.decode().split('data: ', 1)[1])
+
+    def test_status_changes_are_published_after_commit(self):
+        subscription = broker.subscribe_sync(topics_for(self.event.pk))
+        self.addCleanup(subscription.close)
+
+        event = Event.objects.get(pk=self.event.pk)
+        event.status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        message = self.receive(subscription)
+        self.assertEqual((message['status'], message['previous']), ('cancelled', 'scheduled'))
+
+        # Un desat sense canvi d'estat no publica res
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        self.assertIsNone(subscription.get(timeout=0))
+
+    def test_scheduler_transitions_are_published(self):
+        subscription = broker.subscribe_sync(topics_for())
+        self.addCleanup(subscription.close)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_transition([self.event.pk], SCHEDULED_TO_LIVE)
+        message = self.receive(subscription)
+        self.assertEqual((message['pk'], message['status']), (self.event.pk, 'live'))
+        self.assertEqual(message['badge_class'], 'bg-danger')
+
+    def test_poll_advances_past_a_page_sharing_one_timestamp(self):
+        subscription = broker.subscribe_sync(topics_for())
+        self.addCleanup(subscription.close)
+        now = timezone.now()
+        past = now - timedelta(minutes=1)
+        Event.objects.bulk_create([
+            Event(title=f'Bloc {i}', description='d', creator=self.user, scheduled_date=past) for i in range(7)
+        ])
+        cursor = (now - timedelta(seconds=1), 0)
+        # Com un altre procés: el planificador canvia tot el bloc al mateix instant
+        pks = list(Event.objects.values_list('pk', flat=True))
+        Event.objects.filter(pk__in=pks).update(status='live', updated_at=now)
+
+        with mock.patch('events.streams.POLL_PAGE_SIZE', 3):
+            cursor = broker.poll(cursor)
+            self.assertEqual(cursor, (now, max(pks)))
+            published = []
+            while (chunk := subscription.get(timeout=0)) is not None:
+                published.append(json.loads(chunk.decode().split('data: ', 1)[1])['pk'])
+            self.assertEqual(sorted(published), sorted(pks))
+
+            # Un canvi posterior d'un altre procés també es publica
+            later = now + timedelta(seconds=1)
+            Event.objects.filter(pk=self.event.pk).update(status='cancelled', updated_at=later)
+            self.assertEqual(broker.poll(cursor), (later, self.event.pk))
+            message = self.receive(subscription)
+            self.assertEqual((message['pk'], message['status']), (self.event.pk, 'cancelled'))
+            self.assertEqual(broker.poll((later, self.event.pk)), (later, self.event.pk))
+
+    def test_stream_view_sends_retry_and_heartbeat(self):
+        response = self.client.get(reverse('events:event_detail_stream', args=[self.event.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = stream_chunks(topics_for(self.event.pk), heartbeat=0)
+        self.assertTrue(next(chunks).startswith(b'retry:'))
+        self.assertEqual(next(chunks), b': heartbeat\n\n')
+        chunks.close()
+        response.close()
+        self.assertEqual(broker.subscriber_count, 0)
+
+    def test_asgi_router_streams_until_disconnect(self):
+        sent = []
+
+        async def run():
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if message.get('body', b'').startswith(b'retry:'):
+                    broker.publish(self.event.pk, 'live', 'scheduled')
+                elif b'event: status' in message.get('body', b''):
+                    disconnect.set()
+
+            router = StreamRouter(application=None, heartbeat=5)
+            scope = {'type': 'http', 'method': 'GET', 'path': reverse('events:event_stream')}
+            await asyncio.wait_for(router(scope, receive, send), timeout=5)
+
+        async_to_sync(run)()
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(b'"status":"live"', sent[2]['body'])
+        self.assertEqual(broker.subscriber_count, 0)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class PresenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        self.previous_store = presence.set_store(presence.MemoryPresenceStore(ttl=30, clock=self.clock))
+        self.user = User.objects.create(username='presence', email='presence@example.com')
+        self.event = Event.objects.create(
+            title='Aforament', description='d', creator=self.user,
+            scheduled_date=timezone.now(), max_viewers=2, stream_url='https://www.youtube.com/watch?v=abc123'
+        )
+
+    def tearDown(self):
+        presence.set_store(self.previous_store)
+
+    def join(self, viewer):
+        url = reverse('events:presence_join', args=[self.event.pk])
+        return self.client.post(url, {'viewer': viewer}).json()
+
+    def test_memory_store_enforces_capacity_and_expires(self):
+        store = presence.MemoryPresenceStore(ttl=30, clock=self.clock)
+        self.assertTrue(store.join(1, 'a', 2).admitted)
+        self.assertTrue(store.join(1, 'b', 2).admitted)
+        self.assertFalse(store.join(1, 'c', 2).admitted)
+        # Qui ja hi és pot tornar a entrar sense ocupar una altra plaça
+        self.assertTrue(store.join(1, 'a', 2).admitted)
+
+        self.clock.now += 20
+        self.assertTrue(store.heartbeat(1, 'a'))
+        self.clock.now += 20
+        # 'b' no ha enviat heartbeat: ha caducat i allibera la plaça
+        self.assertEqual(store.count(1), 1)
+        self.assertFalse(store.heartbeat(1, 'b'))
+        self.assertTrue(store.join(1, 'c', 2).admitted)
+
+        store.leave(1, 'a')
+        self.assertEqual(store.count(1), 1)
+
+    def test_cache_store_enforces_capacity_across_windows(self):
+        store = presence.CachePresenceStore(clock=self.clock)
+        self.assertEqual(store.window, presence.HEARTBEAT * 2)
+        self.assertTrue(store.join(1, 'a', 2).admitted)
+        self.assertTrue(store.join(1, 'b', 2).admitted)
+        self.assertFalse(store.join(1, 'c', 2).admitted)
+
+        # Finestra següent: els actius encara compten encara que no hagin enviat heartbeat
+        self.clock.now += store.window
+        self.assertFalse(store.join(1, 'c', 2).admitted)
+        self.assertTrue(store.heartbeat(1, 'a'))
+        store.leave(1, 'b')
+        # La sortida allibera la plaça a l'acte
+        self.assertEqual(store.count(1), 1)
+        self.assertTrue(store.join(1, 'c', 2).admitted)
+        self.assertFalse(store.join(1, 'd', 2).admitted)
+
+        # Una finestra després 'b' ja no hi és
+        self.clock.now += store.window
+        self.assertTrue(store.heartbeat(1, 'a'))
+        self.assertFalse(store.heartbeat(1, 'b'))
+        self.assertTrue(store.heartbeat(1, 'c'))
+        self.assertEqual(store.count(1), 2)
+
+    def test_cache_store_leave_in_the_joining_window_frees_the_seat(self):
+        store = presence.CachePresenceStore(clock=self.clock)
+        self.assertTrue(store.join(1, 'a', 1).admitted)
+        store.leave(1, 'a')
+        store.leave(1, 'a')
+        self.assertEqual(store.count(1), 0)
+        self.assertTrue(store.join(1, 'b', 1).admitted)
+        self.assertFalse(store.join(1, 'c', 1).admitted)
+
+    def test_cache_store_keeps_viewers_with_jittered_heartbeats(self):
+        store = presence.CachePresenceStore(window=presence.HEARTBEAT, clock=self.clock)
+        # Una finestra més curta que 2 * HEARTBEAT no es fa servir
+        self.assertEqual(store.window, presence.HEARTBEAT * 2)
+        self.clock.now = store.window * 100 - 0.1
+        self.assertTrue(store.join(1, 'a', 1).admitted)
+        # Heartbeats amb retard a cavall de les finestres: 'a' no caduca
+        for delay in (presence.HEARTBEAT + 0.2, presence.HEARTBEAT - 3, presence.HEARTBEAT + 4, presence.HEARTBEAT + 4):
+            self.clock.now += delay
+            self.assertTrue(store.heartbeat(1, 'a'))
+            self.assertFalse(store.join(1, 'b', 1).admitted)
+            self.assertEqual(store.count(1), 1)
+
+        # Sense heartbeats durant dues finestres, caduca
+        self.clock.now += store.window * 2
+        self.assertFalse(store.heartbeat(1, 'a'))
+        self.assertTrue(store.join(1, 'b', 1).admitted)
+
+    def test_join_endpoint_admits_up_to_max_viewers(self):
+        self.assertEqual(self.join('a'), {'admitted': True, 'watching': 1, 'max_viewers': 2, 'heartbeat': presence.HEARTBEAT})
+        self.assertTrue(self.join('b')['admitted'])
+        self.assertEqual(self.join('c')['admitted'], False)
+
+        self.client.post(reverse('events:presence_leave', args=[self.event.pk]), {'viewer': 'a'})
+        self.assertTrue(self.join('c')['admitted'])
+
+    def test_heartbeat_does_not_touch_the_database(self):
+        self.join('a')
+        url = reverse('events:presence_heartbeat', args=[self.event.pk])
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {'viewer': 'a'})
+        self.assertEqual(response.json(), {'active': True, 'watching': 1})
+
+    def test_capacity_follows_max_viewers_changes(self):
+        self.join('a')
+        self.join('b')
+        self.event.max_viewers = 3
+        self.event.save()
+        self.assertTrue(self.join('c')['admitted'])
+
+    def test_invalid_viewer_and_unknown_event(self):
+        url = reverse('events:presence_join', args=[self.event.pk])
+        self.assertEqual(self.client.post(url, {'viewer': '<script>'}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        missing = reverse('events:presence_join', args=[self.event.pk + 1000])
+        self.assertEqual(self.client.post(missing, {'viewer': 'a'}).status_code, 404)
+
+    def test_detail_page_loads_player_after_admission(self):
+        self.join('a')
+        response = self.client.get(reverse('events:event_detail', args=[self.event.pk]))
+        self.assertContains(response, 'data-presence-src="https://www.youtube.com/embed/abc123')
+        self.assertContains(response, '<span data-presence-count>1</span>', html=False)
+        self.assertContains(response, 'presence/')
+
+
+def make_image(width, height, name='portada.jpg'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 40, 40)).save(buffer, 'JPEG', quality=95)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class EmbedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='embeds', email='embeds@example.com')
+
+    def create(self, stream_url):
+        return Event.objects.create(
+            title='Directe', description='d', creator=self.user, scheduled_date=timezone.now(), stream_url=stream_url
+        )
+
+    def providers(self):
+        return {provider.name: provider for provider in embeds.get_providers()}
+
+    @override_settings(ALLOWED_HOSTS=['streamevents.example.com'])
+    def test_default_providers(self):
+        youtube = 'https://www.youtube.com/embed/abc_12-3'
+        cases = {
+            'https://www.youtube.com/watch?v=abc_12-3': youtube,
+            'youtube.com/watch?feature=share&v=abc_12-3': youtube,
+            'https://m.youtube.com/live/abc_12-3?si=x': youtube,
+            'https://www.youtube.com/shorts/abc_12-3': youtube,
+            'https://youtu.be/abc_12-3?t=30': youtube,
+            ' https://www.twitch.tv/canal_1 ': 'https://player.twitch.tv/?channel=canal_1&parent=streamevents.example.com',
+        }
+        for url, expected in cases.items():
+            self.assertEqual(embeds.resolve_embed_url(url), expected, url)
+
+    def test_unsupported_hosts_resolve_to_none_in_every_provider(self):
+        urls = [
+            'https://vimeo.com/123456',
+            'https://notyoutube.com/watch?v=abc123',
+            'https://example.com/redirect?u=https://twitch.tv/canal',
+            'https://youtu.be.example.com/abc123',
+        ]
+        for url in urls:
+            self.assertEqual([p.name for p in embeds.get_providers() if p.resolve(url) is not None], [], url)
+            # Plataformes personalitzades: s'incrusta la mateixa URL
+            self.assertEqual(embeds.resolve_embed_url(url), url)
+        self.assertEqual(embeds.resolve_embed_url(''), '')
+        self.assertIsNone(self.providers()['youtube'].resolve('https://www.youtube.com/channel/abc'))
+
+    def test_registered_providers_are_tried_in_order(self):
+        self.addCleanup(embeds.unregister_provider, 'vimeo')
+        embeds.register_provider('vimeo', r'^(?:https?:\/\/)?vimeo\.com\/(\d+)', lambda m: f'https://player.vimeo.com/video/{m.group(1)}')
+        self.assertEqual(list(self.providers())[-1], 'vimeo')
+        self.assertEqual(embeds.resolve_embed_url('https://vimeo.com/42'), 'https://player.vimeo.com/video/42')
+
+        # Tornar-lo a registrar el substitueix
+        embeds.register_provider('vimeo', r'^(?:https?:\/\/)?vimeo\.com\/(\d+)', lambda m: f'https://vimeo.example/{m.group(1)}')
+        self.assertEqual([p.name for p in embeds.get_providers()].count('vimeo'), 1)
+        self.assertEqual(embeds.resolve_embed_url('https://vimeo.com/42'), 'https://vimeo.example/42')
+
+    def test_embed_url_is_resolved_on_save(self):
+        event = self.create('https://youtu.be/abc123')
+        self.assertEqual(event.stream_embed_url, 'https://www.youtube.com/embed/abc123')
+        event.stream_url = 'https://www.twitch.tv/canal'
+        event.save(update_fields=['stream_url'])
+        event.refresh_from_db()
+        self.assertTrue(event.stream_embed_url.startswith('https://player.twitch.tv/?channel=canal'))
+        self.assertIsNone(self.create('').get_stream_embed_url())
+
+    def test_resolve_embed_urls_command(self):
+        youtube = self.create('https://youtu.be/abc123')
+        vimeo = self.create('https://vimeo.com/42')
+        empty = self.create('')
+        # Files desfasades: sense resoldre i resoltes amb un proveïdor que ja no hi és
+        Event.objects.filter(pk=youtube.pk).update(stream_embed_url='')
+        stamps = dict(Event.objects.values_list('pk', 'updated_at'))
+
+        self.addCleanup(embeds.unregister_provider, 'vimeo')
+        embeds.register_provider('vimeo', r'^(?:https?:\/\/)?vimeo\.com\/(\d+)', lambda m: f'https://player.vimeo.com/video/{m.group(1)}')
+        out = StringIO()
+        call_command('resolve_embed_urls', chunk_size=1, stdout=out)
+        self.assertIn('vimeo', out.getvalue())
+        self.assertIn("2 URLs d'embed actualitzades de 2", out.getvalue())
+
+        rows = {pk: (embed, updated_at) for pk, embed, updated_at in Event.objects.values_list('pk', 'stream_embed_url', 'updated_at')}
+        self.assertEqual(rows[youtube.pk][0], 'https://www.youtube.com/embed/abc123')
+        self.assertEqual(rows[vimeo.pk][0], 'https://player.vimeo.com/video/42')
+        self.assertGreater(rows[vimeo.pk][1], stamps[vimeo.pk])
+        self.assertEqual(rows[empty.pk], ('', stamps[empty.pk]))
+
+        # Una segona passada no canvia res
+        out = StringIO()
+        call_command('resolve_embed_urls', stdout=out)
+        self.assertIn("0 URLs d'embed actualitzades de 2", out.getvalue())
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, EVENT_THUMBNAIL_WORKERS=0)
+        self.settings_override.enable()
+        self.user = User.objects.create(username='thumbs', email='thumbs@example.com')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create_event(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            event = Event.objects.create(
+                title='Portada', description='d', creator=self.user, scheduled_date=timezone.now(), thumbnail=image
+            )
+        event.refresh_from_db()
+        return event
+
+    def test_upload_generates_jpeg_and_webp_derivatives(self):
+        event = self.create_event(make_image(2000, 1000))
+        self.assertEqual(event.thumbnail_widths, '320,640,1280')
+
+        derivatives = event.get_thumbnail_derivatives()
+        self.assertEqual([width for width, jpeg, webp in derivatives], [320, 640, 1280])
+        for width, jpeg, webp in derivatives:
+            for url in (jpeg, webp):
+                name = url[len(default_storage.base_url):]
+                with default_storage.open(name) as f:
+                    self.assertEqual(Image.open(f).size, (width, width // 2))
+
+        card = render_cards([event])[0][1]
+        self.assertIn('type="image/webp"', card)
+        self.assertIn('-320.webp 320w', card)
+        self.assertIn('-1280.jpg 1280w', card)
+
+    def test_small_images_are_not_upscaled(self):
+        event = self.create_event(make_image(200, 100))
+        self.assertEqual(event.thumbnail_widths, '200')
+
+    def test_new_thumbnail_resets_derivatives(self):
+        event = self.create_event(make_image(800, 400))
+        self.assertEqual(event.thumbnail_widths, '320,640,800')
+
+        event.thumbnail = make_image(500, 250, 'nova.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        event.refresh_from_db()
+        self.assertEqual(event.thumbnail_widths, '320,500')
+
+        # Desar sense tocar la portada no la torna a processar
+        with self.captureOnCommitCallbacks() as callbacks:
+            event.title = 'Nou títol'
+            event.save()
+        self.assertEqual(callbacks, [])
+
+    def test_backfill_command(self):
+        event = self.create_event(make_image(700, 350))
+        Event.objects.filter(pk=event.pk).update(thumbnail_widths='')
+
+        out = StringIO()
+        call_command('generate_thumbnails', '--workers=1', stdout=out)
+        event.refresh_from_db()
+        self.assertEqual(event.thumbnail_widths, '320,640,700')
+        self.assertIn('1 portades', out.getvalue())
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='cal', email='cal@example.com')
+        start = timezone.now() + timedelta(days=2)
+        self.music = Event.objects.create(
+            title='Concert; acústic, en directe', description='Primera línia\nSegona línia ' + 'x' * 120,
+            creator=self.user, category='music', scheduled_date=start
+        )
+        self.talk = Event.objects.create(
+            title='Xerrada', description='d', creator=self.user, category='talk', scheduled_date=start, status='cancelled'
+        )
+
+    def body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_category_feed_is_streamed_ics(self):
+        response = self.client.get(reverse('events:calendar_category', args=['music']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+
+        body = self.body(response)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertIn('SUMMARY:Concert\\; acústic\\, en directe', body)
+        self.assertNotIn('Xerrada', body)
+        end = self.music.scheduled_date + timedelta(minutes=self.music.get_duration())
+        self.assertIn(f"DTEND:{end.strftime('%Y%m%dT%H%M%SZ')}", body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_conditional_get_returns_304_without_rendering(self):
+        url = reverse('events:calendar_category', args=['music'])
+        etag = self.client.get(url)['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.music.title = 'Concert nou'
+        self.music.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_creator_and_upcoming_feeds(self):
+        body = self.body(self.client.get(reverse('events:calendar_creator', args=['cal'])))
+        self.assertIn('STATUS:CANCELLED', body)
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+
+        body = self.body(self.client.get(reverse('events:calendar_upcoming')))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+
+        self.assertEqual(self.client.get(reverse('events:calendar_creator', args=['ningú'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('events:calendar_category', args=['x'])).status_code, 404)
+
+
+    def test_upcoming_feed_keeps_the_soonest_events(self):
+        now = timezone.now()
+        Event.objects.create(title='Passat', description='d', creator=self.user, scheduled_date=now - timedelta(days=3))
+        far = Event.objects.create(title='Llunyà', description='d', creator=self.user, scheduled_date=now + timedelta(days=30))
+        soon = Event.objects.create(title='Aviat', description='d', creator=self.user, scheduled_date=now + timedelta(hours=1))
+        # Començat fa poc: encara en directe
+        started = Event.objects.create(
+            title='Començat', description='d', creator=self.user, scheduled_date=now - timedelta(minutes=30), status='live'
+        )
+
+        with mock.patch.object(calendar, 'FEED_LIMIT', 3):
+            body = self.body(self.client.get(reverse('events:calendar_upcoming')))
+        uids = [line for line in body.split('\r\n') if line.startswith('UID:')]
+        self.assertEqual(
+            [uid.split('@')[0] for uid in uids],
+            [f'UID:event-{pk}' for pk in (started.pk, soon.pk, self.music.pk)],
+        )
+        self.assertNotIn('Passat', body)
+        self.assertNotIn(f'UID:event-{far.pk}@', body)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='api', email='api@example.com')
+        now = timezone.now()
+        self.events = [
+            Event.objects.create(
+                title=f'API {i}', description='llarga ' * 50, creator=self.user,
+                category='music' if i % 2 else 'talk', scheduled_date=now + timedelta(days=i), tags='a, b'
+            )
+            for i in range(5)
+        ]
+
+    def get(self, url, **params):
+        return self.client.get(url, params)
+
+    def test_list_uses_one_query_and_omits_description_by_default(self):
+        with self.assertNumQueries(1):
+            response = self.get(reverse('api-v1:event_list'))
+        data = response.json()
+        self.assertEqual(len(data['results']), 5)
+        first = data['results'][0]
+        self.assertEqual(first['id'], self.events[-1].pk)
+        self.assertNotIn('description', first)
+        self.assertEqual(first['tags'], ['a', 'b'])
+        self.assertEqual(first['url'], reverse('events:event_detail', args=[self.events[-1].pk]))
+        self.assertIsNone(data['next'])
+
+    def test_sparse_fieldsets(self):
+        data = self.get(reverse('api-v1:event_list'), fields='id,title,description').json()
+        self.assertEqual(set(data['results'][0]), {'id', 'title', 'description'})
+        self.assertTrue(data['results'][0]['description'].startswith('llarga'))
+
+        response = self.get(reverse('api-v1:event_list'), fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_cursor_pagination_and_filters(self):
+        url = reverse('api-v1:event_list')
+        page = self.get(url, page_size=2, fields='id').json()
+        seen = [row['id'] for row in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            seen += [row['id'] for row in page['results']]
+        self.assertEqual(seen, [event.pk for event in reversed(self.events)])
+
+        music = self.get(url, category='music', fields='category').json()['results']
+        self.assertEqual({row['category'] for row in music}, {'music'})
+        self.assertEqual(self.get(url, category='nope').status_code, 400)
+
+    def test_etag_and_not_modified(self):
+        url = reverse('api-v1:event_detail', args=[self.events[0].pk])
+        response = self.get(url)
+        self.assertEqual(response.json()['title'], 'API 0')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.get(reverse('api-v1:event_detail', args=[0])).status_code, 404)
+
+    def test_categories_and_creators(self):
+        categories = {row['slug']: row for row in self.get(reverse('api-v1:category_list')).json()['results']}
+        self.assertEqual(categories['music']['event_count'], 2)
+        self.assertEqual(categories['art']['event_count'], 0)
+
+        creator = self.get(reverse('api-v1:creator_detail', args=['api'])).json()
+        self.assertEqual(creator['event_count'], 5)
+        events = self.client.get(creator['events'], {'fields': 'id,creator'}).json()['results']
+        self.assertEqual({row['creator'] for row in events}, {'api'})
+        self.assertEqual(self.get(reverse('api-v1:creator_detail', args=['ningu'])).status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='cond', email='cond@example.com', bio='Hola')
+        self.event = Event.objects.create(
+            title='Condicional', description='d', creator=self.user, category='music',
+            scheduled_date=timezone.now() + timedelta(days=1)
+        )
+        self.urls = [
+            reverse('events:event_detail', args=[self.event.pk]),
+            reverse('events:events_by_category', args=['music']),
+            reverse('users:public_profile', args=['cond']),
+        ]
+
+    def test_not_modified_with_one_query(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Cache-Control'], 'private, no-cache')
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.content, b'')
+
+    def test_etag_changes_with_data_and_session(self):
+        detail, category, profile = self.urls
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+
+        self.event.title = 'Nou títol'
+        self.event.save()
+        self.user.bio = 'Adéu'
+        self.user.save()
+        for url, etag in zip(self.urls, etags):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200, url)
+
+        etag = self.client.get(detail)['ETag']
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pending_messages_are_always_rendered(self):
+        url = self.urls[1]
+        etag = self.client.get(url)['ETag']
+        self.client.cookies['messages'] = 'pendent'
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class StaticPipelineTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.settings = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_STORAGE='config.staticfiles.CompressedManifestStaticFilesStorage',
+        )
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        url = static('css/main.css')
+        self.assertRegex(url, r'^/static/css/main\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root, url[len('/static/'):])
+        self.assertTrue(os.path.exists(path + '.gz'))
+        with open(path, 'rb') as original, gzip.open(path + '.gz') as compressed:
+            self.assertEqual(original.read(), compressed.read())
+        self.assertIn(url, self.client.get(reverse('users:login')).content.decode())
+
+    def test_middleware_serves_precompressed_immutable_files(self):
+        url = static('css/main.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(b'avatar-thumb', gzip.decompress(b''.join(response.streaming_content)))
+
+        plain = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn(b'avatar-thumb', b''.join(plain.streaming_content))
+
+        # Nom sense hash: memòria cau curta i revalidació amb l'ETag
+        response = self.client.get('/static/css/main.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        response = self.client.get('/static/css/main.css', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_each_content_coding_has_its_own_etag(self):
+        url = static('css/main.css')
+        plain = self.client.get(url, HTTP_ACCEPT_ENCODING='identity')
+        gzipped = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotEqual(plain['ETag'], gzipped['ETag'])
+        self.assertTrue(gzipped['ETag'].endswith('-gzip"'))
+
+        # L'ETag d'una altra codificació no valida la variant que es serviria
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='identity', HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], gzipped['ETag'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+
+class RepositoryTests(TestCase):
+    """Camí de lectura per pymongo (events.repository) sense servidor de Mongo"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='repo', email='repo@example.com')
+        self.event = Event.objects.create(
+            title='Repositori', description='d', creator=self.user, category='music', tags='rock, directe',
+            scheduled_date=timezone.now() + timedelta(days=1), is_featured=True
+        )
+
+    def document(self, event):
+        """Document tal com el retorna el pipeline: columnes i dates UTC sense zona"""
+        row = Event.objects.filter(pk=event.pk).values(*[field.attname for field in repository.LISTING_COLUMNS]).get()
+        document = {repository.CREATOR_USERNAME: event.creator.username}
+        for field in repository.LISTING_COLUMNS:
+            value = row[field.attname]
+            if isinstance(value, datetime):
+                value = timezone.make_naive(value, timezone.utc)
+            document[field.column] = value
+        return document
+
+    def test_documents_build_the_same_instances_as_the_orm(self):
+        orm = Event.objects.for_listing().get(pk=self.event.pk)
+        document = self.document(self.event)
+        with self.assertNumQueries(0):
+            event = repository.to_event(document)
+            for name in LISTING_FIELDS:
+                self.assertEqual(getattr(event, name), getattr(orm, name), name)
+            self.assertEqual(event.creator.username, 'repo')
+            self.assertEqual(event.get_tags_list(), orm.get_tags_list())
+            self.assertEqual(event.get_deferred_fields(), orm.get_deferred_fields())
+            html = render_cards([event], 'card')[0][1]
+            cache.clear()
+            self.assertEqual(html, render_cards([orm], 'card')[0][1])
+
+    def test_pipelines(self):
+        pipeline = repository.listing_pipeline({'category': 'music'}, {'scheduled_date': -1, 'id': 1}, 13)
+        self.assertEqual(pipeline[:3], [
+            {'$match': {'category': 'music'}}, {'$sort': {'scheduled_date': -1, 'id': 1}}, {'$limit': 13},
+        ])
+        self.assertEqual(pipeline[3]['$lookup']['from'], User._meta.db_table)
+        self.assertNotIn('description', pipeline[-1]['$project'])
+
+        paginator = repository.MongoCursorPaginator({}, ORDER_BY_CREATED)
+        moment = timezone.now()
+        self.assertEqual(repository.keyset_match(paginator._fields, [moment, 7], False), {'$or': [
+            {'created_at': {'$lt': moment}},
+            {'created_at': moment, 'id': {'$gt': 7}},
+        ]})
+        self.assertEqual(
+            repository.listing_match(status='live', creator=3),
+            {'creator_id': 3, 'status': 'live'},
+        )
+
+    @override_settings(EVENT_MONGO_READ_VIEWS=['event_list', 'events_by_category', 'my_events', 'event_detail'])
+    def test_other_engines_keep_the_orm(self):
+        self.assertFalse(repository.enabled('event_list'))
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(reverse('events:event_list')).status_code, 200)
+
+
+@skipUnless(repository.available(), 'Cal MongoDB (djongo) com a base de dades')
+class RepositoryParityTests(TestCase):
+    """Amb MongoDB, el camí per pymongo ha de donar el mateix que l'ORM"""
+
+    def setUp(self):
+        self.users = [User.objects.create(username=f'par{i}', email=f'par{i}@example.com') for i in range(2)]
+        start = timezone.now()
+        for i in range(30):
+            Event.objects.create(
+                title=f'Paritat {i}', description='d', creator=self.users[i % 2],
+                category=('music', 'talk')[i % 3 == 0], status=('scheduled', 'live')[i % 4 == 0],
+                scheduled_date=start + timedelta(hours=i % 7), is_featured=i % 5 == 0,
+            )
+        self.factory = RequestFactory()
+
+    def pages(self, read, path='/'):
+        """Totes les pàgines seguint els cursors; (pk, nom del creador) de cada fila"""
+        seen, cursor = [], None
+        while True:
+            page = read(self.factory.get(path, {'cursor': cursor} if cursor else {}))
+            seen.append([(event.pk, event.creator.username) for event in page])
+            if not page.has_next:
+                return seen
+            cursor = page.next_cursor
+
+    def test_listings_match_the_orm(self):
+        self.assertEqual(
+            self.pages(lambda request: repository.list_page(request, {'status': 'scheduled'})),
+            self.pages(lambda request: views.list_page(request, {'status': 'scheduled'})),
+        )
+        self.assertEqual(
+            self.pages(lambda request: repository.category_page(request, 'music')),
+            self.pages(lambda request: views.category_page(request, 'music')),
+        )
+        self.assertEqual(
+            [event.pk for event in repository.featured_events()],
+            [event.pk for event in views.featured_events()],
+        )
+        request = self.factory.get('/')
+        orm = Event.objects.filter(creator=self.users[0]).order_by('-created_at', 'pk')[:20]
+        self.assertEqual([e.pk for e in repository.creator_page(request, self.users[0].pk)], [e.pk for e in orm])
+
+    def test_counts_match_the_orm(self):
+        for category in ('music', 'talk', 'art'):
+            self.assertEqual(repository.category_state(category), views.category_state(category))
+        event = Event.objects.first()
+        self.assertEqual(repository.detail_state(event.pk), views.detail_state(event.pk))
+        self.assertEqual(repository.detail_state(0), {'latest': None, 'total': 0})
@@ -0,0 +1,128 @@
+"""
+Derivats redimensionats de ``Event.thumbnail``.
+
+Les targetes mostren la portada a 200 px d'alçada, però fins ara es
+descarregava l'original. En pujar una imatge, el desat programa (després
+del commit) la generació de versions a les amplades de ``THUMBNAIL_WIDTHS``
+en JPEG i WebP, en un pool de fils fora de la petició: Pillow allibera el
+GIL mentre descodifica i codifica. Quan acaba, desa les amplades generades
+a ``Event.thumbnail_widths`` i les plantilles passen a emetre ``srcset``;
+mentrestant se serveix l'original.
+
+Els derivats viuen a ``events/thumbnails/derived/`` amb un nom deduït de
+l'original, així que les plantilles no consulten l'emmagatzematge.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTHS = tuple(getattr(settings, 'EVENT_THUMBNAIL_WIDTHS', (320, 640, 1280)))
+DERIVED_DIR = 'events/thumbnails/derived'
+
+# Format: (extensió, format de Pillow, opcions de desat)
+FORMATS = (
+    ('jpg', 'JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+    ('webp', 'WEBP', {'quality': 75, 'method': 4}),
+)
+
+_executor = None
+
+
+def derived_name(source_name, width, extension):
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    return f'{DERIVED_DIR}/{stem}-{width}.{extension}'
+
+
+def parse_widths(value):
+    return [int(width) for width in value.split(',') if width] if value else []
+
+
+def target_widths(source_width):
+    """Amplades a generar: mai més grans que l'original (no s'amplia)"""
+    widths = [width for width in THUMBNAIL_WIDTHS if width < source_width]
+    widths.append(min(source_width, THUMBNAIL_WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def generate_derivatives(source_name, storage=default_storage):
+    """Genera els derivats d'una imatge i en retorna les amplades"""
+    source_storage = Event._meta.get_field('thumbnail').storage
+    with source_storage.open(source_name, 'rb') as source:
+        image = Image.open(source)
+        # Per a JPEG, descodifica directament a una escala reduïda (molt més ràpid)
+        image.draft('RGB', (THUMBNAIL_WIDTHS[-1], THUMBNAIL_WIDTHS[-1] * image.height // max(image.width, 1)))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        widths = target_widths(image.width)
+
+        # De més gran a més petit: cada mida es redueix de l'anterior
+        current = image
+        for width in reversed(widths):
+            height = max(1, round(current.height * width / current.width))
+            if width != current.width:
+                current = current.resize((width, height), Image.Resampling.LANCZOS)
+            for extension, image_format, options in FORMATS:
+                buffer = io.BytesIO()
+                current.save(buffer, image_format, **options)
+                name = derived_name(source_name, width, extension)
+                if storage.exists(name):
+                    storage.delete(name)
+                storage.save(name, ContentFile(buffer.getvalue()))
+    return widths
+
+
+def process_event(pk):
+    """Genera els derivats d'un esdeveniment i desa les amplades"""
+    source_name = Event.objects.filter(pk=pk).values_list('thumbnail', flat=True).first()
+    if not source_name:
+        return None
+    widths = generate_derivatives(source_name)
+    # Només si la portada no ha canviat mentrestant; updated_at canvia la
+    # clau de les targetes en memòria cau perquè es tornin a renderitzar
+    Event.objects.filter(pk=pk, thumbnail=source_name).update(
+        thumbnail_widths=','.join(map(str, widths)),
+        updated_at=timezone.now(),
+    )
+    return widths
+
+
+def _run(pk):
+    try:
+        process_event(pk)
+    except Exception:
+        logger.exception("Error generant les miniatures de l'esdeveniment %s", pk)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'EVENT_THUMBNAIL_WORKERS', 2),
+            thread_name_prefix='event-thumbnails',
+        )
+    return _executor
+
+
+def schedule(pk):
+    """
+    Programa la generació en segon pla. Amb ``EVENT_THUMBNAIL_WORKERS = 0``
+    es fa dins del mateix fil (proves, ordres de gestió).
+    """
+    if not getattr(settings, 'EVENT_THUMBNAIL_WORKERS', 2):
+        return process_event(pk)
+    return get_executor().submit(_run, pk)
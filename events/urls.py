@@ -1,14 +1,30 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Les vistes públiques de lectura tenen versió asíncrona per a config.asgi
+if settings.ASYNC_VIEWS:
+    from . import async_views as public_views
+else:
+    public_views = views
+
 app_name = 'events'
 
 urlpatterns = [
-    path('', views.event_list_view, name='event_list'),
+    path('', public_views.event_list_view, name='event_list'),
     path('create/', views.event_create_view, name='event_create'),
-    path('<int:pk>/', views.event_detail_view, name='event_detail'),
+    path('stream/', views.event_stream_view, name='event_stream'),
+    path('<int:pk>/', public_views.event_detail_view, name='event_detail'),
+    path('<int:pk>/stream/', views.event_stream_view, name='event_detail_stream'),
+    path('<int:pk>/presence/join/', views.presence_join_view, name='presence_join'),
+    path('<int:pk>/presence/heartbeat/', views.presence_heartbeat_view, name='presence_heartbeat'),
+    path('<int:pk>/presence/leave/', views.presence_leave_view, name='presence_leave'),
     path('<int:pk>/edit/', views.event_update_view, name='event_update'),
     path('<int:pk>/delete/', views.event_delete_view, name='event_delete'),
     path('my-events/', views.my_events_view, name='my_events'),
-    path('category/<str:category>/', views.events_by_category_view, name='events_by_category'),
+    path('category/<str:category>/', public_views.events_by_category_view, name='events_by_category'),
+    path('tag/<str:slug>/', views.events_by_tag_view, name='events_by_tag'),
+    path('calendar.ics', views.calendar_upcoming_view, name='calendar_upcoming'),
+    path('category/<str:category>/calendar.ics', views.calendar_category_view, name='calendar_category'),
+    path('creator/<str:username>/calendar.ics', views.calendar_creator_view, name='calendar_creator'),
 ]
\ No newline at end of file
@@ -1,135 +1,231 @@
+import logging
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.utils import timezone
-from .models import Event
+from django.core.exceptions import ObjectDoesNotExist
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max, Q, Subquery
+from .models import CategoryEventStats, Event, Tag, LISTING_FIELDS
 from .forms import EventCreationForm, EventUpdateForm, EventSearchForm
-from django.http import HttpResponseForbidden
+from .pagination import paginate_queryset, ORDER_BY_CREATED, ORDER_BY_SCHEDULED
+from .search import apply_filters, paginate_search
+from .cards import render_cards
+from .stats import get_stats
+from .streams import stream_response
+from .calendar import SOONEST_FIRST, calendar_response, upcoming_events
+from .conditional import not_modified, page_etag, set_validators
+from . import presence, repository
+from django.http import Http404, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_POST
+from config.metrics import record_error
+
+logger = logging.getLogger(__name__)
+
+# --- Peces compartides amb events.async_views ---
+
+def list_filters(request):
+    """Formulari de cerca i filtres actius del llistat"""
+    search_form = EventSearchForm(request.GET or None)
+    filters = {}
+    if search_form.is_bound and search_form.is_valid():
+        filters = {k: v for k, v in search_form.cleaned_data.items() if v}
+    return search_form, filters
+
+
+def list_page(request, filters):
+    if filters.get('search', '').strip():
+        # Cerca de text a l'índex invertit (ordenada per rellevància)
+        return paginate_search(request, filters, page_size=12)
+
+    if repository.enabled('event_list'):
+        return repository.list_page(request, filters)
+
+    # Filtres sobre camps indexats i paginació per cursor
+    events = apply_filters(
+        Event.objects.for_listing(),
+        category=filters.get('category', ''),
+        status=filters.get('status', ''),
+        date_from=filters.get('date_from'),
+        date_to=filters.get('date_to'),
+    )
+    return paginate_queryset(request, events, ORDER_BY_CREATED, page_size=12)
+
+
+def featured_events():
+    """Esdeveniments destacats (només a la portada sense filtres)"""
+    if repository.enabled('event_list'):
+        return repository.featured_events()
+    return list(
+        Event.objects.for_listing()
+        .filter(is_featured=True, status__in=['scheduled', 'live'])
+        .order_by('-created_at', 'pk')[:6]
+    )
+
+
+def render_event_list(request, page, featured, search_form, is_filtered):
+    context = {
+        'events': page.object_list,
+        'event_cards': render_cards(page.object_list, 'compact'),
+        'page': page,
+        'featured_events': featured,
+        'featured_cards': render_cards(featured, 'card'),
+        'search_form': search_form,
+        'is_filtered': is_filtered,
+    }
+    return render(request, 'events/includes/event_list.html', context)
+
+
+def render_event_list_error(request, error):
+    # En cas d'error greu, mostrem una pàgina d'error simple
+    logger.exception("Error a event_list_view", extra={'query': request.GET.urlencode()})
+    record_error('events:event_list', error)
+    context = {
+        'error': "Hi ha hagut un problema carregant els esdeveniments",
+        'events': [],
+        'event_cards': [],
+        'page': None,
+        'featured_events': [],
+        'featured_cards': [],
+        'search_form': EventSearchForm(),
+    }
+    return render(request, 'events/includes/event_list.html', context)
+
+
+def detail_state(pk):
+    """
+    ``Max('updated_at')`` i recompte dels esdeveniments del creador de
+    ``pk`` en una consulta (índex creator, updated_at). El conjunt inclou
+    l'esdeveniment, i el recompte és el que mostra la pàgina.
+    """
+    if repository.enabled('event_detail'):
+        return repository.detail_state(pk)
+    creator = Event.objects.filter(pk=pk).values('creator_id')
+    return Event.objects.filter(creator_id__in=creator).aggregate(latest=Max('updated_at'), total=Count('pk'))
+
+
+def detail_etag(request, pk, state):
+    # Sense conjunt (esdeveniment inexistent o sense creador) no hi ha validador
+    if not state['total']:
+        return None
+    return page_etag(request, 'detail', pk, state['latest'], state['total'])
+
+
+def creator_exists(event):
+    """Verificar si l'usuari creador encara existeix (ja carregat amb select_related)"""
+    try:
+        return event.creator is not None
+    except ObjectDoesNotExist:
+        return False
+
+
+def render_event_detail(request, event, is_creator, creator_events_count):
+    context = {
+        'event': event,
+        'is_creator': is_creator,
+        'creator_exists': creator_exists(event),
+        'creator_events_count': creator_events_count,
+        'embed_url': event.get_stream_embed_url(),
+        'tags_list': event.get_tag_links(),
+        'watching': presence.get_store().count(event.pk),
+        'presence_heartbeat': presence.HEARTBEAT,
+    }
+    return render(request, 'events/event_detail.html', context)
+
+
+def event_not_found(request, pk):
+    # Esdeveniment inexistent: no és un error del servidor
+    logger.info("event_detail_view: esdeveniment %s inexistent", pk)
+    messages.error(request, "No s'ha pogut carregar l'esdeveniment.")
+    return redirect('events:event_list')
+
+
+def event_detail_error(request, pk, error):
+    logger.exception("Error a event_detail_view", extra={'event_pk': pk})
+    record_error('events:event_detail', error)
+    messages.error(request, "No s'ha pogut carregar l'esdeveniment.")
+    return redirect('events:event_list')
+
+
+def category_page(request, category):
+    if repository.enabled('events_by_category'):
+        return repository.category_page(request, category)
+    events = Event.objects.filter(category=category).for_listing()
+    return paginate_queryset(request, events, ORDER_BY_SCHEDULED, page_size=12)
+
+
+def category_state(category):
+    """
+    Validador i recompte de la categoria en una consulta, de cost fitat: el
+    recompte és la fila de ``CategoryEventStats`` i el darrer canvi, el
+    primer de l'índex (category, updated_at). Cap dels dos recorre la
+    categoria.
+    """
+    if repository.enabled('events_by_category'):
+        return repository.category_state(category)
+    latest = Event.objects.filter(category=category).order_by('-updated_at').values('updated_at')[:1]
+    state = (
+        CategoryEventStats.objects.filter(category=category)
+        .values('total').annotate(latest=Subquery(latest)).first()
+    )
+    return state or {'latest': None, 'total': 0}
+
+
+def render_events_by_category(request, category, page, total_events):
+    context = {
+        'events': page.object_list,
+        'event_cards': render_cards(page.object_list, 'card'),
+        'page': page,
+        'total_events': total_events,
+        'category': category,
+        'category_name': dict(Event.CATEGORY_CHOICES)[category],
+        'icon': Event().get_category_icon(),  # Instància buida per obtenir el mètode
+    }
+    return render(request, 'events/events_by_category.html', context)
+
+
+def invalid_category(request):
+    messages.error(request, 'Categoria no vàlida')
+    return redirect('events:event_list')
+
+
+# --- Vistes ---
 
 def event_list_view(request):
     """Vista per llistar esdeveniments amb gestió d'errors"""
     try:
-        # Obtenim tots els esdeveniments
-        all_events = list(Event.objects.all())
-        
-        # Assegurar que tots els esdeveniments tenen created_at
-        for event in all_events:
-            if event.created_at is None:
-                # Si no té created_at, li assignem l'hora actual
-                event.created_at = timezone.now()
-                # O podríem guardar-ho a la base de dades:
-                # event.save()
-        
-        # Ordenem per data de creació amb gestió d'errors
-        def get_created_at(event):
-            # Retorna un valor per defecte si created_at és None
-            return event.created_at or timezone.now()
-        
-        all_events.sort(key=get_created_at, reverse=True)
-        
-        # Esdeveniments destacats
-        featured_events = []
-        for event in all_events:
-            if event.is_featured and event.status in ['scheduled', 'live']:
-                featured_events.append(event)
-                if len(featured_events) >= 6:  # Limit a 6
-                    break
-        
-        # Paginació
-        page_size = 12
-        try:
-            page = int(request.GET.get('page', 1))
-        except (ValueError, TypeError):
-            page = 1
-        
-        # Assegurar que la pàgina és vàlida
-        if page < 1:
-            page = 1
-        
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        
-        # Assegurar que els índexs estan dins dels límits
-        if start_idx >= len(all_events):
-            start_idx = 0
-            page = 1
-            end_idx = page_size
-        
-        page_events = all_events[start_idx:end_idx]
-        
-        # Calcular total de pàgines
-        total_events = len(all_events)
-        total_pages = max(1, (total_events + page_size - 1) // page_size)
-        
-        # Assegurar que la pàgina actual no és més gran que el total
-        if page > total_pages:
-            page = total_pages
-            start_idx = (page - 1) * page_size
-            end_idx = min(start_idx + page_size, total_events)
-            page_events = all_events[start_idx:end_idx]
-        
-        context = {
-            'events': page_events,
-            'featured_events': featured_events,
-            'search_form': EventSearchForm(),
-            'current_page': page,
-            'total_pages': total_pages,
-            'total_events': total_events,
-        }
-        
-        return render(request, 'events/includes/event_list.html', context)
-        
+        search_form, filters = list_filters(request)
+        page = list_page(request, filters)
+        featured = [] if filters else featured_events()
+        return render_event_list(request, page, featured, search_form, bool(filters))
     except Exception as e:
-        # En cas d'error greu, mostrem una pàgina d'error simple
-        print(f"Error a event_list_view: {e}")
-        context = {
-            'error': "Hi ha hagut un problema carregant els esdeveniments",
-            'events': [],
-            'featured_events': [],
-            'search_form': EventSearchForm(),
-            'current_page': 1,
-            'total_pages': 1,
-            'total_events': 0,
-        }
-        return render(request, 'events/includes/event_list.html', context)
+        return render_event_list_error(request, e)
 
 # events/views.py
 def event_detail_view(request, pk):
     try:
-        event = get_object_or_404(Event, pk=pk)
-        
-        # Verificar si l'usuari creador encara existeix
-        try:
-            creator_exists = event.creator is not None
-        except User.DoesNotExist:
-            creator_exists = False
-        
-        is_creator = False
-        if creator_exists and request.user.is_authenticated:
-            is_creator = request.user == event.creator
-        
-        # Actualitzar estat si és necessari
-        try:
-            event.update_status()
-        except:
-            pass  # Si hi ha error, continuem
-        
-        context = {
-            'event': event,
-            'is_creator': is_creator,
-            'creator_exists': creator_exists,
-            'embed_url': event.get_stream_embed_url() if hasattr(event, 'get_stream_embed_url') else None,
-            'tags_list': event.get_tags_list() if hasattr(event, 'get_tags_list') else [],
-        }
-        
-        return render(request, 'events/event_detail.html', context)
-        
+        # Validador primer: si el navegador ja té la pàgina, 304 sense res més
+        state = detail_state(pk)
+        etag = detail_etag(request, pk, state)
+        if etag is not None:
+            response = not_modified(request, etag, state['latest'])
+            if response is not None:
+                return response
+
+        # El creador es carrega a la mateixa consulta
+        event = get_object_or_404(Event.objects.select_related('creator'), pk=pk)
+
+        has_creator = creator_exists(event)
+        is_creator = has_creator and request.user.is_authenticated and request.user.pk == event.creator_id
+        # El recompte ja ve del validador (mateix conjunt: els del creador)
+        creator_events_count = state['total'] if has_creator else 0
+
+        response = render_event_detail(request, event, is_creator, creator_events_count)
+        return set_validators(response, etag, state['latest']) if etag else response
+    except Http404:
+        return event_not_found(request, pk)
     except Exception as e:
-        print(f"Error in event_detail_view: {e}")
-        messages.error(request, "No s'ha pogut carregar l'esdeveniment.")
-        return redirect('events:event_list')
+        return event_detail_error(request, pk, e)
 @login_required
 def event_create_view(request):
     if request.method == 'POST':
@@ -161,7 +257,7 @@ def event_update_view(request, pk):
     event = get_object_or_404(Event, pk=pk)
     
     # Verificar que l'usuari és el creador
-    if request.user != event.creator:
+    if request.user.pk != event.creator_id:
         return HttpResponseForbidden("No tens permís per editar aquest esdeveniment")
     
     if request.method == 'POST':
@@ -187,7 +283,7 @@ def event_delete_view(request, pk):
     event = get_object_or_404(Event, pk=pk)
     
     # Verificar que l'usuari és el creador
-    if request.user != event.creator:
+    if request.user.pk != event.creator_id:
         return HttpResponseForbidden("No tens permís per eliminar aquest esdeveniment")
     
     if request.method == 'POST':
@@ -203,25 +299,29 @@ def event_delete_view(request, pk):
 
 @login_required
 def my_events_view(request):
-    events = Event.objects.filter(creator=request.user).order_by('-created_at')
-    
-    # Estadístiques
-    total_events = events.count()
-    live_events = events.filter(status='live').count()
-    scheduled_events = events.filter(status='scheduled').count()
-    finished_events = events.filter(status='finished').count()
+    # Estadístiques (comptadors materialitzats: una sola lectura)
+    stats = get_stats(request.user)
     
     # Filtre per estat
     status_filter = request.GET.get('status', '')
-    if status_filter:
-        events = events.filter(status=status_filter)
+
+    if repository.enabled('my_events'):
+        page = repository.creator_page(request, request.user.pk, status_filter)
+    else:
+        events = Event.objects.filter(creator=request.user)
+        if status_filter:
+            events = events.filter(status=status_filter)
+        # El creador és l'usuari actual: no cal carregar-lo per cada fila
+        events = events.only(*LISTING_FIELDS)
+        page = paginate_queryset(request, events, ORDER_BY_CREATED, page_size=20)
     
     context = {
-        'events': events,
-        'total_events': total_events,
-        'live_events': live_events,
-        'scheduled_events': scheduled_events,
-        'finished_events': finished_events,
+        'events': page.object_list,
+        'page': page,
+        'total_events': stats.total,
+        'live_events': stats.live,
+        'scheduled_events': stats.scheduled,
+        'finished_events': stats.finished,
         'current_status_filter': status_filter,
         'status_choices': Event.STATUS_CHOICES,
     }
@@ -230,22 +330,106 @@ def my_events_view(request):
 
 def events_by_category_view(request, category):
     # Verificar que la categoria existeix
-    valid_categories = [choice[0] for choice in Event.CATEGORY_CHOICES]
-    
-    if category not in valid_categories:
-        messages.error(request, 'Categoria no vàlida')
-        return redirect('events:event_list')
-    
-    events = Event.objects.filter(category=category).order_by('-scheduled_date')
-    
-    # Obtenir nom de la categoria
-    category_name = dict(Event.CATEGORY_CHOICES)[category]
-    
+    if category not in dict(Event.CATEGORY_CHOICES):
+        return invalid_category(request)
+
+    state = category_state(category)
+    etag = page_etag(request, 'category', category, request.GET.urlencode(), state['latest'], state['total'])
+    response = not_modified(request, etag, state['latest'])
+    if response is not None:
+        return response
+
+    page = category_page(request, category)
+    response = render_events_by_category(request, category, page, state['total'])
+    return set_validators(response, etag, state['latest'])
+
+def events_by_tag_view(request, slug):
+    tag = get_object_or_404(Tag, slug=slug)
+
+    # Llistat servit des de la relació normalitzada (índex per etiqueta)
+    events = Event.objects.filter(tag_items=tag).for_listing()
+    page = paginate_queryset(request, events, ORDER_BY_SCHEDULED, page_size=12)
+
     context = {
-        'events': events,
-        'category': category,
-        'category_name': category_name,
-        'icon': Event().get_category_icon(),  # Instància buida per obtenir el mètode
+        'tag': tag,
+        'events': page.object_list,
+        'event_cards': render_cards(page.object_list, 'card'),
+        'page': page,
+        'total_events': tag.event_count,
     }
-    
-    return render(request, 'events/events_by_category.html', context)
\ No newline at end of file
+
+    return render(request, 'events/events_by_tag.html', context)
+
+def event_stream_view(request, pk=None):
+    """
+    Flux SSE de canvis d'estat (tots o d'un esdeveniment). Sota config.asgi
+    aquestes rutes les serveix events.streams.StreamRouter sense ocupar fils.
+    """
+    return stream_response(pk)
+
+
+# --- Presència d'espectadors (events.presence) ---
+
+def _viewer_id(request):
+    """Id aleatori que genera el navegador (sense sessió ni escriptures)"""
+    viewer = request.POST.get('viewer', '')
+    if not viewer or len(viewer) > 64 or not viewer.replace('-', '').isalnum():
+        return None
+    return viewer
+
+
+@require_POST
+def presence_join_view(request, pk):
+    viewer = _viewer_id(request)
+    if viewer is None:
+        return JsonResponse({'error': 'viewer invàlid'}, status=400)
+    capacity = presence.get_capacity(pk)
+    if capacity is None:
+        raise Http404
+    admission = presence.get_store().join(pk, viewer, capacity)
+    return JsonResponse({
+        'admitted': admission.admitted,
+        'watching': admission.watching,
+        'max_viewers': capacity,
+        'heartbeat': presence.HEARTBEAT,
+    })
+
+
+@require_POST
+def presence_heartbeat_view(request, pk):
+    viewer = _viewer_id(request)
+    if viewer is None:
+        return JsonResponse({'error': 'viewer invàlid'}, status=400)
+    store = presence.get_store()
+    # active=False: la sessió ha caducat i el client ha de tornar a entrar
+    return JsonResponse({'active': store.heartbeat(pk, viewer), 'watching': store.count(pk)})
+
+
+@require_POST
+def presence_leave_view(request, pk):
+    viewer = _viewer_id(request)
+    if viewer is not None:
+        presence.get_store().leave(pk, viewer)
+    return JsonResponse({'ok': True})
+
+
+# --- Calendaris iCalendar (events.calendar) ---
+
+def calendar_upcoming_view(request):
+    return calendar_response(
+        request, 'upcoming', 'StreamEvents: propers esdeveniments', upcoming_events(), ordering=SOONEST_FIRST,
+    )
+
+
+def calendar_category_view(request, category):
+    categories = dict(Event.CATEGORY_CHOICES)
+    if category not in categories:
+        raise Http404
+    events = Event.objects.filter(category=category)
+    return calendar_response(request, f'category:{category}', f'StreamEvents: {categories[category]}', events)
+
+
+def calendar_creator_view(request, username):
+    creator = get_object_or_404(get_user_model().objects.only('pk', 'username'), username=username)
+    events = Event.objects.filter(creator_id=creator.pk)
+    return calendar_response(request, f'creator:{creator.pk}', f'StreamEvents: {creator.username}', events)
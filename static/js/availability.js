@@ -0,0 +1,30 @@
+// Disponibilitat en directe del nom d'usuari i l'email (users.availability).
+// L'URL ve de l'atribut data-availability-url de l'etiqueta <script>.
+(function () {
+  const url = document.currentScript.dataset.availabilityUrl;
+  const messages = {
+    username: ['Nom d\'usuari disponible', 'Aquest nom d\'usuari ja existeix'],
+    email: ['', 'Ja existeix un usuari amb aquest email'],
+  };
+  ['username', 'email'].forEach(function (field) {
+    const input = document.getElementById('id_' + field);
+    const feedback = document.querySelector('[data-availability-for="' + field + '"]');
+    if (!input || !feedback) return;
+    let timer = null;
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      const value = input.value.trim();
+      feedback.textContent = '';
+      if (!value || (field === 'email' && !input.checkValidity())) return;
+      timer = setTimeout(function () {
+        fetch(url + '?' + new URLSearchParams({[field]: value}))
+          .then(function (response) { return response.json(); })
+          .then(function (data) {
+            if (data.value !== input.value.trim()) return;
+            feedback.textContent = messages[field][data.available ? 0 : 1];
+            feedback.className = 'small ' + (data.available ? 'text-success' : 'text-danger');
+          });
+      }, 300);
+    });
+  });
+})();
@@ -0,0 +1,51 @@
+// Formulari d'esdeveniment: previsualització de la portada, data mínima i classes Bootstrap
+document.addEventListener('DOMContentLoaded', function() {
+  // Previsualització de thumbnail
+  const thumbnailInput = document.getElementById('id_thumbnail');
+  const previewContainer = document.createElement('div');
+  previewContainer.className = 'mt-2';
+  
+  if (thumbnailInput) {
+    thumbnailInput.parentNode.appendChild(previewContainer);
+    
+    thumbnailInput.addEventListener('change', function(e) {
+      previewContainer.innerHTML = '';
+      
+      if (this.files && this.files[0]) {
+        const reader = new FileReader();
+        
+        reader.onload = function(e) {
+          const img = document.createElement('img');
+          img.src = e.target.result;
+          img.className = 'img-thumbnail';
+          img.style.maxWidth = '200px';
+          previewContainer.appendChild(img);
+        }
+        
+        reader.readAsDataURL(this.files[0]);
+      }
+    });
+  }
+  
+  // Validació de data
+  const dateInput = document.querySelector('input[type="datetime-local"]');
+  if (dateInput) {
+    // Estableix el mínim a ara
+    const now = new Date();
+    const localDateTime = new Date(now.getTime() - now.getTimezoneOffset() * 60000)
+      .toISOString()
+      .slice(0, 16);
+    dateInput.min = localDateTime;
+  }
+  
+  // Afegir classes Bootstrap als camps del formulari
+  const formInputs = document.querySelectorAll('input, select, textarea');
+  formInputs.forEach(input => {
+    if (!input.classList.contains('form-control') && 
+        input.type !== 'checkbox' && 
+        input.type !== 'radio' &&
+        input.type !== 'file') {
+      input.classList.add('form-control');
+    }
+  });
+});
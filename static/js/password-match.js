@@ -0,0 +1,19 @@
+// Les dues contrasenyes dels formularis de registre i canvi han de coincidir
+(function () {
+  const pw1 = document.querySelector('input[name="password1"]');
+  const pw2 = document.querySelector('input[name="password2"]');
+  if (!pw1 || !pw2) return;
+  function check() {
+    if (pw1.value && pw2.value) {
+      if (pw1.value !== pw2.value) {
+        pw2.setCustomValidity('Les contrasenyes no coincideixen.');
+      } else {
+        pw2.setCustomValidity('');
+      }
+    } else {
+      pw2.setCustomValidity('');
+    }
+  }
+  pw1.addEventListener('input', check);
+  pw2.addEventListener('input', check);
+})();
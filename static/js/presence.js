@@ -0,0 +1,54 @@
+// Entrada, heartbeat i sortida de l'espectador (events.presence).
+// Configuració: data-presence-url, data-csrf i data-heartbeat de l'etiqueta <script>.
+(function () {
+  const config = document.currentScript.dataset;
+  const base = config.presenceUrl;
+  const csrf = config.csrf;
+  const heartbeat = Number(config.heartbeat) * 1000;
+  const viewer = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : String(Math.random()).slice(2);
+  const player = document.querySelector('[data-presence-src]');
+  let timer = null;
+
+  function post(action) {
+    const body = new URLSearchParams({viewer: viewer, csrfmiddlewaretoken: csrf});
+    return fetch(base + action + '/', {method: 'POST', body: body, credentials: 'same-origin'})
+      .then(function (response) { return response.json(); });
+  }
+
+  function showCount(watching) {
+    document.querySelectorAll('[data-presence-count]').forEach(function (el) { el.textContent = watching; });
+  }
+
+  function join() {
+    post('join').then(function (data) {
+      showCount(data.watching);
+      if (!data.admitted) {
+        document.querySelector('[data-presence-full]').classList.remove('d-none');
+        timer = setTimeout(join, heartbeat);
+        return;
+      }
+      document.querySelector('[data-presence-full]').classList.add('d-none');
+      if (player && !player.src) player.src = player.dataset.presenceSrc;
+      timer = setInterval(beat, heartbeat);
+    });
+  }
+
+  function beat() {
+    post('heartbeat').then(function (data) {
+      showCount(data.watching);
+      if (!data.active) {
+        // La sessió ha caducat (p. ex. pestanya adormida): cal tornar a entrar
+        clearInterval(timer);
+        join();
+      }
+    });
+  }
+
+  window.addEventListener('pagehide', function () {
+    clearInterval(timer);
+    const body = new URLSearchParams({viewer: viewer, csrfmiddlewaretoken: csrf});
+    navigator.sendBeacon(base + 'leave/', body);
+  });
+
+  join();
+})();
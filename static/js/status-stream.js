@@ -0,0 +1,13 @@
+// Actualitza en directe els badges amb data-status-badge="<pk>" (events.streams).
+// L'URL del flux ve de l'atribut data-stream-url de l'etiqueta <script>.
+(function () {
+  if (!window.EventSource) return;
+  const source = new EventSource(document.currentScript.dataset.streamUrl);
+  source.addEventListener('status', function (e) {
+    const data = JSON.parse(e.data);
+    document.querySelectorAll('[data-status-badge="' + data.pk + '"]').forEach(function (badge) {
+      badge.className = badge.className.replace(/\bbg-\S+/g, '').trim() + ' ' + data.badge_class;
+      badge.textContent = data.label;
+    });
+  });
+})();
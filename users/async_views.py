@@ -0,0 +1,19 @@
+"""
+Versió asíncrona del perfil públic (``ASYNC_VIEWS = True``); vegeu
+``events.async_views``.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import Http404
+
+from . import views
+
+User = get_user_model()
+
+
+async def public_profile_view(request, username):
+    try:
+        user_obj = await User.objects.aget(username=username)
+    except User.DoesNotExist:
+        raise Http404
+    return await sync_to_async(views.render_public_profile)(request, user_obj)
@@ -0,0 +1,192 @@
+"""
+Disponibilitat de noms d'usuari i emails sense consultar la base de dades.
+
+Cada procés manté dos filtres de Bloom amb comptadors (un de noms d'usuari
+i un d'emails normalitzats). Un "no" del filtre és definitiu i no costa cap
+consulta; un "potser" es confirma amb una consulta indexada. Els comptadors
+permeten treure els usuaris esborrats.
+
+Els filtres es construeixen en arrencar el servidor (``warm`` des de
+``config.wsgi``/``config.asgi``) o a la primera crida, i es mantenen amb
+els senyals d'usuari d'aquest procés. Els usuaris creats per altres
+processos s'hi afegeixen cada ``USER_AVAILABILITY_REFRESH`` segons amb una
+consulta per ``pk`` (índex primari) i cada ``USER_AVAILABILITY_REBUILD``
+segons es reconstrueixen del tot (canvis de nom fets en altres processos).
+
+Per això un "no" pot arribar tard per als usuaris d'altres processos. El
+formulari de registre s'hi fia igualment (cap consulta per als noms
+lliures): si un altre worker l'acaba de crear, l'índex únic de la BBDD
+fa fallar el desat i ``add_unique_errors`` ho converteix en un error del
+camp.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+
+from .models import normalize_email_key
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+REFRESH_INTERVAL = getattr(settings, 'USER_AVAILABILITY_REFRESH', 10)
+REBUILD_INTERVAL = getattr(settings, 'USER_AVAILABILITY_REBUILD', 60 * 60)
+FALSE_POSITIVE_RATE = 0.01
+
+
+class CountingBloomFilter:
+    """
+    Filtre de Bloom amb un comptador d'un byte per posició. Els comptadors
+    saturats (255) no es decrementen mai, així que treure un element no pot
+    provocar falsos negatius.
+    """
+
+    def __init__(self, capacity, error_rate=FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1000)
+        self.size = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self.counters = bytearray(self.size)
+
+    def _positions(self, value):
+        # Doble hashing (Kirsch–Mitzenmacher): k posicions a partir de dos hashos
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            if self.counters[position] < 255:
+                self.counters[position] += 1
+        self.count += 1
+
+    def remove(self, value):
+        positions = self._positions(value)
+        if not all(self.counters[p] for p in positions):
+            return
+        for position in positions:
+            if 0 < self.counters[position] < 255:
+                self.counters[position] -= 1
+        self.count -= 1
+
+    def __contains__(self, value):
+        counters = self.counters
+        return all(counters[p] for p in self._positions(value))
+
+
+class AvailabilityIndex:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.usernames = None
+        self.emails = None
+        self.last_pk = 0
+        self.refreshed_at = self.built_at = 0.0
+
+    def rebuild(self):
+        """Llegeix tots els noms i emails (només dues columnes i l'id)"""
+        total = User.objects.count()
+        usernames = CountingBloomFilter(total * 2)
+        emails = CountingBloomFilter(total * 2)
+        last_pk = 0
+        rows = User.objects.order_by('pk').values_list('pk', 'username', 'email_normalized')
+        for pk, username, email in rows.iterator(chunk_size=5000):
+            usernames.add(username)
+            if email:
+                emails.add(email)
+            last_pk = pk
+        with self._lock:
+            self.usernames, self.emails, self.last_pk = usernames, emails, last_pk
+            self.refreshed_at = self.built_at = self.clock()
+
+    def _ensure_fresh(self):
+        now = self.clock()
+        if self.usernames is None or now - self.built_at >= REBUILD_INTERVAL:
+            self.rebuild()
+        elif now - self.refreshed_at >= REFRESH_INTERVAL:
+            self.refresh()
+
+    def refresh(self):
+        """Afegeix els usuaris creats des de la darrera lectura (p. ex. per altres processos)"""
+        rows = list(
+            User.objects.filter(pk__gt=self.last_pk)
+            .order_by('pk')
+            .values_list('pk', 'username', 'email_normalized')
+        )
+        with self._lock:
+            for pk, username, email in rows:
+                self._add(username, email)
+                self.last_pk = max(self.last_pk, pk)
+            self.refreshed_at = self.clock()
+            self._grow_if_needed()
+
+    def _add(self, username, email):
+        self.usernames.add(username)
+        if email:
+            self.emails.add(email)
+
+    def _grow_if_needed(self):
+        # Per sobre de la capacitat els falsos positius pugen: es reconstrueix al següent ús
+        if self.usernames.count > self.usernames.capacity:
+            self.built_at = float('-inf')
+
+    # --- Senyals d'aquest procés ---
+
+    def user_saved(self, user):
+        if self.usernames is None:
+            return
+        # last_pk no es toca: refresh() ha de recollir igualment els pk
+        # anteriors que hagin creat altres processos
+        with self._lock:
+            self._add(user.username, user.email_normalized)
+            self._grow_if_needed()
+
+    def user_deleted(self, user):
+        if self.usernames is None:
+            return
+        with self._lock:
+            self.usernames.remove(user.username)
+            if user.email_normalized:
+                self.emails.remove(user.email_normalized)
+
+    # --- Consultes ---
+
+    def username_taken(self, username):
+        self._ensure_fresh()
+        if username not in self.usernames:
+            return False
+        return username_exists(username)
+
+    def email_taken(self, email):
+        self._ensure_fresh()
+        if normalize_email_key(email) not in self.emails:
+            return False
+        return email_exists(email)
+
+
+def username_exists(username):
+    return User.objects.filter(username=username).exists()
+
+
+def email_exists(email):
+    return User.objects.filter(email_normalized=normalize_email_key(email)).exists()
+
+
+index = AvailabilityIndex()
+
+
+def warm():
+    """Construeix els filtres en arrencar el servidor (no a la primera petició)"""
+    try:
+        index.rebuild()
+    except DatabaseError:
+        # p. ex. migracions pendents: es tornarà a provar a la primera consulta
+        logger.exception("No s'han pogut construir els filtres de disponibilitat")
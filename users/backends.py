@@ -0,0 +1,38 @@
+# users/backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+
+from .models import normalize_email_key
+
+User = get_user_model()
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    """
+    Login amb nom d'usuari o email en una sola consulta indexada
+    ('username' o 'email_normalized') i una sola verificació de contrasenya.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        lookup = Q(username=username)
+        if '@' in username:
+            lookup |= Q(email_normalized=normalize_email_key(username))
+        candidates = list(User._default_manager.filter(lookup)[:2])
+        # Si un nom d'usuari coincideix amb l'email d'un altre, guanya el nom d'usuari
+        user = next((c for c in candidates if c.get_username() == username), None)
+        if user is None and candidates:
+            user = candidates[0]
+
+        if user is None:
+            # Mateix cost que amb un usuari existent (no es pot endevinar qui existeix)
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -3,8 +3,13 @@ from django import forms
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.forms import AuthenticationForm
 from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.core.validators import RegexValidator
 from django.contrib.auth.password_validation import validate_password
+
+from config.storage import read_head, sniff_image
+
+from . import availability
 from .models import CustomUser
 
 User = get_user_model()
@@ -14,6 +19,10 @@ username_validator = RegexValidator(
     message='Nom d\'usuari només pot contenir lletres, números i @/./+/-/_.'
 )
 
+USERNAME_TAKEN = 'Aquest nom d’usuari ja existeix.'
+EMAIL_TAKEN = 'Ja existeix un usuari amb aquest email.'
+
+
 class CustomUserCreationForm(forms.ModelForm):
     password1 = forms.CharField(
         label='Contrasenya',
@@ -38,8 +47,10 @@ class CustomUserCreationForm(forms.ModelForm):
         if not username:
             raise ValidationError('El nom d’usuari és obligatori.')
 
-        if User.objects.filter(username=username).exists():
-            raise ValidationError('Aquest nom d’usuari ja existeix.')
+        # El filtre de disponibilitat només consulta la BBDD si potser existeix
+        # (un "no" desfasat el recull l'índex únic en desar: add_unique_errors)
+        if availability.index.username_taken(username):
+            raise ValidationError(USERNAME_TAKEN)
 
         if not username.isalnum():
             raise ValidationError('El nom d’usuari només pot contenir lletres i números.')
@@ -48,8 +59,8 @@ class CustomUserCreationForm(forms.ModelForm):
 
     def clean_email(self):
         email = self.cleaned_data.get('email')
-        if email and User.objects.filter(email=email).exists():
-            raise ValidationError('Ja existeix un usuari amb aquest email.')
+        if email and availability.index.email_taken(email):
+            raise ValidationError(EMAIL_TAKEN)
         return email
 
     def clean(self):
@@ -65,6 +76,30 @@ class CustomUserCreationForm(forms.ModelForm):
                 raise ValidationError({'password1': e.messages})
         return cleaned
 
+    def validate_unique(self):
+        # clean_username i clean_email ja ho comproven a través del filtre;
+        # els índexs únics de la BBDD cobreixen els "no" desfasats i els
+        # registres simultanis (vegeu add_unique_errors)
+        exclude = self._get_validation_exclusions() | {'username', 'email'}
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as e:
+            self._update_errors(e)
+
+    def add_unique_errors(self):
+        """
+        Després d'un ``IntegrityError`` en desar: marca el camp que ja
+        existeix. Retorna ``False`` si no n'hi ha cap (un altre error).
+        """
+        found = False
+        if availability.username_exists(self.cleaned_data['username']):
+            self.add_error('username', USERNAME_TAKEN)
+            found = True
+        if availability.email_exists(self.cleaned_data['email']):
+            self.add_error('email', EMAIL_TAKEN)
+            found = True
+        return found
+
     def save(self, commit=True):
         user = super().save(commit=False)
         user.set_password(self.cleaned_data['password1'])
@@ -84,14 +119,13 @@ class CustomUserUpdateForm(forms.ModelForm):
 
     def clean_avatar(self):
         avatar = self.cleaned_data.get('avatar')
-        # Exemple senzill de validació: mida màxima 2MB i tipus imatge
+        # Mida màxima 2MB i format d'imatge reconegut per la capçalera
+        # (el content_type l'envia el navegador i no és fiable)
         if avatar:
             if hasattr(avatar, 'size') and avatar.size > 2 * 1024 * 1024:
                 raise ValidationError('L\'avatar no pot superar els 2 MB.')
-            # validar content_type si està disponible
-            content_type = getattr(avatar, 'content_type', None)
-            if content_type and not content_type.startswith('image/'):
-                raise ValidationError('El fitxer ha de ser una imatge.')
+            if isinstance(avatar, UploadedFile) and sniff_image(read_head(avatar)) is None:
+                raise ValidationError('El fitxer ha de ser una imatge JPEG, PNG, GIF o WebP.')
         return avatar
 
 
@@ -107,15 +141,8 @@ class CustomAuthenticationForm(AuthenticationForm):
         password = self.cleaned_data.get('password')
 
         if username_or_email and password:
-            # Intentar autenticar per username directe
+            # UsernameOrEmailBackend resol username o email amb una sola consulta
             user = authenticate(self.request, username=username_or_email, password=password)
-            if not user:
-                # si no, buscar usuari amb email:
-                try:
-                    user_obj = User.objects.get(email__iexact=username_or_email)
-                    user = authenticate(self.request, username=user_obj.get_username(), password=password)
-                except User.DoesNotExist:
-                    user = None
 
             if user is None:
                 raise forms.ValidationError('Credencials no vàlides. Revisa usuari/email i contrasenya.')
@@ -1,14 +1,22 @@
+import os
 import random
+import time
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Group
 from django.db import transaction
 from faker import Faker
 from django.apps import apps
+from users.models import normalize_email_key
+from users.seeding import hash_password, init_worker
 
 User = get_user_model()
 
+DEFAULT_PASSWORD = 'password123'
+
 
 class Command(BaseCommand):
     help = "Genera usuaris de prova per StreamEvents amb Faker i assigna rols/grups."
@@ -30,6 +38,28 @@ class Command(BaseCommand):
             action='store_true',
             help='Crea relacions de seguiment aleatòries si el model Follow existeix'
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Mode massiu: bulk_create d\'usuaris i grups per lots'
+        )
+        parser.add_argument(
+            '--unique-salts',
+            action='store_true',
+            help='En mode --bulk, un hash (salt) diferent per usuari calculat en paral·lel'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processos per calcular hashes amb --unique-salts (default: nombre de CPUs)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Usuaris per lot en mode --bulk (default: 1000)'
+        )
 
     def handle(self, *args, **options):
         faker = Faker('es_ES')
@@ -68,60 +98,144 @@ class Command(BaseCommand):
             self.stdout.write(self.style.NOTICE("ℹ️ El superusuari 'admin' ja existeix."))
 
         # --- Crear usuaris de prova ---
+        if options['bulk']:
+            self.bulk_seed(faker, num_users, groups, options)
+        else:
+            self.seed(faker, num_users, groups)
+
+        self.stdout.write(self.style.SUCCESS(f"🎉 {num_users} usuaris de prova creats correctament!"))
+
+        # --- Crear relacions de seguiment si s'indica ---
+        if with_follows:
+            self.create_follow_relations()
+
+    def build_user(self, faker, i):
+        """Genera les dades de l'usuari i-èssim i el seu rol"""
+        first = faker.first_name()
+        last = faker.last_name()
+
+        # Generar username sense accents
+        base_username = f"{first.lower()}.{last.lower()}"
+        username_clean = unicodedata.normalize('NFKD', base_username).encode('ascii', 'ignore').decode('utf-8')
+        username = f"{username_clean}{i+1}"
+        email = f"{username}@streamevents.com"
+
+        # Determinar rol segons la posició
+        if (i + 1) % 5 == 0:
+            role = "Organitzadors"
+            emoji = "🎯"
+            bio = faker.sentence(nb_words=8) + " Organitzador d'esdeveniments en streaming."
+        elif (i + 1) % 3 == 0:
+            role = "Moderadors"
+            emoji = "🛡️"
+            bio = faker.sentence(nb_words=8) + " Moderador d'esdeveniments i xats."
+        else:
+            role = "Participants"
+            emoji = ""
+            bio = faker.sentence(nb_words=8) + " Participant habitual."
+
+        display_name = f"{emoji} {first} {last}".strip()
+
+        fields = {
+            "username": username,
+            "email": email,
+            "first_name": first,
+            "last_name": last,
+            "display_name": display_name,
+            "bio": bio,
+            "avatar": None,
+            "is_active": True
+        }
+        return fields, role
+
+    def seed(self, faker, num_users, groups):
+        """Mode normal: un usuari per vegada"""
         with transaction.atomic():
             for i in range(num_users):
-                first = faker.first_name()
-                last = faker.last_name()
-
-                # Generar username sense accents
-                base_username = f"{first.lower()}.{last.lower()}"
-                username_clean = unicodedata.normalize('NFKD', base_username).encode('ascii', 'ignore').decode('utf-8')
-                username = f"{username_clean}{i+1}"
-                email = f"{username}@streamevents.com"
-
-                # Determinar rol segons la posició
-                if (i + 1) % 5 == 0:
-                    role = "Organitzadors"
-                    emoji = "🎯"
-                    bio = faker.sentence(nb_words=8) + " Organitzador d'esdeveniments en streaming."
-                elif (i + 1) % 3 == 0:
-                    role = "Moderadors"
-                    emoji = "🛡️"
-                    bio = faker.sentence(nb_words=8) + " Moderador d'esdeveniments i xats."
-                else:
-                    role = "Participants"
-                    emoji = ""
-                    bio = faker.sentence(nb_words=8) + " Participant habitual."
-
-                display_name = f"{emoji} {first} {last}".strip()
+                fields, role = self.build_user(faker, i)
+                username = fields.pop('username')
 
                 # Crear usuari o obtenir-lo si ja existeix
                 user, created = User.objects.get_or_create(
                     username=username,
-                    defaults={
-                        "email": email,
-                        "first_name": first,
-                        "last_name": last,
-                        "display_name": display_name,
-                        "bio": bio,
-                        "avatar": None,
-                        "is_active": True
-                    }
+                    defaults=fields
                 )
 
                 if created:
-                    user.set_password('password123')
+                    user.set_password(DEFAULT_PASSWORD)
                     user.save()
                     user.groups.add(groups[role])
-                    self.stdout.write(self.style.SUCCESS(f"👤 {display_name} ({role}) creat."))
+                    self.stdout.write(self.style.SUCCESS(f"👤 {fields['display_name']} ({role}) creat."))
                 else:
                     self.stdout.write(self.style.WARNING(f"⚠️ Usuari existent: {username}"))
 
-        self.stdout.write(self.style.SUCCESS(f"🎉 {num_users} usuaris de prova creats correctament!"))
+    def bulk_seed(self, faker, num_users, groups, options):
+        """
+        Mode massiu: bulk_create d'usuaris per lots i una sola inserció massiva
+        a la taula intermèdia de grups per lot.
 
-        # --- Crear relacions de seguiment si s'indica ---
-        if with_follows:
-            self.create_follow_relations()
+        Per defecte la contrasenya (idèntica per a tots) es calcula una sola
+        vegada i el hash es reutilitza. Amb --unique-salts cada usuari té el
+        seu propi salt i els hashes es reparteixen en un pool de processos.
+        """
+        batch_size = options['batch_size']
+        workers = options['workers'] or os.cpu_count() or 1
+        unique_salts = options['unique_salts']
+        started = time.monotonic()
+
+        shared_hash = None if unique_salts else make_password(DEFAULT_PASSWORD)
+        UserGroup = User.groups.through
+        created_total = skipped_total = 0
+
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker) if unique_salts else None
+        try:
+            for start in range(0, num_users, batch_size):
+                rows = [self.build_user(faker, i) for i in range(start, min(start + batch_size, num_users))]
+
+                # Saltem els que ja existeixen (una consulta per lot)
+                usernames = [fields['username'] for fields, _ in rows]
+                existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+                rows = [(fields, role) for fields, role in rows if fields['username'] not in existing]
+                skipped_total += len(existing)
+                if not rows:
+                    continue
+
+                if unique_salts:
+                    hashes = list(executor.map(hash_password, [DEFAULT_PASSWORD] * len(rows), chunksize=64))
+                else:
+                    hashes = [shared_hash] * len(rows)
+
+                with transaction.atomic():
+                    User.objects.bulk_create(
+                        [
+                            User(password=password, email_normalized=normalize_email_key(fields['email']), **fields)
+                            for (fields, _), password in zip(rows, hashes)
+                        ],
+                        batch_size=batch_size,
+                    )
+                    # Recuperem els ids per nom d'usuari (no tots els backends els retornen)
+                    role_by_username = {fields['username']: role for fields, role in rows}
+                    ids = User.objects.filter(username__in=list(role_by_username)).values_list('pk', 'username')
+                    UserGroup.objects.bulk_create(
+                        [
+                            UserGroup(customuser_id=pk, group_id=groups[role_by_username[username]].pk)
+                            for pk, username in ids
+                        ],
+                        batch_size=batch_size,
+                    )
+
+                created_total += len(rows)
+                rate = created_total / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"   • {created_total} usuaris inserits ({rate:,.0f}/s)")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if skipped_total:
+            self.stdout.write(self.style.WARNING(f"⚠️ Usuaris existents omesos: {skipped_total}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"⚡ Mode bulk: {created_total} usuaris en {time.monotonic() - started:.1f}s"
+        ))
 
     def create_follow_relations(self):
         """Crea relacions aleatòries de seguiment si el model Follow existeix."""
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.13 on 2026-10-18 02:27
+
+import config.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_customuser_avatar_alter_customuser_bio_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='avatar',
+            field=models.ImageField(blank=True, help_text='Imatge de perfil', null=True, storage=config.storage.get_blob_storage, upload_to='avatars/', verbose_name='Avatar'),
+        ),
+    ]
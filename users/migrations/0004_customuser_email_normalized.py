@@ -0,0 +1,25 @@
+# Generated by Django 4.1.13 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+def fill_email_normalized(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    for pk, email in CustomUser.objects.values_list('pk', 'email').iterator():
+        CustomUser.objects.filter(pk=pk).update(email_normalized=(email or '').strip().lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_blob_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='email_normalized',
+            field=models.EmailField(blank=True, db_index=True, editable=False, max_length=254, verbose_name='Normalized email'),
+        ),
+        migrations.RunPython(fill_email_normalized, migrations.RunPython.noop),
+    ]
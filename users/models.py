@@ -3,6 +3,13 @@ from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
 
+from config.storage import get_blob_storage
+
+def normalize_email_key(email):
+    """Clau de cerca per email: sense espais i en minúscules"""
+    return (email or '').strip().lower()
+
+
 # Extendim AbstractUser per afegir camps extra requerits pel projecte:
 # - display_name: nom públic opcional
 # - bio: text breu
@@ -27,13 +34,30 @@ class CustomUser(AbstractUser):
     )
     avatar = models.ImageField(
         _("Avatar"),
-        upload_to='avatars/%Y/%m/%d/',
+        upload_to='avatars/',
+        # Adreçat per contingut: el nom final és el hash (config/storage.py)
+        storage=get_blob_storage,
         null=True,
         blank=True,
         help_text=_("Imatge de perfil")
     )
     email = models.EmailField(unique=True)
+    # Email en minúscules per al login per email amb una consulta indexada
+    # (es calcula en desar; vegeu users/backends.py)
+    email_normalized = models.EmailField(
+        _("Normalized email"),
+        db_index=True,
+        blank=True,
+        editable=False,
+    )
 
     # Opcional: redefinir el __str__ per mostrar identificador clar
     def __str__(self):
         return self.display_name or self.get_username()
+
+    def save(self, *args, **kwargs):
+        self.email_normalized = normalize_email_key(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'email_normalized'}
+        super().save(*args, **kwargs)
@@ -0,0 +1,17 @@
+"""
+Funcions per calcular hashes de contrasenya en un pool de processos
+(``seed_users --bulk --unique-salts``).
+"""
+import django
+from django.apps import apps
+
+
+def init_worker():
+    # Amb el mètode 'spawn' el procés fill comença sense Django configurat
+    if not apps.ready:
+        django.setup()
+
+
+def hash_password(password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
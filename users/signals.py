@@ -0,0 +1,23 @@
+# users/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .availability import index
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def add_to_availability_index(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Nous noms i emails al filtre (p. ex. el login només desa 'last_login')"""
+    if raw:
+        return
+    if not created and update_fields is not None and not {'username', 'email'} & set(update_fields):
+        return
+    index.user_saved(instance)
+
+
+@receiver(post_delete, sender=User)
+def remove_from_availability_index(sender, instance, **kwargs):
+    index.user_deleted(instance)
@@ -1,3 +1,302 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from faker import Faker
+from PIL import Image
+
+from config.storage import IMMUTABLE_CACHE_CONTROL, get_blob_storage, serve_media
+from events.models import Event
+
+from . import availability
+from .forms import CustomUserCreationForm
+
+User = get_user_model()
+
+
+class UserViewQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('public', 'public@example.com', 'password123')
+
+    def test_public_profile_query_count(self):
+        now = timezone.now()
+        for i in range(5):
+            Event.objects.create(
+                title=f'Esdeveniment {i}', description='d', creator=self.user, scheduled_date=now + timedelta(days=1)
+            )
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('users:public_profile', args=['public']))
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_page_does_not_query(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('users:login'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_username_change_refreshes_event_cards(self):
+        Event.objects.create(
+            title='Targeta', description='d', creator=self.user, scheduled_date=timezone.now() + timedelta(days=1)
+        )
+        self.assertContains(self.client.get(reverse('events:event_list')), 'public')
+
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.client.get(reverse('events:event_list'))
+        self.assertContains(response, 'renamed')
+
+
+def avatar_bytes(color=(10, 120, 200)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class AvatarStorageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user('avatar', 'avatar@example.com', 'password123')
+        self.other = User.objects.create_user('other', 'other@example.com', 'password123')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self, user, content, name='avatar.png', content_type='image/png'):
+        self.client.force_login(user)
+        return self.client.post(reverse('users:edit_profile'), {
+            'display_name': user.username,
+            'avatar': SimpleUploadedFile(name, content, content_type=content_type),
+        })
+
+    def blob_files(self):
+        return [
+            name for _, _, files in os.walk(os.path.join(self.media_root, 'blobs'))
+            for name in files
+        ]
+
+    def test_identical_avatars_are_stored_once(self):
+        self.assertEqual(self.upload(self.user, avatar_bytes(), 'a.png').status_code, 302)
+        self.assertEqual(self.upload(self.other, avatar_bytes(), 'b.png').status_code, 302)
+        self.user.refresh_from_db()
+        self.other.refresh_from_db()
+
+        self.assertEqual(self.user.avatar.name, self.other.avatar.name)
+        self.assertRegex(self.user.avatar.name, r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertEqual(len(self.blob_files()), 1)
+
+        self.upload(self.other, avatar_bytes((0, 0, 0)))
+        self.assertEqual(len(self.blob_files()), 2)
+
+    def test_extension_comes_from_the_header(self):
+        self.upload(self.user, avatar_bytes(), 'foto.jpg', 'image/jpeg')
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar.name.endswith('.png'))
+
+    def test_non_images_are_rejected_by_header(self):
+        response = self.upload(self.user, b'<html>no</html>', 'avatar.png', 'image/png')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('avatar', response.context['form'].errors)
+        self.assertEqual(self.blob_files(), [])
+
+    def test_storage_hashes_content_without_upload_hash(self):
+        storage = get_blob_storage()
+        first = storage.save('x.png', SimpleUploadedFile('x.png', avatar_bytes()))
+        second = storage.save('y.png', SimpleUploadedFile('y.png', avatar_bytes()))
+        self.assertEqual(first, second)
+
+    def test_blobs_are_served_as_immutable(self):
+        name = get_blob_storage().save('x.png', SimpleUploadedFile('x.png', avatar_bytes()))
+        request = RequestFactory().get('/media/' + name)
+        response = serve_media(request, name, document_root=self.media_root)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+
+class EmailLoginTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('maria', 'Maria.Puig@Example.com', 'password123')
+
+    def test_email_is_normalized_on_save(self):
+        self.assertEqual(self.user.email_normalized, 'maria.puig@example.com')
+        self.user.email = 'NOU@example.com'
+        self.user.save(update_fields=['email'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email_normalized, 'nou@example.com')
+
+    def test_login_by_username_or_email_with_one_query_and_one_hash(self):
+        for identifier in ('maria', 'maria.puig@example.com', ' MARIA.PUIG@EXAMPLE.COM'):
+            with mock.patch.object(PBKDF2PasswordHasher, 'verify', autospec=True, side_effect=PBKDF2PasswordHasher.verify) as verify:
+                with self.assertNumQueries(1):
+                    user = authenticate(username=identifier.strip(), password='password123')
+            self.assertEqual(user, self.user)
+            self.assertEqual(verify.call_count, 1)
+
+    def test_wrong_credentials(self):
+        self.assertIsNone(authenticate(username='maria', password='wrong'))
+        self.assertIsNone(authenticate(username='ningu@example.com', password='password123'))
+
+    def test_username_wins_over_another_users_email(self):
+        other = User.objects.create_user('maria.puig@example.com', 'other@example.com', 'password123')
+        self.assertEqual(authenticate(username='maria.puig@example.com', password='password123'), other)
+
+    def test_login_form_accepts_email(self):
+        response = self.client.post(reverse('users:login'), {'username': 'MARIA.PUIG@example.com', 'password': 'password123'})
+        self.assertRedirects(response, reverse('users:profile'))
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('jordi', 'Jordi@Example.com', 'password123')
+        availability.index.rebuild()
+
+    def check(self, **params):
+        return self.client.get(reverse('users:availability'), params).json()
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = availability.CountingBloomFilter(1000)
+        for i in range(1000):
+            bloom.add(f'user{i}')
+        self.assertTrue(all(f'user{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+        bloom.remove('user1')
+        self.assertNotIn('user1', bloom)
+        self.assertIn('user2', bloom)
+
+    def test_free_names_do_not_query(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(self.check(username='lliure')['available'])
+            self.assertTrue(self.check(email='lliure@example.com')['available'])
+
+    def test_taken_names_are_confirmed_in_the_database(self):
+        with self.assertNumQueries(1):
+            self.assertFalse(self.check(username='jordi')['available'])
+        self.assertFalse(self.check(email=' JORDI@example.com ')['available'])
+        self.assertEqual(self.client.get(reverse('users:availability')).status_code, 400)
+
+    def test_filter_follows_creates_and_deletes(self):
+        User.objects.create_user('nou', 'nou@example.com', 'password123')
+        self.assertFalse(self.check(username='nou')['available'])
+
+        User.objects.get(username='nou').delete()
+        with self.assertNumQueries(0):
+            self.assertTrue(self.check(username='nou')['available'])
+
+    def test_refresh_picks_up_users_created_elsewhere(self):
+        now = [0.0]
+        index = availability.AvailabilityIndex(clock=lambda: now[0])
+        index.rebuild()
+        # bulk_create no envia senyals: com un usuari creat per un altre procés
+        User.objects.bulk_create([User(username='altre', email='altre@example.com', email_normalized='altre@example.com')])
+        self.assertFalse(index.username_taken('altre'))
+
+        now[0] += availability.REFRESH_INTERVAL
+        self.assertTrue(index.username_taken('altre'))
+        self.assertTrue(index.email_taken('ALTRE@example.com'))
+
+    def registration_data(self, **overrides):
+        data = {
+            'username': 'lliure', 'email': 'lliure@example.com', 'first_name': 'L', 'last_name': 'L',
+            'password1': 'Contrasenya-Llarga-42', 'password2': 'Contrasenya-Llarga-42',
+        }
+        data.update(overrides)
+        return data
+
+    def test_registration_checks_uniqueness_through_the_filter(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(CustomUserCreationForm(self.registration_data()).is_valid())
+
+        form = CustomUserCreationForm(self.registration_data(username='jordi', email='jordi@EXAMPLE.com'))
+        self.assertFalse(form.is_valid())
+        self.assertIn('username', form.errors)
+        self.assertIn('email', form.errors)
+
+    def test_stale_filter_is_caught_by_the_unique_index(self):
+        # Creat per un altre worker: el filtre d'aquest procés encara no el té
+        User.objects.bulk_create([User(username='altre', email='altre@example.com', email_normalized='altre@example.com')])
+        self.assertTrue(CustomUserCreationForm(self.registration_data(username='altre', email='altre@example.com')).is_valid())
+
+        response = self.client.post(reverse('users:register'), self.registration_data(username='altre', email='altre@example.com'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.context['form'].errors), {'username', 'email'})
+        self.assertEqual(User.objects.filter(username='altre').count(), 1)
+
+    def test_registration_race_reports_the_duplicated_field(self):
+        # Un registre simultani crea 'jordi' entre la validació i el desat
+        with mock.patch.object(availability, 'username_exists', side_effect=[False, True]):
+            response = self.client.post(reverse('users:register'), self.registration_data(username='jordi'))
+        self.assertEqual(response.status_code, 200)
+        form = response.context['form']
+        self.assertEqual(list(form.errors), ['username'])
+        self.assertFalse(User.objects.filter(email='lliure@example.com').exists())
+
+
+class SeedUsersBulkTests(TestCase):
+    def seed(self, **options):
+        # Faker amb llavor: els mateixos noms a cada execució
+        Faker.seed(1234)
+        out = io.StringIO()
+        call_command('seed_users', users=6, workers=1, stdout=out, **options)
+        return out.getvalue()
+
+    def snapshot(self):
+        UserGroup = User.groups.through
+        groups = dict(
+            UserGroup.objects.filter(customuser__is_superuser=False)
+            .values_list('customuser__username', 'group__name')
+        )
+        return {
+            user.username: (user.email, user.email_normalized, user.display_name, groups.get(user.username))
+            for user in User.objects.filter(is_superuser=False)
+        }
+
+    def test_bulk_seed_creates_users_groups_and_normalized_emails(self):
+        self.seed(bulk=True, batch_size=4)
+        UserGroup = User.groups.through
+        users = User.objects.filter(is_superuser=False)
+        self.assertEqual(users.count(), 6)
+        self.assertEqual(UserGroup.objects.filter(customuser__in=users).count(), 6)
+        roles = dict(
+            UserGroup.objects.values('group__name').annotate(n=Count('id')).values_list('group__name', 'n')
+        )
+        self.assertEqual(roles, {'Participants': 3, 'Moderadors': 2, 'Organitzadors': 1})
+        for user in users:
+            self.assertEqual(user.email_normalized, user.email.lower())
+        user = users.first()
+        self.assertTrue(user.check_password('password123'))
+        self.assertEqual(authenticate(username=user.email.upper(), password='password123'), user)
+
+        # Una segona execució amb els mateixos noms no en crea cap
+        out = self.seed(bulk=True, batch_size=4)
+        self.assertIn('Usuaris existents omesos: 6', out)
+        self.assertEqual(users.count(), 6)
+        self.assertEqual(UserGroup.objects.count(), 6)
+
+    def test_bulk_seed_matches_the_orm_path(self):
+        self.seed(bulk=True)
+        bulk = self.snapshot()
+        User.objects.filter(is_superuser=False).delete()
+        self.seed()
+        self.assertEqual(self.snapshot(), bulk)
+
+    def test_unique_salts(self):
+        self.seed(bulk=True, unique_salts=True)
+        hashes = list(User.objects.filter(is_superuser=False).values_list('password', flat=True))
+        self.assertEqual(len(set(hashes)), 6)
+        self.assertTrue(User.objects.filter(is_superuser=False).first().check_password('password123'))
@@ -1,7 +1,13 @@
 # users/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_VIEWS:
+    from . import async_views as public_views
+else:
+    public_views = views
+
 app_name = 'users'
 
 urlpatterns = [
@@ -10,5 +16,6 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
     path('profile/edit/', views.edit_profile_view, name='edit_profile'),
-    path('<str:username>/', views.public_profile_view, name='public_profile'),
+    path('availability/', views.availability_view, name='availability'),
+    path('<str:username>/', public_views.public_profile_view, name='public_profile'),
 ]
@@ -4,9 +4,11 @@ from django.contrib import messages
 from django.contrib.auth import login, logout, authenticate, get_user_model
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
-from django.http import Http404
+from django.http import Http404, JsonResponse
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, CustomUserUpdateForm
-from django.db import IntegrityError, DatabaseError
+from . import availability
+from events.conditional import not_modified, page_etag, set_validators
+from django.db import IntegrityError, DatabaseError, transaction
 
 User = get_user_model()
 
@@ -15,12 +17,17 @@ def register_view(request):
         form = CustomUserCreationForm(request.POST, request.FILES or None)
         if form.is_valid():
             try:
-                user = form.save()
+                with transaction.atomic():
+                    user = form.save()
                 login(request, user)
                 messages.success(request, f'Registre completat. Benvingut/da, {user.get_username()}!')
                 return redirect('users:profile')
             except IntegrityError:
-                messages.error(request, 'Aquest correu electrònic ja està registrat.')
+                # Un altre registre simultani amb el mateix nom o email
+                if form.add_unique_errors():
+                    messages.error(request, 'Si us plau, corregeix els errors del formulari.')
+                else:
+                    messages.error(request, 'Error amb la base de dades. Torna-ho a provar més tard.')
             except DatabaseError:
                 messages.error(request, 'Error amb la base de dades. Torna-ho a provar més tard.')
         else:
@@ -30,6 +37,21 @@ def register_view(request):
     return render(request, 'registration/register.html', {'form': form})
 
 
+def availability_view(request):
+    """
+    Comprovació en directe del formulari de registre:
+    ``?username=...`` o ``?email=...`` → ``{"field", "value", "available"}``.
+    """
+    for field, is_taken in (('username', availability.index.username_taken),
+                            ('email', availability.index.email_taken)):
+        value = request.GET.get(field, '').strip()
+        if value:
+            if len(value) > 254:
+                return JsonResponse({'error': 'Valor massa llarg'}, status=400)
+            return JsonResponse({'field': field, 'value': value, 'available': not is_taken(value)})
+    return JsonResponse({'error': 'Cal indicar username o email'}, status=400)
+
+
 def login_view(request):
     next_url = request.GET.get('next') or request.POST.get('next') or reverse('users:profile')
     if request.method == 'POST':
@@ -74,7 +96,28 @@ def edit_profile_view(request):
     return render(request, 'users/edit_profile.html', {'form': form})
 
 
+def profile_etag(request, user_obj):
+    """
+    Validador del perfil públic. La pàgina només mostra la fila de l'usuari
+    (ja carregada, sense cap consulta més), així que l'ETag en surt dels
+    camps visibles.
+    """
+    return page_etag(
+        request, 'profile', user_obj.pk, user_obj.username, user_obj.first_name,
+        user_obj.last_name, user_obj.bio, user_obj.avatar.name,
+    )
+
+
+def render_public_profile(request, user_obj):
+    etag = profile_etag(request, user_obj)
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+    response = render(request, 'users/public_profile.html', {'user_obj': user_obj})
+    return set_validators(response, etag)
+
+
 def public_profile_view(request, username):
     user_obj = get_object_or_404(User, username=username)
     # Si vols, filtratge per visibilitat (ex: is_active) es pot afegir aquí
-    return render(request, 'users/public_profile.html', {'user_obj': user_obj})
+    return render_public_profile(request, user_obj)